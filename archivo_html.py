@@ -0,0 +1,195 @@
+import argparse
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+from multiprocessing import Pool
+from extraccion import extraer_perfil_html
+from salida_columnar import abrir_salida
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional: sin él se comprime con gzip
+    zstandard = None
+
+# Archivo de HTML crudo comprimido, de solo anexado, con índice por URL y
+# fecha de descarga.
+#
+# Cada página (SERP o perfil) se comprime por separado (zstd si está
+# instalado, si no gzip) y se añade al final de un segmento. Cada proceso
+# escribe en sus propios segmentos, así que varios trabajadores pueden
+# archivar a la vez; el índice SQLite (WAL) guarda segmento, desplazamiento y
+# longitud de cada registro.
+#
+# El modo de repetición vuelve a pasar el extractor sobre el archivo sin
+# navegador y en paralelo en todos los núcleos:
+#
+#     python archivo_html.py reextraer --salida perfiles.jsonl
+#     python archivo_html.py reextraer --salida perfiles.parquet
+
+DIRECTORIO_POR_DEFECTO = 'archivo_html'
+TAMANO_SEGMENTO = 256 * 1024 * 1024
+NIVEL_ZSTD = 10
+TAMANO_LOTE_REEXTRACCION = 500  # chunksize de imap_unordered
+
+
+def comprimir(datos, compresion):
+    if compresion == 'zstd':
+        return zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(datos)
+    return gzip.compress(datos, compresslevel=6)
+
+
+def descomprimir(datos, compresion):
+    if compresion == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(datos)
+    return gzip.decompress(datos)
+
+
+class ArchivoHTML:
+    def __init__(self, directorio=DIRECTORIO_POR_DEFECTO, tamano_segmento=TAMANO_SEGMENTO, compresion=None):
+        self.directorio = directorio
+        self.tamano_segmento = tamano_segmento
+        self.compresion = compresion or ('zstd' if zstandard else 'gzip')
+        if self.compresion == 'zstd' and zstandard is None:
+            raise RuntimeError("La compresión zstd requiere el paquete 'zstandard'")
+        os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._segmento = None
+        self._archivo_segmento = None
+        self._numero_segmento = 0
+
+        conexion = self._conexion()
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS paginas (
+                url TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                obtenido REAL NOT NULL,
+                estado INTEGER,
+                segmento TEXT NOT NULL,
+                desplazamiento INTEGER NOT NULL,
+                longitud INTEGER NOT NULL,
+                compresion TEXT NOT NULL
+            )
+        """)
+        conexion.execute("CREATE INDEX IF NOT EXISTS paginas_url ON paginas (url, obtenido)")
+        conexion.commit()
+
+    def guardar(self, url, html, tipo='perfil', estado=None):
+        datos = comprimir(html.encode('utf-8'), self.compresion)
+        with self._lock:
+            archivo = self._segmento_actual()
+            desplazamiento = archivo.tell()
+            archivo.write(datos)
+            archivo.flush()
+            segmento = self._segmento
+        conexion = self._conexion()
+        conexion.execute(
+            "INSERT INTO paginas (url, tipo, obtenido, estado, segmento, desplazamiento, longitud, compresion) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, tipo, time.time(), estado, segmento, desplazamiento, len(datos), self.compresion),
+        )
+        conexion.commit()
+
+    def leer(self, entrada):
+        return leer_registro(self.directorio, entrada)
+
+    def entradas(self, tipo='perfil', solo_ultima=True):
+        # Entradas del índice; por defecto solo la descarga más reciente de cada URL
+        consulta = "SELECT url, obtenido, estado, segmento, desplazamiento, longitud, compresion FROM paginas WHERE tipo = ?"
+        if solo_ultima:
+            consulta += " AND obtenido = (SELECT MAX(obtenido) FROM paginas AS p WHERE p.url = paginas.url AND p.tipo = paginas.tipo)"
+        columnas = ('url', 'obtenido', 'estado', 'segmento', 'desplazamiento', 'longitud', 'compresion')
+        for fila in self._conexion().execute(consulta, (tipo,)):
+            yield dict(zip(columnas, fila))
+
+    def cerrar(self):
+        with self._lock:
+            if self._archivo_segmento:
+                self._archivo_segmento.close()
+                self._archivo_segmento = None
+
+    def _segmento_actual(self):
+        if self._archivo_segmento and self._archivo_segmento.tell() < self.tamano_segmento:
+            return self._archivo_segmento
+        if self._archivo_segmento:
+            self._archivo_segmento.close()
+        # Segmentos propios de cada proceso para que varios escritores no se pisen
+        while True:
+            self._numero_segmento += 1
+            self._segmento = f"segmento-{os.getpid()}-{int(time.time())}-{self._numero_segmento:04d}.bin"
+            ruta = os.path.join(self.directorio, self._segmento)
+            if not os.path.exists(ruta):
+                break
+        self._archivo_segmento = open(ruta, 'ab')
+        return self._archivo_segmento
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(os.path.join(self.directorio, 'indice.sqlite'), timeout=30)
+            conexion.execute("PRAGMA busy_timeout=30000")
+            self._local.conexion = conexion
+        return conexion
+
+
+def leer_registro(directorio, entrada):
+    with open(os.path.join(directorio, entrada['segmento']), 'rb') as f:
+        f.seek(entrada['desplazamiento'])
+        datos = f.read(entrada['longitud'])
+    return descomprimir(datos, entrada['compresion']).decode('utf-8')
+
+
+def _reextraer_entrada(argumentos):
+    directorio, entrada = argumentos
+    try:
+        perfil = extraer_perfil_html(leer_registro(directorio, entrada), url=entrada['url'])
+    except Exception as e:
+        logging.error(f"Error al reextraer {entrada['url']}: {e}")
+        return None
+    if perfil:
+        perfil.obtenido = entrada['obtenido']
+    return perfil
+
+
+def reextraer(archivo, procesos=None, solo_ultima=True):
+    # Generador de perfiles reextraídos del archivo, repartidos entre procesos.
+    # Las filas del índice pasan al pool según se leen, en trozos de
+    # TAMANO_LOTE_REEXTRACCION, sin cargar antes el índice entero en memoria
+    tareas = ((archivo.directorio, entrada) for entrada in archivo.entradas('perfil', solo_ultima))
+    with Pool(processes=procesos or os.cpu_count()) as pool:
+        for perfil in pool.imap_unordered(_reextraer_entrada, tareas, chunksize=TAMANO_LOTE_REEXTRACCION):
+            if perfil:
+                yield perfil
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo de HTML crudo de LinkedIn")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    parser_reextraer = subparsers.add_parser('reextraer', help="Reextraer los perfiles archivados sin navegador")
+    parser_reextraer.add_argument('--directorio', default=DIRECTORIO_POR_DEFECTO)
+    parser_reextraer.add_argument('--salida', required=True, help="Fichero de salida: JSONL, o Parquet/Arrow según la extensión")
+    parser_reextraer.add_argument('--procesos', type=int, default=None)
+    parser_reextraer.add_argument('--todas', action='store_true', help="Reextraer todas las descargas, no solo la última de cada URL")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    archivo = ArchivoHTML(args.directorio)
+    inicio = time.perf_counter()
+    total = 0
+    salida = abrir_salida(args.salida)
+    try:
+        for perfil in reextraer(archivo, args.procesos, solo_ultima=not args.todas):
+            salida.escribir(perfil)
+            total += 1
+    finally:
+        salida.cerrar()
+    logging.info(f"{total} perfiles reextraídos en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import statistics
+import time
+from playwright.sync_api import sync_playwright
+from extraccion import ESPEC_PERFIL, construir_perfil, extraer_perfil
+
+# Compara la extracción campo a campo (query_selector + inner_text por cada
+# campo y elemento, como hacía scrape_linkedin_profile) con la extracción en
+# un solo page.evaluate, sobre el HTML guardado en fixtures/.
+#
+# Uso: python bench_extraccion.py --iteraciones 200
+
+DIRECTORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURES = ('perfil_publico.html', 'perfil_sesion.html')
+
+
+def _primero(raiz, selectores):
+    for selector in selectores:
+        elemento = raiz.query_selector(selector)
+        if elemento:
+            texto = elemento.inner_text().strip()
+            if texto:
+                return texto
+    return None
+
+
+def extraer_campo_a_campo(page, espec=ESPEC_PERFIL):
+    # Misma especificación, pero con un viaje de ida y vuelta por selector
+    datos = {campo: _primero(page, selectores) for campo, selectores in espec['campos'].items()}
+    for lista, definicion in espec['listas'].items():
+        elementos = []
+        for selector in definicion['elementos']:
+            elementos = page.query_selector_all(selector)
+            if elementos:
+                break
+        datos[lista] = [
+            {campo: _primero(elemento, selectores) for campo, selectores in definicion['campos'].items()}
+            for elemento in elementos[:definicion['limite']]
+        ]
+    return construir_perfil(datos)
+
+
+def medir(page, extraer, iteraciones):
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        perfil = extraer(page)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return perfil, tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la extracción campo a campo frente a un solo evaluate")
+    parser.add_argument('--iteraciones', type=int, default=200)
+    args = parser.parse_args()
+
+    resultados = []
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        for fixture in FIXTURES:
+            with open(os.path.join(DIRECTORIO_FIXTURES, fixture), encoding='utf-8') as f:
+                page.set_content(f.read())
+
+            perfil_antiguo, tiempos_antiguo = medir(page, extraer_campo_a_campo, args.iteraciones)
+            perfil_nuevo, tiempos_nuevo = medir(page, extraer_perfil, args.iteraciones)
+            if perfil_antiguo != perfil_nuevo:
+                raise AssertionError(f"Las dos extracciones no coinciden en {fixture}: {perfil_antiguo} != {perfil_nuevo}")
+
+            mediana_antiguo = statistics.median(tiempos_antiguo)
+            mediana_nuevo = statistics.median(tiempos_nuevo)
+            resultados.append({
+                'fixture': fixture,
+                'campo_a_campo_ms': round(mediana_antiguo, 3),
+                'evaluate_ms': round(mediana_nuevo, 3),
+                'aceleracion': round(mediana_antiguo / mediana_nuevo, 1),
+                'perfil': perfil_nuevo.como_dict(),
+            })
+        browser.close()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from motor_async import scrapear_perfiles_async
+from pool_navegadores import PoolNavegadores, PoolNavegadoresAsync
+from version_sin_steeamlit import scrapear_perfiles
+
+# Compara el motor de hilos (ThreadPool + PoolNavegadores) con el motor
+# asíncrono contra un servidor local que sirve un perfil de ejemplo.
+#
+# Uso: python bench_motores.py --perfiles 50 --latencia 0.3
+
+RUTA_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'perfil_publico.html')
+
+
+def servidor_fixture(latencia):
+    with open(RUTA_FIXTURE, 'rb') as f:
+        html = f.read()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latencia)  # Simula la latencia de LinkedIn
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(html)))
+            self.end_headers()
+            self.wfile.write(html)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}"
+
+
+def rss_arbol_mb(pid):
+    # RSS del proceso y de todos sus descendientes (los navegadores), vía /proc
+    total_kb = 0
+    pendientes = [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with open(f"/proc/{actual}/status") as f:
+                for linea in f:
+                    if linea.startswith('VmRSS:'):
+                        total_kb += int(linea.split()[1])
+                        break
+            for tid in os.listdir(f"/proc/{actual}/task"):
+                with open(f"/proc/{actual}/task/{tid}/children") as f:
+                    pendientes.extend(int(hijo) for hijo in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class MuestreadorRSS(threading.Thread):
+    def __init__(self, intervalo=0.2):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.pico_mb = 0.0
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.is_set():
+            self.pico_mb = max(self.pico_mb, rss_arbol_mb(os.getpid()))
+            self._parar.wait(self.intervalo)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+def medir(nombre, ejecutar, total):
+    muestreador = MuestreadorRSS()
+    muestreador.start()
+    inicio = time.perf_counter()
+    perfiles = ejecutar()
+    duracion = time.perf_counter() - inicio
+    muestreador.parar()
+    return {
+        'motor': nombre,
+        'perfiles': len(perfiles),
+        'urls': total,
+        'segundos': round(duracion, 2),
+        'perfiles_por_segundo': round(len(perfiles) / duracion, 2),
+        'rss_pico_mb': round(muestreador.pico_mb, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de hilos frente al motor asíncrono")
+    parser.add_argument('--perfiles', type=int, default=50)
+    parser.add_argument('--latencia', type=float, default=0.3, help="Latencia simulada por página (s)")
+    parser.add_argument('--hilos', type=int, default=5, help="Navegadores/hilos del motor de hilos")
+    parser.add_argument('--navegadores', type=int, default=2, help="Navegadores del motor asíncrono")
+    parser.add_argument('--concurrencia', type=int, default=20, help="Páginas en vuelo del motor asíncrono")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    servidor, base = servidor_fixture(args.latencia)
+    links = [f"{base}/in/perfil-{i}" for i in range(args.perfiles)]
+
+    def motor_hilos():
+        with PoolNavegadores(tamano=args.hilos) as pool:
+            return scrapear_perfiles(links, None, pool)
+
+    async def motor_async():
+        async with PoolNavegadoresAsync(tamano=args.navegadores) as pool:
+            return await scrapear_perfiles_async(links, None, pool, args.concurrencia)
+
+    resultados = [
+        medir('hilos', motor_hilos, len(links)),
+        medir('async', lambda: asyncio.run(motor_async()), len(links)),
+    ]
+    servidor.shutdown()
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import platform
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cadencia import LIMITADOR_POR_DEFECTO
+from cliente_http import ClienteHTTP
+from metricas import METRICAS_POR_DEFECTO
+from motor_async import buscar_y_scrapear_async
+from pool_navegadores import PoolNavegadores, PoolNavegadoresAsync
+from sesiones import PoolSesiones
+from version_sin_steeamlit import buscar_y_scrapear
+
+# Benchmark reproducible de buscar_y_scrapear de principio a fin, sin tocar
+# los sitios reales.
+#
+# Un servidor local imita a Google (páginas de resultados con enlaces
+# /url?q=... a perfiles) y a LinkedIn (perfiles con la maquetación pública o
+# la de sesión iniciada, a partir de fixtures/). Chromium resuelve
+# www.google.com y www.linkedin.com a ese servidor (--host-resolver-rules) y
+# acepta su certificado autofirmado, que se genera con openssl al arrancar en
+# un directorio temporal y se descarta, así que el código se ejecuta sin cambios
+# sobre las URLs reales. Cualquier otro host no resuelve: nada sale a Internet.
+#
+# La latencia, los errores 5xx, los 429 y las redirecciones al login de cada
+# perfil se deciden con un hash de la semilla, la ruta y el número de
+# petición a esa ruta: la misma semilla da el mismo escenario sea cual sea el
+# orden en que lleguen las peticiones. Las páginas de resultados solo tienen
+# latencia.
+#
+# Mide perfiles/s, latencia por perfil p50/p95/p99 (reintentos incluidos),
+# RSS pico y CPU por perfil del proceso y sus navegadores, y guarda todo en
+# JSON con el commit para comparar entre versiones:
+#
+#     python bench_scraper.py --perfiles 100 --salida antes.json
+#     python bench_scraper.py --perfiles 100 --comparar antes.json
+
+DIRECTORIO_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURES = {
+    'publico': ('perfil_publico.html', 'Ana García Pérez'),
+    'sesion': ('perfil_sesion.html', 'Jordi Puig Serra'),
+}
+HOST_GOOGLE = 'www.google.com'
+HOST_LINKEDIN = 'www.linkedin.com'
+RESULTADOS_POR_PAGINA = 10
+CONSULTA = 'site:linkedin.com/in/ "Benchmark" "Local"'
+
+# Cubos de ~10 % de resolución entre 1 ms y ~25 min para cuantiles precisos
+CUBOS_BENCHMARK = tuple(round(0.001 * 1.1 ** i, 6) for i in range(150))
+INTERVALO_MUESTREO_S = 0.2
+METRICAS_COMPARADAS = ('perfiles_por_s', 'latencia_p50_s', 'latencia_p95_s', 'latencia_p99_s', 'rss_pico_mb',
+                       'cpu_ms_por_perfil')
+
+
+def _tirada(*partes):
+    # Número en [0, 1) determinado solo por las partes
+    digest = hashlib.blake2b('|'.join(map(str, partes)).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+class ServidorFalso:
+    def __init__(self, perfiles=100, latencia=0.2, jitter=0.1, errores=0.0, limites=0.0, login=0.0,
+                 variante='mixta', semilla=1):
+        self.perfiles = perfiles
+        self.latencia = latencia
+        self.jitter = jitter
+        self.errores = errores
+        self.limites = limites
+        self.login = login
+        self.variante = variante
+        self.semilla = semilla
+        self._plantillas = {}
+        for nombre, (fichero, persona) in FIXTURES.items():
+            with open(os.path.join(DIRECTORIO_FIXTURES, fichero), encoding='utf-8') as f:
+                self._plantillas[nombre] = (f.read(), persona)
+        self._peticiones = {}
+        self._respuestas = {}
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    @property
+    def puerto(self):
+        return self._servidor.server_address[1]
+
+    def argumentos_navegador(self):
+        reglas = f"MAP {HOST_GOOGLE} 127.0.0.1:{self.puerto}, MAP {HOST_LINKEDIN} 127.0.0.1:{self.puerto}, MAP * ~NOTFOUND"
+        return [f"--host-resolver-rules={reglas}", '--ignore-certificate-errors']
+
+    def cliente_http(self):
+        # ClienteHTTP con las peticiones a los hosts falsos dirigidas a este
+        # servidor; la cabecera Host conserva el nombre original
+        import httpx
+        puerto = self.puerto
+
+        def redirigir(request):
+            request.url = request.url.copy_with(host='127.0.0.1', port=puerto)
+
+        class Transporte(httpx.HTTPTransport):
+            def handle_request(self, request):
+                redirigir(request)
+                return super().handle_request(request)
+
+        class TransporteAsync(httpx.AsyncHTTPTransport):
+            async def handle_async_request(self, request):
+                redirigir(request)
+                return await super().handle_async_request(request)
+
+        opciones = {'verify': False, 'http2': True}
+        return ClienteHTTP(transporte=Transporte(**opciones), transporte_async=TransporteAsync(**opciones))
+
+    def iniciar(self):
+        servidor_falso = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                estado, cabeceras, cuerpo = servidor_falso.responder(self.headers.get('Host', ''), self.path)
+                self.send_response(estado)
+                for nombre, valor in cabeceras:
+                    self.send_header(nombre, valor)
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        contexto = _contexto_tls()
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+        self._servidor.daemon_threads = True
+        # El handshake se hace en el hilo de cada conexión, no en el que acepta
+        self._servidor.socket = contexto.wrap_socket(self._servidor.socket, server_side=True,
+                                                     do_handshake_on_connect=False)
+        threading.Thread(target=self._servidor.serve_forever, name='servidor-falso', daemon=True).start()
+        return self
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._respuestas)
+
+    def responder(self, host, ruta):
+        host = host.split(':')[0].lower()
+        partes = urllib.parse.urlsplit(ruta)
+        with self._lock:
+            n = self._peticiones[ruta] = self._peticiones.get(ruta, 0) + 1
+        time.sleep(self.latencia + self.jitter * _tirada(self.semilla, 'latencia', ruta, n))
+
+        if host == HOST_GOOGLE and partes.path == '/search':
+            respuesta = self._serp(urllib.parse.parse_qs(partes.query))
+        elif host == HOST_LINKEDIN and partes.path.startswith('/in/'):
+            respuesta = self._perfil(partes.path[len('/in/'):].strip('/'), ruta, n)
+        elif host == HOST_LINKEDIN and partes.path == '/authwall':
+            respuesta = 'login', 200, [], b'<html><body><h2>Join LinkedIn</h2></body></html>'
+        else:
+            respuesta = 'no_encontrado', 404, [], b'Not found'
+
+        tipo, estado, cabeceras, cuerpo = respuesta
+        with self._lock:
+            self._respuestas[tipo] = self._respuestas.get(tipo, 0) + 1
+        if not any(nombre == 'Content-Type' for nombre, _ in cabeceras):
+            cabeceras = cabeceras + [('Content-Type', 'text/html; charset=utf-8')]
+        return estado, cabeceras, cuerpo
+
+    def _serp(self, parametros):
+        inicio = int(parametros.get('start', ['0'])[0] or 0)
+        enlaces = [
+            f'<div class="g"><a href="/url?q=https://{HOST_LINKEDIN}/in/perfil-{i:05d}&amp;sa=U">'
+            f'<h3>Perfil {i} - LinkedIn</h3></a></div>'
+            for i in range(inicio, min(inicio + RESULTADOS_POR_PAGINA, self.perfiles))
+        ]
+        # Enlaces que el extractor debe ignorar
+        enlaces.append('<a href="/search?q=otra">Búsquedas relacionadas</a>')
+        enlaces.append(f'<a href="https://{HOST_LINKEDIN}/company/empresa">Empresa</a>')
+        cuerpo = f"<html><body><div id=\"search\">{''.join(enlaces)}</div></body></html>"
+        return 'serp', 200, [], cuerpo.encode('utf-8')
+
+    def _perfil(self, slug, ruta, n):
+        if not slug.startswith('perfil-') or not slug[len('perfil-'):].isdigit() or \
+                int(slug[len('perfil-'):]) >= self.perfiles:
+            return 'no_encontrado', 404, [], b'<html><body>Perfil no encontrado</body></html>'
+
+        tirada = _tirada(self.semilla, 'resultado', ruta, n)
+        if tirada < self.errores:
+            return 'error', 500, [], b'<html><body>Error interno</body></html>'
+        tirada -= self.errores
+        if tirada < self.limites:
+            return '429', 429, [('Retry-After', '1')], b'<html><body>Too many requests</body></html>'
+        tirada -= self.limites
+        if tirada < self.login:
+            destino = f"https://{HOST_LINKEDIN}/authwall?sessionRedirect={urllib.parse.quote(ruta)}"
+            return 'redireccion_login', 302, [('Location', destino)], b''
+
+        variante = self.variante
+        if variante == 'mixta':
+            variante = 'sesion' if _tirada(self.semilla, 'variante', slug) < 0.5 else 'publico'
+        html, persona = self._plantillas[variante]
+        numero = int(slug[len('perfil-'):])
+        return f"perfil_{variante}", 200, [], html.replace(persona, f"Perfil {numero}").encode('utf-8')
+
+
+def _contexto_tls():
+    # Contexto TLS con un certificado autofirmado de usar y tirar: la clave
+    # solo existe en un directorio temporal mientras se carga
+    with tempfile.TemporaryDirectory() as directorio:
+        certificado = os.path.join(directorio, 'cert.pem')
+        clave = os.path.join(directorio, 'clave.pem')
+        try:
+            subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                            '-subj', f"/CN={HOST_LINKEDIN}",
+                            '-addext', f"subjectAltName=DNS:{HOST_GOOGLE},DNS:{HOST_LINKEDIN}",
+                            '-keyout', clave, '-out', certificado],
+                           check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise RuntimeError(f"No se pudo generar el certificado del servidor falso con openssl: {e}") from None
+        contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        contexto.load_cert_chain(certificado, clave)
+    return contexto
+
+
+def _procesos_arbol(pid):
+    # El proceso y todos sus descendientes (los navegadores), vía /proc
+    procesos = []
+    pendientes = [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        procesos.append(actual)
+        try:
+            for tid in os.listdir(f"/proc/{actual}/task"):
+                with open(f"/proc/{actual}/task/{tid}/children") as f:
+                    pendientes.extend(int(hijo) for hijo in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return procesos
+
+
+def _rss_y_cpu(pid):
+    # (RSS en kB, CPU de usuario + sistema en ticks) de un proceso
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            campos = f.read().rsplit(')', 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss = next((int(linea.split()[1]) for linea in f if linea.startswith('VmRSS:')), 0)
+    except (OSError, ValueError, IndexError):
+        return None
+    return rss, int(campos[11]) + int(campos[12])
+
+
+class MuestreadorRecursos(threading.Thread):
+    # RSS pico del árbol de procesos y CPU consumida por los hijos (los
+    # navegadores que se lanzan durante la medida); la del propio proceso se
+    # toma de os.times()
+    def __init__(self, intervalo=INTERVALO_MUESTREO_S):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.pico_kb = 0
+        self._ticks_hijos = {}
+        self._parar = threading.Event()
+
+    def run(self):
+        while True:
+            self.muestrear()
+            if self._parar.wait(self.intervalo):
+                break
+
+    def muestrear(self):
+        total_kb = 0
+        propio = os.getpid()
+        for pid in _procesos_arbol(propio):
+            medida = _rss_y_cpu(pid)
+            if medida is None:
+                continue
+            total_kb += medida[0]
+            if pid != propio:
+                self._ticks_hijos[pid] = max(self._ticks_hijos.get(pid, 0), medida[1])
+        self.pico_kb = max(self.pico_kb, total_kb)
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        self.muestrear()
+
+    def cpu_hijos_s(self):
+        return sum(self._ticks_hijos.values()) / os.sysconf('SC_CLK_TCK')
+
+
+def _sesiones_falsas(cantidad, directorio):
+    rutas = []
+    caduca = time.time() + 30 * 24 * 3600
+    for i in range(cantidad):
+        ruta = os.path.join(directorio, f"sesion-{i}.json")
+        with open(ruta, 'w') as f:
+            json.dump([{'name': 'li_at', 'value': f"benchmark-{i}", 'domain': '.linkedin.com', 'path': '/',
+                        'expires': caduca, 'httpOnly': True, 'secure': True}], f)
+        rutas.append(ruta)
+    return PoolSesiones(rutas) if rutas else None
+
+
+def ejecutar_motor(motor, args):
+    servidor = ServidorFalso(args.perfiles, args.latencia, args.jitter, args.errores, args.limites, args.login,
+                             args.variante, args.semilla).iniciar()
+    argumentos = servidor.argumentos_navegador()
+    METRICAS_POR_DEFECTO.reiniciar(CUBOS_BENCHMARK)
+    with tempfile.TemporaryDirectory() as directorio:
+        sesiones = _sesiones_falsas(args.sesiones, directorio)
+
+        muestreador = MuestreadorRecursos()
+        cpu_inicio = os.times()
+        muestreador.start()
+        inicio = time.perf_counter()
+        http = servidor.cliente_http() if args.http else None
+        try:
+            if motor == 'hilos':
+                with PoolNavegadores(tamano=args.hilos, argumentos=argumentos) as pool:
+                    perfiles = buscar_y_scrapear(CONSULTA, sesiones, pool, objetivo=args.perfiles, http=http)
+            else:
+                async def ejecutar():
+                    try:
+                        async with PoolNavegadoresAsync(tamano=args.navegadores, argumentos=argumentos) as pool:
+                            return await buscar_y_scrapear_async(CONSULTA, sesiones, args.concurrencia,
+                                                                 objetivo=args.perfiles, pool=pool, http=http)
+                    finally:
+                        if http:
+                            await http.cerrar_async()
+                perfiles = asyncio.run(ejecutar())
+        finally:
+            duracion = time.perf_counter() - inicio
+            muestreador.parar()
+            cpu_fin = os.times()
+            servidor.cerrar()
+            if http:
+                http.cerrar()
+
+    resumen = METRICAS_POR_DEFECTO.resumen()
+    latencia = resumen['fases'].get('perfil.total', {})
+    cpu_s = (cpu_fin.user - cpu_inicio.user) + (cpu_fin.system - cpu_inicio.system) + muestreador.cpu_hijos_s()
+    return {
+        'motor': motor,
+        'perfiles': len(perfiles),
+        'segundos': round(duracion, 3),
+        'perfiles_por_s': round(len(perfiles) / duracion, 3),
+        'latencia_p50_s': latencia.get('p50_s'),
+        'latencia_p95_s': latencia.get('p95_s'),
+        'latencia_p99_s': latencia.get('p99_s'),
+        'rss_pico_mb': round(muestreador.pico_kb / 1024, 1),
+        'cpu_s': round(cpu_s, 2),
+        'cpu_ms_por_perfil': round(cpu_s * 1000 / len(perfiles), 1) if perfiles else None,
+        'tasa_escalado_http': resumen['tasa_escalado_http'],
+        'respuestas_servidor': servidor.estadisticas(),
+        'fases': resumen['fases'],
+        'contadores': resumen['contadores'],
+    }
+
+
+def _commit():
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=directorio, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=directorio,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-modificado" if cambios else commit
+
+
+def comparar(anterior, actual):
+    # Variación relativa de cada métrica por motor (positiva = sube)
+    previos = {resultado['motor']: resultado for resultado in anterior['resultados']}
+    lineas = [f"Comparación {anterior.get('commit')} -> {actual.get('commit')}"]
+    for resultado in actual['resultados']:
+        previo = previos.get(resultado['motor'])
+        if previo is None:
+            continue
+        for metrica in METRICAS_COMPARADAS:
+            antes, ahora = previo.get(metrica), resultado.get(metrica)
+            if not antes or ahora is None:
+                continue
+            lineas.append(f"  {resultado['motor']:6} {metrica:18} {antes:>10} -> {ahora:>10} "
+                          f"({(ahora - antes) / antes:+.1%})")
+    return '\n'.join(lineas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de buscar_y_scrapear contra un Google/LinkedIn falso local")
+    parser.add_argument('--perfiles', type=int, default=100, help="Perfiles en los resultados de búsqueda")
+    parser.add_argument('--latencia', type=float, default=0.2, help="Latencia base por respuesta (s)")
+    parser.add_argument('--jitter', type=float, default=0.1, help="Latencia extra aleatoria máxima (s)")
+    parser.add_argument('--errores', type=float, default=0.02, help="Fracción de peticiones de perfil con 500")
+    parser.add_argument('--limites', type=float, default=0.0, help="Fracción de peticiones de perfil con 429")
+    parser.add_argument('--login', type=float, default=0.02, help="Fracción de perfiles redirigidos al login")
+    parser.add_argument('--variante', choices=('mixta', 'publico', 'sesion'), default='mixta',
+                        help="Maquetación de los perfiles servidos")
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--motor', choices=('hilos', 'async', 'ambos'), default='ambos')
+    parser.add_argument('--hilos', type=int, default=5, help="Navegadores/hilos del motor de hilos")
+    parser.add_argument('--navegadores', type=int, default=2, help="Navegadores del motor asíncrono")
+    parser.add_argument('--concurrencia', type=int, default=20, help="Páginas en vuelo del motor asíncrono")
+    parser.add_argument('--sesiones', type=int, default=0, help="Cuentas falsas en el pool de sesiones (0 = sin sesión)")
+    parser.add_argument('--http', action='store_true',
+                        help="Probar los perfiles primero por la vía rápida HTTP (cliente_http.py)")
+    parser.add_argument('--con-limitador', action='store_true',
+                        help="Mantener los límites de peticiones por host (por defecto se desactivan)")
+    parser.add_argument('--salida', default=None, help="Fichero JSON de resultados (por defecto bench_<commit>.json)")
+    parser.add_argument('--comparar', default=None, help="Resultados JSON anteriores con los que comparar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.con_limitador:
+        # Sin límites, el benchmark mide el scraper y no la cadencia configurada
+        LIMITADOR_POR_DEFECTO.configuracion = {}
+
+    motores = ('hilos', 'async') if args.motor == 'ambos' else (args.motor,)
+    commit = _commit()
+    informe = {
+        'commit': commit,
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'escenario': {clave: valor for clave, valor in vars(args).items() if clave not in ('salida', 'comparar')},
+        'resultados': [ejecutar_motor(motor, args) for motor in motores],
+    }
+
+    salida = args.salida or f"bench_{commit or 'sin_git'}.json"
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+    for resultado in informe['resultados']:
+        print(json.dumps({clave: resultado[clave] for clave in ('motor', 'perfiles', 'segundos') + METRICAS_COMPARADAS},
+                         ensure_ascii=False))
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            print(comparar(json.load(f), informe))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Caché de respuestas del LLM en dos niveles: un LRU en memoria y una tabla
+# SQLite persistente con expulsión de las entradas menos usadas.
+#
+# La clave combina el prompt normalizado, el modelo, la temperatura y un hash
+# del prompt de sistema, de modo que cambiar cualquiera de ellos invalida las
+# respuestas anteriores. Con temperatura > 0 la respuesta cacheada es una
+# muestra válida más; el modo determinista (temperatura 0) la hace estable.
+
+RUTA_POR_DEFECTO = 'cache_llm.sqlite'
+CAPACIDAD_MEMORIA = 256
+MAX_ENTRADAS_DISCO = 10_000
+TTL_POR_DEFECTO = 30 * 24 * 3600
+
+
+def normalizar_prompt(prompt):
+    return ' '.join(prompt.split()).casefold()
+
+
+def clave_llm(prompt, modelo, temperatura, system_prompt):
+    hash_sistema = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+    partes = (normalizar_prompt(prompt), modelo, f"{temperatura:.3f}", hash_sistema)
+    return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+
+class CacheLLM:
+    def __init__(self, ruta=RUTA_POR_DEFECTO, capacidad_memoria=CAPACIDAD_MEMORIA,
+                 max_entradas_disco=MAX_ENTRADAS_DISCO, ttl=TTL_POR_DEFECTO):
+        self.ruta = ruta
+        self.capacidad_memoria = capacidad_memoria
+        self.max_entradas_disco = max_entradas_disco
+        self.ttl = ttl
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._estadisticas = {'aciertos_memoria': 0, 'aciertos_disco': 0, 'fallos': 0}
+
+        if self.ruta:
+            with self._conectar() as conexion:
+                conexion.execute("PRAGMA journal_mode=WAL")
+                conexion.execute("""
+                    CREATE TABLE IF NOT EXISTS respuestas (
+                        clave TEXT PRIMARY KEY,
+                        respuesta TEXT NOT NULL,
+                        guardado REAL NOT NULL,
+                        usado REAL NOT NULL
+                    )
+                """)
+                conexion.execute("CREATE INDEX IF NOT EXISTS respuestas_usado ON respuestas (usado)")
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self._estadisticas['aciertos_memoria'] += 1
+                return self._memoria[clave]
+
+        respuesta = self._leer_disco(clave) if self.ruta else None
+        with self._lock:
+            if respuesta is None:
+                self._estadisticas['fallos'] += 1
+                return None
+            self._estadisticas['aciertos_disco'] += 1
+            self._guardar_memoria(clave, respuesta)
+        return respuesta
+
+    def guardar(self, clave, respuesta):
+        with self._lock:
+            self._guardar_memoria(clave, respuesta)
+        if self.ruta:
+            self._escribir_disco(clave, respuesta)
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._estadisticas, entradas_memoria=len(self._memoria))
+
+    def _guardar_memoria(self, clave, respuesta):
+        self._memoria[clave] = respuesta
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.capacidad_memoria:
+            self._memoria.popitem(last=False)
+
+    def _leer_disco(self, clave):
+        ahora = time.time()
+        try:
+            with self._conectar() as conexion:
+                fila = conexion.execute(
+                    "SELECT respuesta FROM respuestas WHERE clave = ? AND guardado > ?",
+                    (clave, ahora - self.ttl),
+                ).fetchone()
+                if fila:
+                    conexion.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo leer la caché del LLM: {e}")
+            return None
+        return fila[0] if fila else None
+
+    def _escribir_disco(self, clave, respuesta):
+        ahora = time.time()
+        try:
+            with self._conectar() as conexion:
+                conexion.execute(
+                    "INSERT OR REPLACE INTO respuestas (clave, respuesta, guardado, usado) VALUES (?, ?, ?, ?)",
+                    (clave, respuesta, ahora, ahora),
+                )
+                # Expulsar las entradas caducadas y las menos usadas por encima del límite
+                conexion.execute("DELETE FROM respuestas WHERE guardado <= ?", (ahora - self.ttl,))
+                conexion.execute(
+                    "DELETE FROM respuestas WHERE clave IN "
+                    "(SELECT clave FROM respuestas ORDER BY usado DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entradas_disco,),
+                )
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo escribir en la caché del LLM: {e}")
+
+    def _conectar(self):
+        # Conexión corta por operación: la caché se consulta una vez por búsqueda
+        conexion = sqlite3.connect(self.ruta, timeout=30)
+        return _Transaccion(conexion)
+
+
+class _Transaccion:
+    # Como "with sqlite3.connect(...)" pero cerrando además la conexión
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        return self.conexion
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conexion.commit()
+            else:
+                self.conexion.rollback()
+        finally:
+            self.conexion.close()
+
+
+def completar_con_cache(crear_cliente, cache, modelo, system_prompt, prompt, temperatura, max_tokens,
+                        plantilla_usuario="{prompt}"):
+    # crear_cliente() devuelve el cliente de OpenAI y solo se llama si la
+    # caché no tiene la respuesta: un acierto no necesita OPENAI_API_KEY
+    clave = clave_llm(prompt, modelo, temperatura, system_prompt + plantilla_usuario) if cache else None
+    if cache:
+        respuesta = cache.obtener(clave)
+        if respuesta is not None:
+            logging.info("Consulta de búsqueda servida desde la caché del LLM")
+            return respuesta
+
+    response = crear_cliente().chat.completions.create(
+        model=modelo,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": plantilla_usuario.format(prompt=prompt)}
+        ],
+        max_tokens=max_tokens,
+        temperature=temperatura
+    )
+    respuesta = response.choices[0].message.content
+    if cache:
+        cache.guardar(clave, respuesta)
+    return respuesta
@@ -0,0 +1,181 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from perfiles import Perfil
+from urls import normalizar_url_perfil
+
+# Caché persistente de perfiles en SQLite, con clave la URL canónica.
+#
+# La base usa WAL para que varios hilos y procesos lean y escriban a la vez.
+# Además de los perfiles extraídos se guardan resultados negativos (muro de
+# login, perfil inexistente) con un TTL más corto, para no volver a pedirlos
+# en cada ejecución.
+#
+# La tabla seguimiento acompaña a cada perfil durante toda su vida (purgar()
+# no la toca): huella del contenido (Perfil.huella), primera y última
+# obtención, visitas y cambios observados. Con ella refresco.py estima la
+# tasa de cambio de cada perfil y decide cuáles volver a visitar.
+
+RUTA_POR_DEFECTO = 'cache_perfiles.sqlite'
+TTL_POR_DEFECTO = 7 * 24 * 3600
+TTL_NEGATIVO_POR_DEFECTO = 24 * 3600
+
+ESTADO_OK = 'ok'
+
+
+class CachePerfiles:
+    def __init__(self, ruta=RUTA_POR_DEFECTO, ttl=TTL_POR_DEFECTO, ttl_negativo=TTL_NEGATIVO_POR_DEFECTO):
+        self.ruta = ruta
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._estadisticas = {'aciertos': 0, 'aciertos_negativos': 0, 'fallos': 0, 'escrituras': 0}
+
+        conexion = self._conexion()
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS perfiles (
+                url TEXT PRIMARY KEY,
+                estado TEXT NOT NULL,
+                datos TEXT,
+                guardado REAL NOT NULL,
+                expira REAL NOT NULL
+            )
+        """)
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS seguimiento (
+                url TEXT PRIMARY KEY,
+                estado TEXT NOT NULL,
+                huella TEXT,
+                primera REAL NOT NULL,
+                obtenido REAL NOT NULL,
+                visitas INTEGER NOT NULL,
+                cambios INTEGER NOT NULL
+            )
+        """)
+        conexion.commit()
+        self._iniciar_seguimiento(conexion)
+
+    def obtener(self, url):
+        # Devuelve {'estado': ..., 'perfil': ...} o None si no hay entrada vigente
+        fila = self._conexion().execute(
+            "SELECT estado, datos FROM perfiles WHERE url = ? AND expira > ?",
+            (normalizar_url_perfil(url), time.time()),
+        ).fetchone()
+        with self._lock:
+            if fila is None:
+                self._estadisticas['fallos'] += 1
+                return None
+            estado, datos = fila
+            self._estadisticas['aciertos' if estado == ESTADO_OK else 'aciertos_negativos'] += 1
+        return {'estado': estado, 'perfil': Perfil.desde_dict(json.loads(datos)) if datos else None}
+
+    def guardar(self, url, perfil):
+        self._escribir(url, ESTADO_OK, json.dumps(perfil.como_dict(), ensure_ascii=False), self.ttl, perfil.huella())
+
+    def guardar_negativo(self, url, motivo):
+        self._escribir(url, motivo, None, self.ttl_negativo)
+
+    def seguimiento(self, url):
+        # {'estado', 'huella', 'primera', 'obtenido', 'visitas', 'cambios'} o None
+        fila = self._conexion().execute(
+            "SELECT estado, huella, primera, obtenido, visitas, cambios FROM seguimiento WHERE url = ?",
+            (normalizar_url_perfil(url),),
+        ).fetchone()
+        return dict(zip(('estado', 'huella', 'primera', 'obtenido', 'visitas', 'cambios'), fila)) if fila else None
+
+    def mas_obsoletos(self, n, ventana_previa, intervalo_minimo, ahora=None):
+        # Los n perfiles con más probabilidad de haber cambiado desde su última
+        # obtención. Con tasa = (cambios + 1) / (tiempo observado + ventana_previa),
+        # P(cambio) = 1 - exp(-tasa * edad) crece con tasa * edad, así que se
+        # ordena por ese producto sin necesitar exp() en SQLite. Solo entran
+        # los perfiles que se llegaron a extraer alguna vez
+        ahora = ahora or time.time()
+        return self._conexion().execute(
+            "SELECT url, estado, huella, obtenido, visitas, cambios, "
+            "(cambios + 1.0) / (obtenido - primera + ?) * (? - obtenido) AS obsolescencia "
+            "FROM seguimiento WHERE huella IS NOT NULL AND obtenido <= ? ORDER BY obsolescencia DESC LIMIT ?",
+            (ventana_previa, ahora, ahora - intervalo_minimo, n),
+        ).fetchall()
+
+    def purgar(self):
+        conexion = self._conexion()
+        borradas = conexion.execute("DELETE FROM perfiles WHERE expira <= ?", (time.time(),)).rowcount
+        conexion.commit()
+        return borradas
+
+    def estadisticas(self):
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+        consultas = estadisticas['aciertos'] + estadisticas['aciertos_negativos'] + estadisticas['fallos']
+        estadisticas['tasa_aciertos'] = round((consultas - estadisticas['fallos']) / consultas, 3) if consultas else 0.0
+        return estadisticas
+
+    def _escribir(self, url, estado, datos, ttl, huella=None):
+        ahora = time.time()
+        url = normalizar_url_perfil(url)
+        conexion = self._conexion()
+        try:
+            conexion.execute(
+                "INSERT OR REPLACE INTO perfiles (url, estado, datos, guardado, expira) VALUES (?, ?, ?, ?, ?)",
+                (url, estado, datos, ahora, ahora + ttl),
+            )
+            # Un cambio es una huella distinta de la anterior; los resultados
+            # negativos conservan la última huella conocida
+            conexion.execute(
+                "INSERT INTO seguimiento (url, estado, huella, primera, obtenido, visitas, cambios) "
+                "VALUES (?, ?, ?, ?, ?, 1, 0) "
+                "ON CONFLICT (url) DO UPDATE SET estado = excluded.estado, "
+                "cambios = cambios + (excluded.huella IS NOT NULL AND huella IS NOT NULL AND excluded.huella != huella), "
+                "huella = COALESCE(excluded.huella, huella), obtenido = excluded.obtenido, visitas = visitas + 1",
+                (url, estado, huella, ahora, ahora),
+            )
+            conexion.commit()
+        except sqlite3.Error as e:
+            logging.error(f"No se pudo guardar {url} en la caché: {e}")
+            return
+        with self._lock:
+            self._estadisticas['escrituras'] += 1
+
+    def _iniciar_seguimiento(self, conexion):
+        # Cachés anteriores al seguimiento: una fila por perfil con su huella
+        if conexion.execute("SELECT 1 FROM seguimiento LIMIT 1").fetchone() or \
+                not conexion.execute("SELECT 1 FROM perfiles LIMIT 1").fetchone():
+            return
+        filas = []
+        for url, estado, datos, guardado in conexion.execute("SELECT url, estado, datos, guardado FROM perfiles"):
+            huella = Perfil.desde_dict(json.loads(datos)).huella() if datos else None
+            filas.append((url, estado, huella, guardado, guardado))
+        with conexion:
+            conexion.executemany(
+                "INSERT OR IGNORE INTO seguimiento (url, estado, huella, primera, obtenido, visitas, cambios) "
+                "VALUES (?, ?, ?, ?, ?, 1, 0)", filas)
+        logging.info(f"Seguimiento iniciado con {len(filas)} perfiles de la caché")
+
+    def _conexion(self):
+        # sqlite3 no permite compartir conexiones entre hilos: una por hilo
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            conexion.execute("PRAGMA busy_timeout=30000")
+            self._local.conexion = conexion
+        return conexion
+
+
+def consultar_cache(link, cache, refrescar=False):
+    # Devuelve (True, perfil) si la caché resuelve el link -perfil es None para
+    # las entradas negativas vigentes- o (False, None) si hay que scrapearlo
+    if cache is None or refrescar:
+        return False, None
+
+    entrada = cache.obtener(link)
+    if entrada is None:
+        return False, None
+    if entrada['perfil'] is None:
+        logging.info(f"Perfil {link} omitido por resultado negativo en caché ({entrada['estado']})")
+    else:
+        logging.info(f"Perfil {link} servido desde la caché")
+    return True, entrada['perfil']
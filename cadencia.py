@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import urllib.parse
+from collections import deque
+from metricas import METRICAS_POR_DEFECTO
+
+# Limitador de peticiones por host compartido por todos los trabajadores del
+# proceso (hilos o corrutinas).
+#
+# Cada host tiene un token bucket cuya tasa se ajusta con AIMD: sube de forma
+# aditiva con cada página servida sin problemas y se reduce a la mitad ante
+# un 429, una redirección al login o un captcha, pausando además el host un
+# tiempo de enfriamiento. Los reintentos de una misma URL usan backoff
+# exponencial con jitter completo.
+#
+# Además, un disyuntor por host vigila la proporción de bloqueos en una
+# ventana deslizante: si se dispara, el host queda abierto (todos los
+# trabajadores esperan) durante un tiempo que se duplica con cada recaída;
+# después deja pasar una sola petición de sonda y se cierra si tiene éxito.
+
+# host: (tasa inicial, tasa mínima, tasa máxima, ráfaga) en peticiones/s
+CONFIGURACION_POR_DEFECTO = {
+    'www.google.com': (0.5, 0.05, 1.0, 1),
+    'www.linkedin.com': (1.0, 0.1, 3.0, 2),
+    'es.linkedin.com': (1.0, 0.1, 3.0, 2),
+}
+# Hosts no configurados (p. ej. servidores locales de pruebas) no se limitan
+CONFIGURACION_OTROS = None
+
+INCREMENTO_ADITIVO = 0.05   # peticiones/s que se suman por cada éxito
+FACTOR_REDUCCION = 0.5      # multiplicador de la tasa ante un bloqueo
+ENFRIAMIENTO_S = 30.0       # pausa del host tras un bloqueo
+VENTANA_BLOQUEO_S = 10.0    # los bloqueos dentro de esta ventana cuentan como uno
+JITTER = 0.3                # fracción aleatoria añadida a cada espera
+
+VENTANA_DISYUNTOR_S = 120.0   # ventana de resultados que mira el disyuntor
+MUESTRAS_MINIMAS_DISYUNTOR = 10
+UMBRAL_DISYUNTOR = 0.3        # proporción de bloqueos que lo abre
+APERTURA_DISYUNTOR_S = 120.0  # primera apertura; se duplica con cada recaída
+APERTURA_MAXIMA_S = 30 * 60.0
+SONDA_MAXIMA_S = 90.0         # si la sonda no informa en este tiempo se deja pasar otra
+INTERVALO_SONDEO_S = 1.0
+
+BACKOFF_BASE_S = 2.0
+BACKOFF_MAXIMO_S = 60.0
+
+
+def retraso_reintento(intento, base=BACKOFF_BASE_S, maximo=BACKOFF_MAXIMO_S):
+    # Backoff exponencial con jitter completo: U(0, min(maximo, base * 2^intento))
+    return random.uniform(0, min(maximo, base * 2 ** intento))
+
+
+class _Cubo:
+    def __init__(self, tasa, tasa_minima, tasa_maxima, rafaga):
+        self.tasa = tasa
+        self.tasa_minima = tasa_minima
+        self.tasa_maxima = tasa_maxima
+        self.rafaga = rafaga
+        self.tokens = float(rafaga)
+        self.ultimo = time.monotonic()
+        self.pausado_hasta = 0.0
+        self.ultimo_bloqueo = 0.0
+        self.exitos = 0
+        self.bloqueos = {}
+        self.disyuntor = Disyuntor()
+
+    def reservar(self, ahora):
+        self.tokens = min(self.rafaga, self.tokens + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+        # Los tokens pueden quedar en negativo: cada llamante reserva su turno
+        self.tokens -= 1
+        espera = -self.tokens / self.tasa if self.tokens < 0 else 0.0
+        return max(espera, self.pausado_hasta - ahora)
+
+
+class Disyuntor:
+    # Estados: cerrado (normal), abierto (nadie pasa) y semiabierto (pasa una sonda)
+    def __init__(self):
+        self.estado = 'cerrado'
+        self.resultados = deque()
+        self.abierto_hasta = 0.0
+        self.apertura = APERTURA_DISYUNTOR_S
+        self.sonda_desde = None
+        self.aperturas = 0
+
+    def permitir(self, ahora):
+        # 0 si la petición puede seguir; si no, cuánto esperar antes de volver a preguntar
+        if self.estado == 'abierto':
+            if ahora < self.abierto_hasta:
+                return self.abierto_hasta - ahora
+            self.estado = 'semiabierto'
+            self.sonda_desde = None
+        if self.estado == 'semiabierto':
+            if self.sonda_desde is not None and ahora - self.sonda_desde < SONDA_MAXIMA_S:
+                return INTERVALO_SONDEO_S
+            self.sonda_desde = ahora
+        return 0.0
+
+    def registrar(self, ahora, bloqueado):
+        # Devuelve True si este resultado abre el disyuntor
+        if self.estado == 'semiabierto':
+            if bloqueado:
+                self.apertura = min(APERTURA_MAXIMA_S, self.apertura * 2)
+                return self._abrir(ahora)
+            self.estado = 'cerrado'
+            self.apertura = APERTURA_DISYUNTOR_S
+            self.resultados.clear()
+            return False
+        if self.estado == 'abierto':
+            return False
+
+        self.resultados.append((ahora, bloqueado))
+        while self.resultados and ahora - self.resultados[0][0] > VENTANA_DISYUNTOR_S:
+            self.resultados.popleft()
+        bloqueos = sum(1 for _, b in self.resultados if b)
+        if len(self.resultados) >= MUESTRAS_MINIMAS_DISYUNTOR and bloqueos / len(self.resultados) >= UMBRAL_DISYUNTOR:
+            return self._abrir(ahora)
+        return False
+
+    def _abrir(self, ahora):
+        self.estado = 'abierto'
+        self.abierto_hasta = ahora + self.apertura
+        self.resultados.clear()
+        self.aperturas += 1
+        return True
+
+
+class LimitadorHosts:
+    def __init__(self, configuracion=None, configuracion_otros=CONFIGURACION_OTROS):
+        self.configuracion = configuracion if configuracion is not None else CONFIGURACION_POR_DEFECTO
+        self.configuracion_otros = configuracion_otros
+        self._cubos = {}
+        self._lock = threading.Lock()
+
+    def reservar(self, url):
+        # Reserva un turno para el host de la URL y devuelve cuánto hay que
+        # esperar. Con el disyuntor abierto no reserva nada y devuelve un
+        # valor negativo: hay que esperar -espera y volver a preguntar
+        host = urllib.parse.urlparse(url).hostname or ''
+        with self._lock:
+            cubo = self._cubo(host)
+            if cubo is None:
+                return 0.0
+            ahora = time.monotonic()
+            bloqueado = cubo.disyuntor.permitir(ahora)
+            if bloqueado:
+                return -bloqueado
+            espera = cubo.reservar(ahora)
+        return espera * (1 + random.uniform(0, JITTER)) if espera > 0 else 0.0
+
+    def esperar(self, url):
+        while True:
+            espera = self.reservar(url)
+            if espera >= 0:
+                break
+            time.sleep(-espera)
+        if espera > 0:
+            time.sleep(espera)
+
+    async def esperar_async(self, url):
+        while True:
+            espera = self.reservar(url)
+            if espera >= 0:
+                break
+            await asyncio.sleep(-espera)
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    def registrar_exito(self, url):
+        host = urllib.parse.urlparse(url).hostname or ''
+        with self._lock:
+            cubo = self._cubo(host)
+            if cubo is None:
+                return
+            cubo.exitos += 1
+            cubo.tasa = min(cubo.tasa_maxima, cubo.tasa + INCREMENTO_ADITIVO)
+            if cubo.disyuntor.estado == 'semiabierto':
+                logging.info(f"Disyuntor de {host} cerrado: la sonda tuvo éxito")
+            cubo.disyuntor.registrar(time.monotonic(), False)
+
+    def registrar_bloqueo(self, url, motivo):
+        host = urllib.parse.urlparse(url).hostname or ''
+        with self._lock:
+            cubo = self._cubo(host)
+            if cubo is None:
+                return
+            cubo.bloqueos[motivo] = cubo.bloqueos.get(motivo, 0) + 1
+            ahora = time.monotonic()
+            if cubo.disyuntor.registrar(ahora, True):
+                METRICAS_POR_DEFECTO.contar('disyuntor_aperturas_total', host=host)
+                logging.warning(f"Disyuntor de {host} abierto {cubo.disyuntor.apertura:.0f} s: demasiados bloqueos; "
+                                f"todos los trabajadores esperan")
+            # Las peticiones que ya estaban en vuelo suelen bloquearse a la vez:
+            # solo la primera de la ventana reduce la tasa
+            if ahora - cubo.ultimo_bloqueo < VENTANA_BLOQUEO_S:
+                return
+            cubo.ultimo_bloqueo = ahora
+            cubo.tasa = max(cubo.tasa_minima, cubo.tasa * FACTOR_REDUCCION)
+            cubo.pausado_hasta = ahora + ENFRIAMIENTO_S
+            cubo.tokens = min(cubo.tokens, 0.0)
+            tasa = cubo.tasa
+        logging.warning(f"Bloqueo ({motivo}) en {host}: tasa reducida a {tasa:.2f} peticiones/s y pausa de {ENFRIAMIENTO_S:.0f} s")
+
+    def tasas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    'tasa': round(cubo.tasa, 3),
+                    'tokens': round(cubo.tokens, 2),
+                    'exitos': cubo.exitos,
+                    'bloqueos': dict(cubo.bloqueos),
+                    'pausa_restante_s': round(max(0.0, cubo.pausado_hasta - ahora), 1),
+                    'disyuntor': cubo.disyuntor.estado,
+                    'aperturas_disyuntor': cubo.disyuntor.aperturas,
+                }
+                for host, cubo in self._cubos.items()
+            }
+
+    def _cubo(self, host):
+        cubo = self._cubos.get(host)
+        if cubo is None:
+            parametros = self.configuracion.get(host, self.configuracion_otros)
+            if parametros is None:
+                return None
+            cubo = self._cubos[host] = _Cubo(*parametros)
+        return cubo
+
+
+LIMITADOR_POR_DEFECTO = LimitadorHosts()
@@ -0,0 +1,205 @@
+import asyncio
+import http.cookiejar
+import importlib.util
+import logging
+import random
+import threading
+from cadencia import LIMITADOR_POR_DEFECTO
+from extraccion import extraer_perfil_html
+from fallos import clasificar_respuesta, detectar_muro_html, resolver_fallo
+from metricas import METRICAS_POR_DEFECTO
+from pool_navegadores import USER_AGENTS
+from sesiones import OK
+
+# Vía rápida HTTP antes del navegador.
+#
+# El HTML de los perfiles públicos (.top-card-layout__*) ya viene renderizado
+# desde el servidor. Un cliente HTTP/2 con keep-alive y un pool de conexiones
+# compartido lo descarga y extraer_perfil_html() lo lee sin ejecutar
+# JavaScript. Solo se escala a Playwright si la respuesta es un muro
+# (authwall, captcha, 999...), un error o le faltan campos obligatorios. Los
+# resultados definitivos (404, perfil no disponible) se resuelven aquí mismo,
+# con su entrada en la caché negativa.
+#
+# Las cookies de la sesión en uso van en la cabecera Cookie de cada petición
+# y el cliente no guarda las que recibe: el pool de conexiones se comparte
+# entre cuentas sin mezclar sus cookies. El parseo (BeautifulSoup) se hace
+# fuera del bucle de eventos.
+#
+# Un muro visto por HTTP no frena el host en cadencia.py (suele deberse a que
+# el cliente no es un navegador, y el navegador lo va a intentar enseguida);
+# un 429 sí. La tasa de escalado y sus motivos se cuentan en
+# escalados_total{motivo} y aparecen en estadisticas() y en el resumen de
+# métricas.
+
+CONEXIONES_POR_DEFECTO = 20
+TIMEOUT_S = 20.0
+CABECERAS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
+}
+
+
+def _importar_httpx():
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("La vía rápida HTTP requiere el paquete 'httpx[http2]'") from None
+    return httpx
+
+
+def cabecera_cookies(estado, host):
+    # Cabecera Cookie con las cookies del storage_state válidas para el host
+    partes = []
+    for cookie in estado.get('cookies', []):
+        dominio = cookie.get('domain', '').lstrip('.')
+        if dominio and (host == dominio or host.endswith('.' + dominio)):
+            partes.append(f"{cookie['name']}={cookie['value']}")
+    return '; '.join(partes)
+
+
+class ClienteHTTP:
+    def __init__(self, conexiones=CONEXIONES_POR_DEFECTO, timeout=TIMEOUT_S, http2=True, user_agents=None,
+                 transporte=None, transporte_async=None):
+        self.httpx = _importar_httpx()
+        if http2 and importlib.util.find_spec('h2') is None:
+            logging.info("Sin el paquete 'h2' la vía rápida usa HTTP/1.1 con keep-alive")
+            http2 = False
+        self.user_agents = user_agents or USER_AGENTS
+        # transporte/transporte_async sustituyen al de httpx (p. ej. para apuntar a un servidor local)
+        self._opciones = {
+            'http2': http2,
+            'limits': self.httpx.Limits(max_connections=conexiones, max_keepalive_connections=conexiones),
+            'timeout': timeout,
+            'follow_redirects': True,
+            'headers': CABECERAS,
+        }
+        self._transporte = transporte
+        self._transporte_async = transporte_async
+        self._cliente = None
+        self._cliente_async = None
+        self._lock = threading.Lock()
+        self._estadisticas = {'peticiones': 0, 'resueltas': 0, 'perfiles': 0, 'bytes': 0, 'escaladas': {}}
+
+    def intentar(self, url, uso, cache=None, archivo=None):
+        # Devuelve (True, perfil) si la vía rápida resolvió la URL -perfil es
+        # None para los resultados definitivos- o (False, None) si hay que
+        # escalar al navegador
+        with METRICAS_POR_DEFECTO.tramo('perfil', 'http') as tramo:
+            LIMITADOR_POR_DEFECTO.esperar(url)
+            self._contar('peticiones')
+            try:
+                respuesta = self._sincrono().get(url, headers=self._cabeceras(url, uso['sesion']))
+            except self.httpx.HTTPError as e:
+                logging.debug(f"Vía rápida fallida en {url}: {e}")
+                return self._escalar(tramo, url, 'red')
+            return self._resolver(tramo, url, respuesta, uso, cache, archivo)
+
+    async def intentar_async(self, url, uso, cache=None, archivo=None):
+        with METRICAS_POR_DEFECTO.tramo('perfil', 'http') as tramo:
+            await LIMITADOR_POR_DEFECTO.esperar_async(url)
+            self._contar('peticiones')
+            try:
+                respuesta = await self._asincrono().get(url, headers=self._cabeceras(url, uso['sesion']))
+            except self.httpx.HTTPError as e:
+                logging.debug(f"Vía rápida fallida en {url}: {e}")
+                return self._escalar(tramo, url, 'red')
+            return await asyncio.to_thread(self._resolver, tramo, url, respuesta, uso, cache, archivo)
+
+    def estadisticas(self):
+        with self._lock:
+            estadisticas = dict(self._estadisticas, escaladas=dict(self._estadisticas['escaladas']))
+        peticiones = estadisticas['peticiones']
+        escaladas = sum(estadisticas['escaladas'].values())
+        estadisticas['tasa_escalado'] = round(escaladas / peticiones, 3) if peticiones else None
+        return estadisticas
+
+    def cerrar(self):
+        if self._cliente:
+            self._cliente.close()
+            self._cliente = None
+
+    async def cerrar_async(self):
+        self.cerrar()
+        if self._cliente_async:
+            await self._cliente_async.aclose()
+            self._cliente_async = None
+
+    def _resolver(self, tramo, url, respuesta, uso, cache, archivo):
+        estado = respuesta.status_code
+        url_final = str(respuesta.url)
+        html = respuesta.text
+        with self._lock:
+            self._estadisticas['bytes'] += len(respuesta.content)
+        METRICAS_POR_DEFECTO.contar('bytes_descargados_total', len(respuesta.content))
+
+        fallo = clasificar_respuesta(estado, url_final)
+        if fallo is None and estado == 200:
+            fallo = detectar_muro_html(html, url_final)
+        if fallo is not None and not fallo.reintentable:
+            # 404, perfil no disponible: el navegador vería lo mismo
+            tramo.resultado = resolver_fallo(fallo, url, uso, cache)
+            self._contar('resueltas')
+            return True, None
+        if fallo is not None:
+            if fallo.motivo == '429':
+                LIMITADOR_POR_DEFECTO.registrar_bloqueo(url, fallo.motivo)
+            return self._escalar(tramo, url, fallo.motivo)
+        if estado != 200:
+            return self._escalar(tramo, url, f"http_{estado}")
+
+        perfil = extraer_perfil_html(html, url=url)
+        if perfil is None:
+            # Maquetación que se pinta con JavaScript o campos que no están en el HTML
+            return self._escalar(tramo, url, 'campos')
+
+        LIMITADOR_POR_DEFECTO.registrar_exito(url)
+        uso['resultado'] = OK
+        if archivo:
+            archivo.guardar(url, html, 'perfil', estado)
+        if cache:
+            cache.guardar(url, perfil)
+        self._contar('resueltas')
+        self._contar('perfiles')
+        logging.info(f"Perfil extraído por HTTP: {url}")
+        return True, perfil
+
+    def _escalar(self, tramo, url, motivo):
+        tramo.resultado = 'escalado'
+        METRICAS_POR_DEFECTO.contar('escalados_total', motivo=motivo)
+        with self._lock:
+            escaladas = self._estadisticas['escaladas']
+            escaladas[motivo] = escaladas.get(motivo, 0) + 1
+        logging.info(f"Perfil {url} escalado al navegador ({motivo})")
+        return False, None
+
+    def _contar(self, clave):
+        with self._lock:
+            self._estadisticas[clave] += 1
+
+    def _cabeceras(self, url, sesion):
+        cabeceras = {'User-Agent': random.choice(self.user_agents)}
+        if sesion:
+            cookies = cabecera_cookies(sesion.estado, self.httpx.URL(url).host)
+            if cookies:
+                cabeceras['Cookie'] = cookies
+        return cabeceras
+
+    def _sincrono(self):
+        with self._lock:
+            if self._cliente is None:
+                self._cliente = self.httpx.Client(cookies=_sin_cookies(), transport=self._transporte,
+                                                  **self._opciones)
+            return self._cliente
+
+    def _asincrono(self):
+        # httpx.AsyncClient queda ligado al bucle de eventos en el que se usa por primera vez
+        if self._cliente_async is None:
+            self._cliente_async = self.httpx.AsyncClient(cookies=_sin_cookies(), transport=self._transporte_async,
+                                                         **self._opciones)
+        return self._cliente_async
+
+
+def _sin_cookies():
+    # Tarro que rechaza todas las cookies recibidas
+    return http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
@@ -0,0 +1,635 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from cache_llm import CacheLLM
+from cache_perfiles import RUTA_POR_DEFECTO as RUTA_CACHE, CachePerfiles, consultar_cache
+from cadencia import retraso_reintento
+from cliente_http import ClienteHTTP
+from consulta_llm import generate_linkedin_search_query
+from demonio_navegador import resolver_cdp
+from fallos import clasificar_error
+from lote import leer_lineas
+from metricas import METRICAS_POR_DEFECTO, servir_metricas
+from motor_async import intentar_perfil_async, iterar_plan_async
+from perfiles import Perfil
+from plan_consultas import MAX_SUBCONSULTAS, MODOS, planificar
+from pool_navegadores import PoolNavegadoresAsync
+from salida_columnar import abrir_salida
+from urls import RESULTADOS_POR_DEFECTO, extraer_url_perfil
+from vistos import ConjuntoVistos
+
+# Cola de trabajo duradera para repartir el scraping de perfiles entre varios
+# procesos y máquinas.
+#
+# El coordinador encola URLs canónicas de perfil; cada trabajador (un proceso
+# con su propio navegador) arrienda tareas con un tiempo de visibilidad,
+# intenta cada perfil una vez y confirma el resultado. Si un trabajador muere,
+# la tarea vuelve a ser visible al vencer el arriendo. Los fallos
+# reintentables se reprograman con backoff y, agotados los intentos, la tarea
+# pasa a la cola de muertas. Los reintentos los lleva la cola, no el bucle
+# local de scrape_linkedin_profile_async.
+#
+# Implementaciones: ColaSQLite (un host, o varios con el fichero en un disco
+# compartido) y ColaRedis (cualquier servidor compatible con Redis y Lua).
+# abrir_cola() elige una u otra según la dirección:
+#
+#     python cola_trabajo.py --cola cola.sqlite encolar --urls urls.txt
+#     python cola_trabajo.py --cola redis://localhost:6379/0 trabajador --procesos 8
+#     python cola_trabajo.py --cola cola.sqlite estado
+#     python cola_trabajo.py --cola cola.sqlite resultados --salida perfiles.jsonl
+
+RUTA_POR_DEFECTO = 'cola_perfiles.sqlite'
+VISIBILIDAD_S = 300
+MAX_INTENTOS = 3
+ESPERA_COLA_VACIA_S = 2.0
+TAMANO_LOTE_ENCOLAR = 500
+
+PENDIENTE = 'pendiente'
+ARRENDADA = 'arrendada'
+HECHA = 'hecha'
+MUERTA = 'muerta'
+
+
+class ColaTrabajo(ABC):
+    # Interfaz común. Una tarea es un dict {'url', 'token', 'intentos'}; el
+    # token identifica el arriendo y solo quien lo tiene puede confirmarla
+    @abstractmethod
+    def encolar(self, urls):
+        # Añade las URLs que no estuvieran ya en la cola y devuelve cuántas
+        ...
+
+    @abstractmethod
+    def arrendar(self, trabajador, n=1):
+        ...
+
+    @abstractmethod
+    def confirmar(self, tarea, resultado):
+        ...
+
+    @abstractmethod
+    def fallar(self, tarea, error, definitivo=False):
+        # Reprograma la tarea con backoff o la manda a muertas; devuelve el nuevo estado
+        ...
+
+    @abstractmethod
+    def activas(self):
+        # Tareas pendientes o arrendadas
+        ...
+
+    @abstractmethod
+    def estadisticas(self):
+        ...
+
+    @abstractmethod
+    def resultados(self):
+        # Genera (url, perfil) de las tareas hechas; perfil es None si no había datos
+        ...
+
+    @abstractmethod
+    def muertas(self):
+        # Genera (url, error)
+        ...
+
+    @abstractmethod
+    def reintentar_muertas(self):
+        ...
+
+
+class ColaSQLite(ColaTrabajo):
+    def __init__(self, ruta=RUTA_POR_DEFECTO, visibilidad=VISIBILIDAD_S, max_intentos=MAX_INTENTOS):
+        self.ruta = ruta
+        self.visibilidad = visibilidad
+        self.max_intentos = max_intentos
+        self._local = threading.local()
+
+        conexion = self._conexion()
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS tareas (
+                url TEXT PRIMARY KEY,
+                estado TEXT NOT NULL,
+                intentos INTEGER NOT NULL DEFAULT 0,
+                visible_desde REAL NOT NULL DEFAULT 0,
+                token TEXT,
+                trabajador TEXT,
+                error TEXT,
+                resultado TEXT,
+                actualizado REAL NOT NULL
+            )
+        """)
+        conexion.execute("CREATE INDEX IF NOT EXISTS tareas_visibles ON tareas (estado, visible_desde)")
+        conexion.commit()
+
+    def encolar(self, urls):
+        conexion = self._conexion()
+        ahora = time.time()
+        antes = conexion.total_changes
+        with self._transaccion() as conexion:
+            conexion.executemany(
+                "INSERT OR IGNORE INTO tareas (url, estado, actualizado) VALUES (?, ?, ?)",
+                ((url, PENDIENTE, ahora) for url in urls),
+            )
+        return conexion.total_changes - antes
+
+    def arrendar(self, trabajador, n=1):
+        ahora = time.time()
+        # BEGIN IMMEDIATE: solo un trabajador a la vez elige y marca tareas
+        with self._transaccion() as conexion:
+            # Arriendos vencidos que ya agotaron sus intentos (el trabajador murió con ellos)
+            conexion.execute(
+                "UPDATE tareas SET estado = ?, error = 'visibilidad agotada', token = NULL, actualizado = ? "
+                "WHERE estado = ? AND visible_desde <= ? AND intentos >= ?",
+                (MUERTA, ahora, ARRENDADA, ahora, self.max_intentos),
+            )
+            filas = conexion.execute(
+                "SELECT url, intentos FROM tareas WHERE estado IN (?, ?) AND visible_desde <= ? "
+                "ORDER BY visible_desde LIMIT ?",
+                (PENDIENTE, ARRENDADA, ahora, n),
+            ).fetchall()
+            tareas = []
+            for url, intentos in filas:
+                token = uuid.uuid4().hex
+                conexion.execute(
+                    "UPDATE tareas SET estado = ?, intentos = ?, visible_desde = ?, token = ?, trabajador = ?, "
+                    "actualizado = ? WHERE url = ?",
+                    (ARRENDADA, intentos + 1, ahora + self.visibilidad, token, trabajador, ahora, url),
+                )
+                tareas.append({'url': url, 'token': token, 'intentos': intentos + 1})
+        return tareas
+
+    def confirmar(self, tarea, resultado):
+        with self._transaccion() as conexion:
+            cursor = conexion.execute(
+                "UPDATE tareas SET estado = ?, resultado = ?, token = NULL, error = NULL, actualizado = ? "
+                "WHERE url = ? AND token = ?",
+                (HECHA, json.dumps(resultado.como_dict() if resultado else None, ensure_ascii=False), time.time(), tarea['url'], tarea['token']),
+            )
+        # 0 filas: el arriendo venció y otro trabajador tiene la tarea
+        return cursor.rowcount == 1
+
+    def fallar(self, tarea, error, definitivo=False):
+        ahora = time.time()
+        with self._transaccion() as conexion:
+            fila = conexion.execute(
+                "SELECT intentos FROM tareas WHERE url = ? AND token = ?", (tarea['url'], tarea['token'])
+            ).fetchone()
+            if fila is None:
+                return None
+            if definitivo or fila[0] >= self.max_intentos:
+                estado, visible_desde = MUERTA, ahora
+            else:
+                estado, visible_desde = PENDIENTE, ahora + retraso_reintento(fila[0])
+            conexion.execute(
+                "UPDATE tareas SET estado = ?, visible_desde = ?, token = NULL, error = ?, actualizado = ? "
+                "WHERE url = ?",
+                (estado, visible_desde, str(error), ahora, tarea['url']),
+            )
+        return estado
+
+    def activas(self):
+        return self._conexion().execute(
+            "SELECT COUNT(*) FROM tareas WHERE estado IN (?, ?)", (PENDIENTE, ARRENDADA)
+        ).fetchone()[0]
+
+    def estadisticas(self):
+        estadisticas = {PENDIENTE: 0, ARRENDADA: 0, HECHA: 0, MUERTA: 0}
+        estadisticas.update(self._conexion().execute("SELECT estado, COUNT(*) FROM tareas GROUP BY estado").fetchall())
+        return estadisticas
+
+    def resultados(self):
+        for url, resultado in self._conexion().execute("SELECT url, resultado FROM tareas WHERE estado = ?", (HECHA,)):
+            yield url, Perfil.desde_dict(json.loads(resultado))
+
+    def muertas(self):
+        yield from self._conexion().execute("SELECT url, error FROM tareas WHERE estado = ?", (MUERTA,))
+
+    def reintentar_muertas(self):
+        with self._transaccion() as conexion:
+            return conexion.execute(
+                "UPDATE tareas SET estado = ?, intentos = 0, visible_desde = 0, error = NULL, actualizado = ? "
+                "WHERE estado = ?",
+                (PENDIENTE, time.time(), MUERTA),
+            ).rowcount
+
+    @contextmanager
+    def _transaccion(self):
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield conexion
+        except BaseException:
+            conexion.rollback()
+            raise
+        conexion.commit()
+
+    def _conexion(self):
+        # Una conexión por hilo; isolation_level=None para controlar BEGIN IMMEDIATE a mano
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA busy_timeout=30000")
+            self._local.conexion = conexion
+        return conexion
+
+
+# Scripts Lua: cada operación es atómica en el servidor aunque haya muchos
+# trabajadores. Claves: pendientes (LIST), arrendadas (ZSET url -> vencimiento),
+# tokens, intentos, estado, resultados y muertas (HASH url -> valor)
+_LUA_ENCOLAR = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], 'pendiente') == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_LUA_ARRENDAR = """
+local ahora, vence, n, max_intentos = tonumber(ARGV[1]), ARGV[2], tonumber(ARGV[3]), tonumber(ARGV[5])
+for _, url in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ahora)) do
+    redis.call('ZREM', KEYS[2], url)
+    redis.call('HDEL', KEYS[3], url)
+    if tonumber(redis.call('HGET', KEYS[4], url) or '0') >= max_intentos then
+        redis.call('HSET', KEYS[5], url, 'muerta')
+        redis.call('HSET', KEYS[6], url, 'visibilidad agotada')
+    else
+        redis.call('HSET', KEYS[5], url, 'pendiente')
+        redis.call('RPUSH', KEYS[1], url)
+    end
+end
+local tareas = {}
+for i = 1, n do
+    local url = redis.call('LPOP', KEYS[1])
+    if not url then break end
+    local token = ARGV[4] .. ':' .. i
+    local intentos = redis.call('HINCRBY', KEYS[4], url, 1)
+    redis.call('ZADD', KEYS[2], vence, url)
+    redis.call('HSET', KEYS[3], url, token)
+    redis.call('HSET', KEYS[5], url, 'arrendada')
+    table.insert(tareas, url)
+    table.insert(tareas, token)
+    table.insert(tareas, intentos)
+end
+return tareas
+"""
+
+_LUA_CONFIRMAR = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return 0 end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], 'hecha')
+redis.call('HSET', KEYS[4], ARGV[1], ARGV[3])
+return 1
+"""
+
+# Un fallo reintentable deja la tarea en arrendadas sin token, con vencimiento
+# al final del backoff: el barrido de ARRENDAR la devuelve a pendientes
+_LUA_FALLAR = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then return false end
+redis.call('HDEL', KEYS[2], ARGV[1])
+local intentos = tonumber(redis.call('HGET', KEYS[5], ARGV[1]) or '0')
+if ARGV[6] == '1' or intentos >= tonumber(ARGV[5]) then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    redis.call('HSET', KEYS[3], ARGV[1], 'muerta')
+    redis.call('HSET', KEYS[4], ARGV[1], ARGV[3])
+    return 'muerta'
+end
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+redis.call('HSET', KEYS[3], ARGV[1], 'pendiente')
+return 'pendiente'
+"""
+
+
+class ColaRedis(ColaTrabajo):
+    def __init__(self, url='redis://localhost:6379/0', prefijo='cola_perfiles', visibilidad=VISIBILIDAD_S,
+                 max_intentos=MAX_INTENTOS, cliente=None):
+        if cliente is None:
+            # Importado aquí: solo la cola en Redis (o compatible) lo necesita
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("La cola en Redis requiere el paquete 'redis'") from None
+            cliente = redis.Redis.from_url(url, decode_responses=True)
+        self.cliente = cliente
+        self.visibilidad = visibilidad
+        self.max_intentos = max_intentos
+        self._claves = {nombre: f"{prefijo}:{nombre}" for nombre in
+                        ('pendientes', 'arrendadas', 'tokens', 'intentos', 'estado', 'resultados', 'muertas')}
+        self._encolar = cliente.register_script(_LUA_ENCOLAR)
+        self._arrendar = cliente.register_script(_LUA_ARRENDAR)
+        self._confirmar = cliente.register_script(_LUA_CONFIRMAR)
+        self._fallar = cliente.register_script(_LUA_FALLAR)
+
+    def encolar(self, urls):
+        claves = [self._claves['estado'], self._claves['pendientes']]
+        nuevas = 0
+        lote = []
+        for url in urls:
+            lote.append(url)
+            if len(lote) >= TAMANO_LOTE_ENCOLAR:
+                nuevas += self._encolar_lote(claves, lote)
+                lote = []
+        if lote:
+            nuevas += self._encolar_lote(claves, lote)
+        return nuevas
+
+    def arrendar(self, trabajador, n=1):
+        c = self._claves
+        ahora = time.time()
+        plano = self._arrendar(
+            keys=[c['pendientes'], c['arrendadas'], c['tokens'], c['intentos'], c['estado'], c['muertas']],
+            args=[ahora, ahora + self.visibilidad, n, f"{trabajador}:{uuid.uuid4().hex}", self.max_intentos],
+        )
+        return [{'url': plano[i], 'token': plano[i + 1], 'intentos': int(plano[i + 2])}
+                for i in range(0, len(plano), 3)]
+
+    def confirmar(self, tarea, resultado):
+        c = self._claves
+        return self._confirmar(
+            keys=[c['arrendadas'], c['tokens'], c['estado'], c['resultados']],
+            args=[tarea['url'], tarea['token'], json.dumps(resultado.como_dict() if resultado else None, ensure_ascii=False)],
+        ) == 1
+
+    def fallar(self, tarea, error, definitivo=False):
+        c = self._claves
+        visible_desde = time.time() + retraso_reintento(tarea['intentos'])
+        return self._fallar(
+            keys=[c['arrendadas'], c['tokens'], c['estado'], c['muertas'], c['intentos']],
+            args=[tarea['url'], tarea['token'], str(error), visible_desde, self.max_intentos, '1' if definitivo else '0'],
+        )
+
+    def activas(self):
+        return self.cliente.llen(self._claves['pendientes']) + self.cliente.zcard(self._claves['arrendadas'])
+
+    def estadisticas(self):
+        c = self._claves
+        return {
+            PENDIENTE: self.cliente.llen(c['pendientes']),
+            ARRENDADA: self.cliente.zcard(c['arrendadas']),
+            HECHA: self.cliente.hlen(c['resultados']),
+            MUERTA: self.cliente.hlen(c['muertas']),
+        }
+
+    def resultados(self):
+        for url, resultado in self.cliente.hscan_iter(self._claves['resultados']):
+            yield url, Perfil.desde_dict(json.loads(resultado))
+
+    def muertas(self):
+        yield from self.cliente.hscan_iter(self._claves['muertas'])
+
+    def reintentar_muertas(self):
+        c = self._claves
+        urls = list(self.cliente.hkeys(c['muertas']))
+        if not urls:
+            return 0
+        with self.cliente.pipeline() as pipe:
+            pipe.hdel(c['muertas'], *urls)
+            pipe.hdel(c['intentos'], *urls)
+            pipe.hset(c['estado'], mapping={url: PENDIENTE for url in urls})
+            pipe.rpush(c['pendientes'], *urls)
+            pipe.execute()
+        return len(urls)
+
+    def _encolar_lote(self, claves, lote):
+        with self.cliente.pipeline(transaction=False) as pipe:
+            for url in lote:
+                self._encolar(keys=claves, args=[url], client=pipe)
+            return sum(pipe.execute())
+
+
+def abrir_cola(direccion=RUTA_POR_DEFECTO, **kwargs):
+    # redis://, rediss:// o unix:// -> ColaRedis; cualquier otra cosa es un fichero SQLite
+    if direccion.startswith(('redis://', 'rediss://', 'unix://')):
+        return ColaRedis(direccion, **kwargs)
+    return ColaSQLite(direccion, **kwargs)
+
+
+def nombre_trabajador():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def procesar_tarea(cola, tarea, sesiones, pool, cache, refrescar, http=None):
+    en_cache, perfil = consultar_cache(tarea['url'], cache, refrescar)
+    try:
+        if not en_cache:
+            # La vía rápida solo en el primer arriendo: los reintentos van al navegador
+            perfil = await intentar_perfil_async(tarea['url'], sesiones, pool, cache=cache,
+                                                 http=http if tarea['intentos'] == 1 else None)
+    except Exception as e:
+        # Los fallos no reintentables van directamente a muertas
+        fallo = clasificar_error(e)
+        estado = await asyncio.to_thread(cola.fallar, tarea, e, not fallo.reintentable)
+        if estado != MUERTA:
+            METRICAS_POR_DEFECTO.reintento('perfil', fallo)
+        logging.error(f"Error en {tarea['url']} (intento {tarea['intentos']}): {e}. Tarea {estado}")
+        return
+    if not await asyncio.to_thread(cola.confirmar, tarea, perfil):
+        logging.warning(f"El arriendo de {tarea['url']} venció antes de confirmarla; resultado descartado")
+
+
+async def trabajar(cola, sesiones=None, concurrencia=4, cache=None, refrescar=False, salir_si_vacia=False, cdp=None,
+                   http=None):
+    # Bucle de un trabajador: mantiene hasta `concurrencia` tareas en vuelo
+    # sobre un único navegador hasta recibir SIGTERM/SIGINT o, con
+    # salir_si_vacia, hasta que no queden tareas activas
+    nombre = nombre_trabajador()
+    parar = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    # El bucle solo atiende señales en Unix y desde el hilo principal
+    if os.name == 'posix' and threading.current_thread() is threading.main_thread():
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(senal, parar.set)
+
+    en_vuelo = set()
+    procesadas = 0
+    async with PoolNavegadoresAsync(tamano=1, cdp=cdp) as pool:
+        while not parar.is_set():
+            huecos = concurrencia - len(en_vuelo)
+            tareas = await asyncio.to_thread(cola.arrendar, nombre, huecos) if huecos else []
+            for tarea in tareas:
+                en_vuelo.add(asyncio.create_task(procesar_tarea(cola, tarea, sesiones, pool, cache, refrescar, http)))
+
+            if en_vuelo:
+                hechas, en_vuelo = await asyncio.wait(en_vuelo, timeout=ESPERA_COLA_VACIA_S,
+                                                      return_when=asyncio.FIRST_COMPLETED)
+                procesadas += len(hechas)
+            elif salir_si_vacia and not await asyncio.to_thread(cola.activas):
+                break
+            else:
+                try:
+                    await asyncio.wait_for(parar.wait(), ESPERA_COLA_VACIA_S)
+                except asyncio.TimeoutError:
+                    pass
+
+        # Terminar lo que ya está arrendado en lugar de esperar a que venza
+        if en_vuelo:
+            await asyncio.wait(en_vuelo)
+            procesadas += len(en_vuelo)
+        logging.info(f"Trabajador {nombre}: {procesadas} tareas procesadas. Pool: {pool.estadisticas()}")
+    if http:
+        logging.info(f"Trabajador {nombre}, vía rápida HTTP: {http.estadisticas()}")
+        await http.cerrar_async()
+
+
+def _proceso_trabajador(direccion, sesiones, concurrencia, ruta_cache, refrescar, salir_si_vacia, puerto_metricas,
+                        resumen_metricas, cdp, http):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if puerto_metricas:
+        servir_metricas(puerto_metricas)
+    cola = abrir_cola(direccion)
+    cache = CachePerfiles(ruta_cache) if ruta_cache else None
+    try:
+        # El cliente HTTP se crea en cada proceso: sus conexiones no se comparten entre procesos
+        asyncio.run(trabajar(cola, sesiones, concurrencia, cache, refrescar, salir_si_vacia, cdp,
+                             ClienteHTTP() if http else None))
+    finally:
+        if resumen_metricas:
+            METRICAS_POR_DEFECTO.guardar_resumen(resumen_metricas)
+
+
+def lanzar_trabajadores(direccion, procesos, sesiones=None, concurrencia=4, ruta_cache=RUTA_CACHE,
+                        refrescar=False, salir_si_vacia=False, puerto_metricas=None, resumen_metricas=None, cdp=None,
+                        http=False):
+    # Un proceso por trabajador, cada uno con su navegador (o su conexión al
+    # demonio de navegadores, con cdp) y su bucle de eventos.
+    # Cada proceso tiene sus propias métricas: el trabajador i escucha en
+    # puerto_metricas + i y escribe su resumen en <resumen_metricas>.<i>
+    hijos = [
+        multiprocessing.Process(
+            target=_proceso_trabajador,
+            args=(direccion, sesiones, concurrencia, ruta_cache, refrescar, salir_si_vacia,
+                  puerto_metricas + i if puerto_metricas else None,
+                  f"{resumen_metricas}.{i}" if resumen_metricas else None, cdp, http),
+            name=f"trabajador-{i}",
+        )
+        for i in range(procesos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    try:
+        for hijo in hijos:
+            hijo.join()
+    except KeyboardInterrupt:
+        # Los hijos reciben también el SIGINT y terminan sus tareas en vuelo
+        for hijo in hijos:
+            hijo.join()
+
+
+async def encolar_consultas(cola, consultas, objetivo=RESULTADOS_POR_DEFECTO, determinista=False, vistos=None,
+                            cdp=None, plan=None, max_subconsultas=MAX_SUBCONSULTAS, objetivo_plan=None):
+    # Coordinador: genera cada búsqueda (o su plan de subconsultas) y encola
+    # sus perfiles según aparecen en Google, de modo que los trabajadores
+    # empiezan enseguida
+    cache_llm = CacheLLM()
+    total = 0
+    async with PoolNavegadoresAsync(tamano=1, cdp=cdp) as pool:
+        for consulta in consultas:
+            if plan:
+                search_query = await asyncio.to_thread(planificar, consulta, plan, cache_llm, determinista,
+                                                       max_subconsultas)
+            else:
+                search_query = await asyncio.to_thread(generate_linkedin_search_query, consulta, cache_llm,
+                                                       determinista)
+            logging.info(f"Consulta: {consulta} -> {search_query}")
+            async for link in iterar_plan_async(search_query, pool, objetivo, objetivo_plan=objetivo_plan):
+                if vistos is None or vistos.agregar(link):
+                    total += await asyncio.to_thread(cola.encolar, [link])
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cola de trabajo distribuida para el scraping de perfiles")
+    parser.add_argument('--cola', default=RUTA_POR_DEFECTO, help="Fichero SQLite o URL redis:// de la cola")
+    parser.add_argument('--cdp', default=None,
+                        help="Conectar a navegadores ya abiertos: 'auto' (demonio_navegador.py) o URLs CDP separadas por comas "
+                             "(por defecto $SCRAPER_CDP)")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    parser_encolar = subparsers.add_parser('encolar', help="Encolar URLs de perfil o los resultados de búsquedas")
+    entrada = parser_encolar.add_mutually_exclusive_group(required=True)
+    entrada.add_argument('--urls', help="Fichero con una URL de perfil por línea")
+    entrada.add_argument('--consultas', help="Fichero con una consulta en lenguaje natural por línea")
+    parser_encolar.add_argument('--objetivo', type=int, default=RESULTADOS_POR_DEFECTO)
+    parser_encolar.add_argument('--determinista', action='store_true')
+    parser_encolar.add_argument('--plan', choices=MODOS, default=None,
+                                help="Abrir cada consulta en subconsultas paralelas: expandiendo sus grupos OR o pidiéndolas al LLM")
+    parser_encolar.add_argument('--subconsultas', type=int, default=MAX_SUBCONSULTAS, help="Máximo de subconsultas por plan")
+    parser_encolar.add_argument('--objetivo-plan', type=int, default=None,
+                                help="Perfiles distintos por consulta con --plan (por defecto --objetivo por subconsulta)")
+    parser_encolar.add_argument('--vistos', default=None, help="Conjunto persistente de perfiles ya encolados en otras ejecuciones")
+
+    parser_trabajador = subparsers.add_parser('trabajador', help="Lanzar procesos trabajadores")
+    parser_trabajador.add_argument('--procesos', type=int, default=os.cpu_count())
+    parser_trabajador.add_argument('--concurrencia', type=int, default=4, help="Perfiles en vuelo por proceso")
+    parser_trabajador.add_argument('--sesiones', nargs='+', default=['cookies.json'],
+                                   help="Ficheros de cookies o storage_state, uno por cuenta de LinkedIn")
+    parser_trabajador.add_argument('--cache', default=RUTA_CACHE, help="Caché SQLite de perfiles ('' para desactivarla)")
+    parser_trabajador.add_argument('--refresh', action='store_true')
+    parser_trabajador.add_argument('--http', action='store_true',
+                                   help="Probar cada perfil primero por HTTP/2 sin navegador; se escala a Playwright si hace falta")
+    parser_trabajador.add_argument('--salir-si-vacia', action='store_true', help="Terminar cuando no queden tareas")
+    parser_trabajador.add_argument('--puerto-metricas', type=int, default=None,
+                                   help="Exponer métricas Prometheus; el proceso i usa este puerto + i")
+    parser_trabajador.add_argument('--resumen-metricas', default=None,
+                                   help="Prefijo de los resúmenes JSON de métricas (uno por proceso)")
+
+    subparsers.add_parser('estado', help="Mostrar el número de tareas por estado")
+    parser_resultados = subparsers.add_parser('resultados', help="Volcar los perfiles terminados a JSONL, Parquet o Arrow")
+    parser_resultados.add_argument('--salida', required=True, help="El formato se elige por la extensión (.jsonl, .parquet, .arrow)")
+    subparsers.add_parser('muertas', help="Listar las tareas descartadas y su último error")
+    subparsers.add_parser('reintentar-muertas', help="Devolver las tareas muertas a la cola")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.comando == 'trabajador':
+        lanzar_trabajadores(args.cola, args.procesos, args.sesiones, args.concurrencia, args.cache or None,
+                            args.refresh, args.salir_si_vacia, args.puerto_metricas, args.resumen_metricas,
+                            resolver_cdp(args.cdp), args.http)
+        return
+
+    cola = abrir_cola(args.cola)
+    if args.comando == 'encolar':
+        vistos = ConjuntoVistos(args.vistos) if args.vistos else None
+        if args.urls:
+            urls = (extraer_url_perfil(linea) for linea in leer_lineas(args.urls))
+            nuevas = cola.encolar(url for url in urls if url and (vistos is None or vistos.agregar(url)))
+        else:
+            nuevas = asyncio.run(encolar_consultas(cola, leer_lineas(args.consultas), args.objetivo, args.determinista,
+                                                   vistos, resolver_cdp(args.cdp), args.plan, args.subconsultas,
+                                                   args.objetivo_plan))
+        logging.info(f"{nuevas} tareas nuevas encoladas. Estado: {cola.estadisticas()}")
+        if vistos:
+            logging.info(f"Perfiles vistos: {vistos.estadisticas()}")
+            vistos.cerrar()
+    elif args.comando == 'estado':
+        print(json.dumps(cola.estadisticas(), indent=2))
+    elif args.comando == 'resultados':
+        total = 0
+        salida = abrir_salida(args.salida)
+        try:
+            for _, perfil in cola.resultados():
+                if perfil:
+                    salida.escribir(perfil)
+                    total += 1
+        finally:
+            salida.cerrar()
+    elif args.comando == 'muertas':
+        for url, error in cola.muertas():
+            print(f"{url}\t{error}")
+    elif args.comando == 'reintentar-muertas':
+        logging.info(f"{cola.reintentar_muertas()} tareas devueltas a la cola")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import threading
+from cache_llm import completar_con_cache
+from metricas import METRICAS_POR_DEFECTO
+
+# Generación de consultas de Google con el LLM, compartida por la CLI
+# (version_sin_steeamlit.py), la app de Streamlit, los lotes, la cola de
+# trabajo y el planificador de consultas (plan_consultas.py). Las respuestas
+# pasan por la caché de cache_llm.py y el cliente de OpenAI solo se crea
+# cuando hace falta llamar al modelo.
+
+PROMPT_SISTEMA = """Eres un generador de URLs de búsqueda avanzada de Google para encontrar perfiles en LinkedIn. Tu objetivo es ayudar al usuario a construir URLs específicas para búsquedas de LinkedIn según sus descripciones en lenguaje natural. Cuando el usuario te proporcione una consulta, debes crear una URL que incluya todos los parámetros de búsqueda mencionados.
+
+            Ejemplo de entradas y salidas:
+
+            1. Entrada: "Quiero encontrar desarrolladores de software en Estados Unidos que hayan estudiado en MIT o Stanford."
+            output: site:linkedin.com/in/ "Software Developer" "United States" ("MIT" OR "Stanford")
+
+            2. Entrada: "Busco perfiles en LinkedIn de personas que trabajen en ventas y estén ubicadas en Europa."
+            output: site:linkedin.com/in/ "sales" ("France" OR "Germany" OR "Spain" OR "Italy" OR "United Kingdom" OR "Netherlands")
+
+            3. Entrada: "Me gustaría ver perfiles de gerentes de producto con experiencia en la industria tecnológica en California."
+            output: site:linkedin.com/in/ "Product Manager" "technology industry" "California"
+
+            4. Entrada: "Encuentra perfiles de ingenieros de datos en Canadá que tengan experiencia con Hadoop y Spark."
+            output site:linkedin.com/in/ "Data Engineer" "Canada" ("Hadoop" OR "Spark")
+
+            5. Entrada: "Quiero ver perfiles de personas que hayan trabajado como científicos de datos en Europa y hayan estudiado inteligencia artificial."
+            output: site:linkedin.com/in/ "Data Scientist" ("France" OR "Germany" OR "Spain" OR "Italy" OR "United Kingdom") "Artificial Intelligence"
+
+            Recuerda utilizar `site:linkedin.com/in/` al inicio de cada consulta para limitar la búsqueda a perfiles de LinkedIn y utilizar operadores como `OR` para agrupar términos similares. También, agrupa términos dentro de comillas para realizar búsquedas exactas.
+            """
+
+_cliente_openai = None
+_lock_cliente = threading.Lock()
+
+
+def cliente_openai():
+    # El cliente se crea en el primer uso: importar este módulo no exige
+    # OPENAI_API_KEY ni paga la importación del SDK (casi un segundo)
+    global _cliente_openai
+    with _lock_cliente:
+        if _cliente_openai is None:
+            from dotenv import load_dotenv
+            from openai import OpenAI
+            load_dotenv()
+            _cliente_openai = OpenAI()
+    return _cliente_openai
+
+
+def generate_linkedin_search_query(prompt, cache=None, determinista=False, cliente=None):
+    # determinista=True fija la temperatura a 0 para que la respuesta cacheada sea estable
+    with METRICAS_POR_DEFECTO.tramo('consulta', 'llm'):
+        respuesta = completar_con_cache(
+            (lambda: cliente) if cliente else cliente_openai,
+            cache,
+            modelo="gpt-4",
+            system_prompt=PROMPT_SISTEMA,
+            prompt=prompt,
+            temperatura=0 if determinista else 0.5,
+            max_tokens=300,
+            plantilla_usuario="Generate a LinkedIn search query for: {prompt}"
+        )
+    return respuesta.strip()
@@ -0,0 +1,246 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+import urllib.request
+
+# Demonio de navegadores precalentados.
+#
+# Lanzar Chromium cuesta segundos, y una CLI que consulta un solo perfil los
+# paga en cada ejecución. Este proceso de larga duración mantiene abiertos N
+# Chromium con depuración remota (CDP) en 127.0.0.1 y los relanza si mueren
+# o superan el límite de memoria. Los pools de pool_navegadores.py, con
+# cdp=[...], se conectan a ellos con connect_over_cdp() en lugar de lanzar
+# los suyos: cada contexto sigue siendo nuevo y aislado, y al cerrar el pool
+# solo se desconectan.
+#
+#     python demonio_navegador.py --navegadores 2 &
+#     SCRAPER_CDP=auto python lote.py --urls urls.txt --salida perfiles.jsonl
+#     python demonio_navegador.py --parar
+#
+# Los endpoints vivos se publican en RUTA_ESTADO; resolver_cdp('auto') los
+# lee y devuelve una lista vacía (lanzar navegadores propios) si el demonio
+# no está en marcha.
+
+VARIABLE_CDP = 'SCRAPER_CDP'
+RUTA_ESTADO = os.path.join(tempfile.gettempdir(), 'scraper_demonio_navegador.json')
+PUERTO_POR_DEFECTO = 9222
+NAVEGADORES_POR_DEFECTO = 2
+MEMORIA_MAX_MB = 2048
+INTERVALO_VIGILANCIA_S = 2.0
+ESPERA_ARRANQUE_S = 20.0
+ARGUMENTOS_CHROMIUM = (
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-background-networking',
+    '--disable-dev-shm-usage',
+)
+
+
+def endpoint_vivo(endpoint, timeout=1.0):
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=timeout) as respuesta:
+            return bool(json.load(respuesta).get('webSocketDebuggerUrl'))
+    except (OSError, ValueError):
+        return False
+
+
+def resolver_cdp(valor=None):
+    # Endpoints CDP para los pools; lista vacía = lanzar navegadores propios.
+    # valor: None (usa $SCRAPER_CDP), 'auto' (el demonio local, si responde)
+    # o URLs separadas por comas
+    valor = valor if valor is not None else os.environ.get(VARIABLE_CDP)
+    if not valor:
+        return []
+    if valor != 'auto':
+        return [endpoint.strip() for endpoint in valor.split(',') if endpoint.strip()]
+    try:
+        with open(RUTA_ESTADO, encoding='utf-8') as f:
+            estado = json.load(f)
+    except (OSError, ValueError):
+        logging.info("No hay demonio de navegadores en marcha: se lanzarán navegadores propios")
+        return []
+    endpoints = [endpoint for endpoint in estado.get('endpoints', []) if endpoint_vivo(endpoint)]
+    if not endpoints:
+        logging.info("El demonio de navegadores no responde: se lanzarán navegadores propios")
+    return endpoints
+
+
+def ruta_chromium():
+    # El mismo Chromium que instala `playwright install chromium`
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def memoria_arbol_mb(pid):
+    # RSS del proceso y todos sus descendientes (solo Linux, vía /proc)
+    total_kb = 0
+    pendientes = [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with open(f"/proc/{actual}/status") as f:
+                for linea in f:
+                    if linea.startswith('VmRSS:'):
+                        total_kb += int(linea.split()[1])
+                        break
+            for hilo in os.listdir(f"/proc/{actual}/task"):
+                with open(f"/proc/{actual}/task/{hilo}/children") as f:
+                    pendientes.extend(int(hijo) for hijo in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class NavegadorDemonio:
+    def __init__(self, ejecutable, puerto, headless=True, argumentos=None):
+        self.ejecutable = ejecutable
+        self.puerto = puerto
+        self.headless = headless
+        self.argumentos = list(argumentos or [])
+        self.endpoint = f"http://127.0.0.1:{puerto}"
+        self.directorio = tempfile.mkdtemp(prefix=f"demonio-cdp-{puerto}-")
+        self.proceso = None
+        self.lanzamientos = 0
+
+    def lanzar(self):
+        comando = [
+            self.ejecutable,
+            f"--remote-debugging-port={self.puerto}",
+            '--remote-debugging-address=127.0.0.1',
+            f"--user-data-dir={self.directorio}",
+            *ARGUMENTOS_CHROMIUM,
+            *self.argumentos,
+        ]
+        if self.headless:
+            comando.append('--headless=new')
+        comando.append('about:blank')
+        self.proceso = subprocess.Popen(comando, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        start_new_session=True)
+        limite = time.monotonic() + ESPERA_ARRANQUE_S
+        while not endpoint_vivo(self.endpoint):
+            if self.proceso.poll() is not None or time.monotonic() > limite:
+                self.detener()
+                raise RuntimeError(f"Chromium no respondió en {self.endpoint}")
+            time.sleep(0.1)
+        self.lanzamientos += 1
+        logging.info(f"Navegador listo en {self.endpoint} (pid {self.proceso.pid})")
+
+    def vivo(self):
+        return self.proceso is not None and self.proceso.poll() is None and endpoint_vivo(self.endpoint)
+
+    def memoria_mb(self):
+        return memoria_arbol_mb(self.proceso.pid) if self.proceso else 0.0
+
+    def detener(self):
+        if self.proceso is None or self.proceso.poll() is not None:
+            return
+        self.proceso.terminate()
+        try:
+            self.proceso.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
+            self.proceso.wait()
+
+    def cerrar(self):
+        self.detener()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+
+def _guardar_estado(ruta, navegadores):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'pid': os.getpid(), 'iniciado': time.time(),
+                   'endpoints': [navegador.endpoint for navegador in navegadores]}, f)
+    os.replace(temporal, ruta)
+
+
+def ejecutar_demonio(navegadores=NAVEGADORES_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO, headless=True,
+                     memoria_max_mb=MEMORIA_MAX_MB, ruta_estado=RUTA_ESTADO, argumentos=None):
+    parar = []
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(senal, lambda *_: parar.append(True))
+
+    ejecutable = ruta_chromium()
+    instancias = [NavegadorDemonio(ejecutable, puerto + i, headless, argumentos) for i in range(navegadores)]
+    try:
+        for instancia in instancias:
+            instancia.lanzar()
+        _guardar_estado(ruta_estado, instancias)
+        logging.info(f"Demonio de navegadores en marcha: {[instancia.endpoint for instancia in instancias]}")
+
+        while not parar:
+            time.sleep(INTERVALO_VIGILANCIA_S)
+            for instancia in instancias:
+                if parar:
+                    break
+                if not instancia.vivo():
+                    logging.warning(f"El navegador de {instancia.endpoint} no responde: relanzando")
+                elif memoria_max_mb and instancia.memoria_mb() > memoria_max_mb:
+                    logging.info(f"El navegador de {instancia.endpoint} supera {memoria_max_mb} MB: relanzando")
+                else:
+                    continue
+                # Los clientes conectados pierden la conexión; los pools reconectan solos
+                instancia.detener()
+                try:
+                    instancia.lanzar()
+                except RuntimeError as e:
+                    logging.error(f"{e}; se reintentará")
+    finally:
+        try:
+            with open(ruta_estado, encoding='utf-8') as f:
+                propio = json.load(f).get('pid') == os.getpid()
+        except (OSError, ValueError):
+            propio = False
+        if propio:
+            os.remove(ruta_estado)
+        for instancia in instancias:
+            instancia.cerrar()
+        logging.info(f"Demonio de navegadores detenido; lanzamientos: "
+                     f"{[instancia.lanzamientos for instancia in instancias]}")
+
+
+def parar_demonio(ruta_estado=RUTA_ESTADO):
+    try:
+        with open(ruta_estado, encoding='utf-8') as f:
+            pid = json.load(f)['pid']
+    except (OSError, ValueError, KeyError):
+        logging.info("No hay demonio de navegadores en marcha")
+        return False
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        logging.info(f"El demonio (pid {pid}) ya no existía; se borra su estado")
+        os.remove(ruta_estado)
+        return False
+    logging.info(f"Señal de parada enviada al demonio (pid {pid})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Demonio de navegadores Chromium precalentados accesibles por CDP")
+    parser.add_argument('--navegadores', type=int, default=NAVEGADORES_POR_DEFECTO)
+    parser.add_argument('--puerto', type=int, default=PUERTO_POR_DEFECTO,
+                        help="Puerto CDP del primer navegador; los siguientes usan los consecutivos")
+    parser.add_argument('--memoria-max-mb', type=int, default=MEMORIA_MAX_MB,
+                        help="Relanzar un navegador que supere esta memoria (0 para no vigilarla)")
+    parser.add_argument('--con-interfaz', action='store_true', help="Navegadores visibles, para depurar")
+    parser.add_argument('--estado', default=RUTA_ESTADO, help="Fichero donde se publican los endpoints")
+    parser.add_argument('--parar', action='store_true', help="Detener el demonio en marcha")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.parar:
+        parar_demonio(args.estado)
+        return
+    ejecutar_demonio(args.navegadores, args.puerto, not args.con_interfaz, args.memoria_max_mb, args.estado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from extraccion import selectores_espera
+
+# Esperas de disponibilidad guiadas por selectores: en lugar de esperar a
+# 'networkidle' y dormir un tiempo fijo, se espera solo a que estén en el DOM
+# los elementos que el extractor va a leer, cada uno con su propio timeout (ms).
+
+# Cada campo espera a cualquiera de sus selectores de respaldo (ver extraccion.py)
+_SELECTORES = selectores_espera()
+
+SELECTORES_PERFIL = (
+    ('name', _SELECTORES['name'], 15000),
+    ('position', _SELECTORES['position'], 5000),
+    ('location', _SELECTORES['location'], 5000),
+    ('experience', _SELECTORES['experience'], 2000),
+    ('education', _SELECTORES['education'], 2000),
+)
+
+SELECTORES_SERP = (
+    ('resultados', 'a[href*="linkedin.com/in/"]', 15000),
+)
+
+
+def esperar_selectores(page, selectores=SELECTORES_PERFIL):
+    listos = {}
+    for campo, selector, timeout in selectores:
+        try:
+            page.wait_for_selector(selector, state='attached', timeout=timeout)
+            listos[campo] = True
+        except Exception:
+            logging.debug(f"'{campo}' ({selector}) no apareció en {timeout} ms en {page.url}")
+            listos[campo] = False
+    return listos
+
+
+async def esperar_selectores_async(page, selectores=SELECTORES_PERFIL):
+    async def esperar(campo, selector, timeout):
+        try:
+            await page.wait_for_selector(selector, state='attached', timeout=timeout)
+            return True
+        except Exception:
+            logging.debug(f"'{campo}' ({selector}) no apareció en {timeout} ms en {page.url}")
+            return False
+
+    # En asíncrono todas las esperas corren a la vez
+    resultados = await asyncio.gather(*(esperar(*s) for s in selectores))
+    return {campo: listo for (campo, _, _), listo in zip(selectores, resultados)}
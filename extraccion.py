@@ -0,0 +1,210 @@
+import json
+from perfiles import Perfil
+
+# Extracción declarativa del perfil en un solo viaje de ida y vuelta.
+#
+# La especificación describe cada campo como una cadena de selectores de
+# respaldo: se usa el primero que encuentre un elemento con texto. Cubre la
+# maquetación pública (.top-card-layout__*) y la de sesión iniciada
+# (.text-body-medium...). Se compila una vez a un script que page.evaluate()
+# ejecuta en el navegador y que devuelve todo el perfil de golpe, en lugar de
+# un query_selector + inner_text por campo.
+#
+# extraer_perfil_html() aplica la misma especificación a HTML ya descargado
+# (archivo, cliente HTTP) con BeautifulSoup. Sin motor de maquetación no hay
+# innerText: el texto se toma con los espacios normalizados.
+
+ESPEC_PERFIL = {
+    'campos': {
+        'name': (
+            'h1.top-card-layout__title',
+            'h1.text-heading-xlarge',
+            'h1',
+            'div.ph5.pb5 > div.display-flex.mt2 ul li',
+        ),
+        'position': (
+            '.top-card-layout__headline',
+            '.text-body-medium.break-words',
+            '.text-body-medium',
+        ),
+        'location': (
+            '.top-card-layout__first-subline',
+            '.text-body-small.inline.t-black--light.break-words',
+        ),
+    },
+    'listas': {
+        'experience': {
+            'elementos': (
+                'section#experience-section li',
+                'section.experience li.experience-item',
+                'section:has(#experience) li.artdeco-list__item',
+            ),
+            'limite': 3,  # Las 3 experiencias más recientes
+            'campos': {
+                'title': (
+                    '.pv-entity__summary-info h3',
+                    '.experience-item__title',
+                    '.t-bold span[aria-hidden="true"]',
+                ),
+                'company': (
+                    '.pv-entity__secondary-title',
+                    '.experience-item__subtitle',
+                    '.t-14.t-normal span[aria-hidden="true"]',
+                ),
+            },
+        },
+        'education': {
+            'elementos': (
+                'section#education-section li',
+                'section.education li.education__list-item',
+                'section:has(#education) li.artdeco-list__item',
+            ),
+            'limite': 2,  # Las 2 educaciones más recientes
+            'campos': {
+                'school': (
+                    '.pv-entity__school-name',
+                    '.education__item--school-name',
+                    'h3',
+                    '.t-bold span[aria-hidden="true"]',
+                ),
+                'degree': (
+                    '.pv-entity__degree-name',
+                    '.education__item--degree-info',
+                    '.t-14.t-normal span[aria-hidden="true"]',
+                ),
+            },
+        },
+    },
+}
+
+CAMPOS_OBLIGATORIOS = ('name', 'position', 'location')
+
+_PLANTILLA_SCRIPT = """() => {
+    const espec = %s;
+    const primero = (raiz, selectores) => {
+        for (const selector of selectores) {
+            let elemento;
+            try { elemento = raiz.querySelector(selector); } catch (e) { continue; }
+            if (elemento) {
+                const texto = (elemento.innerText || elemento.textContent || '').trim();
+                if (texto) return texto;
+            }
+        }
+        return null;
+    };
+    const todos = (selectores) => {
+        for (const selector of selectores) {
+            let elementos;
+            try { elementos = document.querySelectorAll(selector); } catch (e) { continue; }
+            if (elementos.length) return Array.from(elementos);
+        }
+        return [];
+    };
+    const resultado = {};
+    for (const [campo, selectores] of Object.entries(espec.campos)) {
+        resultado[campo] = primero(document, selectores);
+    }
+    for (const [lista, definicion] of Object.entries(espec.listas)) {
+        resultado[lista] = todos(definicion.elementos).slice(0, definicion.limite).map(elemento => {
+            const entrada = {};
+            for (const [campo, selectores] of Object.entries(definicion.campos)) {
+                entrada[campo] = primero(elemento, selectores);
+            }
+            return entrada;
+        });
+    }
+    return resultado;
+}"""
+
+
+def compilar_espec(espec):
+    return _PLANTILLA_SCRIPT % json.dumps(espec, ensure_ascii=False)
+
+
+SCRIPT_PERFIL = compilar_espec(ESPEC_PERFIL)
+
+
+def construir_perfil(datos, espec=ESPEC_PERFIL, url=None):
+    # Convierte el resultado crudo del script en un Perfil, o None si falta
+    # algún campo obligatorio. Las entradas de las listas a las que les falta
+    # algún campo se descartan
+    if not datos or not all(datos.get(campo) for campo in CAMPOS_OBLIGATORIOS):
+        return None
+
+    campos = {campo: datos[campo] for campo in espec['campos']}
+    for lista, definicion in espec['listas'].items():
+        campos[lista] = [
+            entrada
+            for entrada in datos.get(lista, [])
+            if all(entrada.get(campo) for campo in definicion['campos'])
+        ]
+    return Perfil(url=url, **campos)
+
+
+def extraer_perfil(page, script=SCRIPT_PERFIL, url=None):
+    return construir_perfil(page.evaluate(script), url=url)
+
+
+async def extraer_perfil_async(page, script=SCRIPT_PERFIL, url=None):
+    return construir_perfil(await page.evaluate(script), url=url)
+
+
+def selectores_espera(espec=ESPEC_PERFIL):
+    # Un selector por campo con toda su cadena de respaldo, para esperas.py
+    selectores = {campo: ', '.join(cadena) for campo, cadena in espec['campos'].items()}
+    for lista, definicion in espec['listas'].items():
+        selectores[lista] = ', '.join(definicion['elementos'])
+    return selectores
+
+
+def sopa_html(html):
+    # bs4 se importa en el primer uso: solo lo necesita el trabajo sin
+    # navegador y su importación cuesta una décima de segundo
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        raise RuntimeError("La extracción sin navegador requiere el paquete 'beautifulsoup4'") from None
+    return BeautifulSoup(html, 'html.parser')
+
+
+def _texto_html(elemento):
+    return ' '.join(elemento.get_text(' ').split())
+
+
+def _primero_html(raiz, selectores):
+    for selector in selectores:
+        try:
+            elemento = raiz.select_one(selector)
+        except Exception:
+            continue
+        if elemento:
+            texto = _texto_html(elemento)
+            if texto:
+                return texto
+    return None
+
+
+def _todos_html(raiz, selectores):
+    for selector in selectores:
+        try:
+            elementos = raiz.select(selector)
+        except Exception:
+            continue
+        if elementos:
+            return elementos
+    return []
+
+
+def extraer_datos_html(html, espec=ESPEC_PERFIL):
+    sopa = sopa_html(html)
+    datos = {campo: _primero_html(sopa, selectores) for campo, selectores in espec['campos'].items()}
+    for lista, definicion in espec['listas'].items():
+        datos[lista] = [
+            {campo: _primero_html(elemento, selectores) for campo, selectores in definicion['campos'].items()}
+            for elemento in _todos_html(sopa, definicion['elementos'])[:definicion['limite']]
+        ]
+    return datos
+
+
+def extraer_perfil_html(html, espec=ESPEC_PERFIL, url=None):
+    return construir_perfil(extraer_datos_html(html, espec), espec, url)
@@ -0,0 +1,185 @@
+import logging
+from extraccion import ESPEC_PERFIL, sopa_html
+from sesiones import BLOQUEO, LOGIN, OK
+
+# Clasificación de fallos: qué merece otro intento y qué no.
+#
+#   FalloReintentable   timeouts, errores de red, 5xx, navegador cerrado
+#     ErrorBloqueo      429, 403/999, captcha, login con sesión (otra cuenta
+#                       puede entrar): además frenan el host en cadencia.py
+#   FalloDefinitivo     404, perfil no disponible, muro de login sin sesión,
+#                       errores de programación: reintentar no cambia nada
+#
+# Las respuestas se clasifican por código y URL final y, justo después de
+# goto(), por marcadores en el DOM (un solo evaluate): un captcha o un
+# authwall servidos con 200 en la URL del perfil se detectan sin esperar 15 s
+# a unos selectores que nunca van a aparecer.
+
+PATRONES_CAPTCHA = ('google.com/sorry', '/checkpoint/challenge', 'captcha')
+PATRONES_LOGIN = ('linkedin.com/login', 'linkedin.com/authwall', 'linkedin.com/uas/login')
+PATRONES_NO_DISPONIBLE = ('linkedin.com/404', 'linkedin.com/in/unavailable')
+ESTADOS_BLOQUEO = {429: '429', 403: '403', 999: '999'}  # 999: respuesta anti-bots de LinkedIn
+ESTADOS_NO_ENCONTRADO = (404, 410)
+
+# Marcadores de páginas que no son el contenido pedido. Solo se miran si no
+# hay ningún elemento de contenido (ver detectar_muro), porque los perfiles
+# públicos también llevan formularios de inicio de sesión.
+MARCADORES_MURO = {
+    'captcha': {
+        'selectores': ('form#captcha-form', '#captcha-internal', 'iframe[src*="recaptcha"]',
+                       'iframe[src*="hcaptcha"]', 'form[action*="/checkpoint/challenge"]'),
+        'textos': ('unusual traffic', 'tráfico inusual', 'security verification', 'verificación de seguridad',
+                   "let's do a quick security check"),
+    },
+    'login': {
+        'selectores': ('form.join-form', '.authwall-join-form', '.authwall-sign-in-form', 'form.login__form'),
+        'textos': ('join linkedin', 'únete a linkedin', 'sign in to view', 'inicia sesión para ver'),
+    },
+    'no_disponible': {
+        'selectores': ('.profile-unavailable', 'main.error-page', 'section.not-found'),
+        'textos': ('profile is not available', 'perfil no está disponible', 'page not found',
+                   'página no encontrada', "this page doesn't exist", 'esta página no existe'),
+    },
+}
+# Los selectores específicos del nombre y el titular, no el h1 genérico de respaldo
+SELECTORES_CONTENIDO_PERFIL = ESPEC_PERFIL['campos']['name'][:2] + ESPEC_PERFIL['campos']['position'][:2]
+SELECTORES_CONTENIDO_SERP = ('a[href*="linkedin.com/in/"]',)
+
+_SCRIPT_MURO = """([contenido, marcadores]) => {
+    const hay = (selector) => { try { return !!document.querySelector(selector); } catch (e) { return false; } };
+    if (contenido.some(hay)) return null;
+    const texto = [document.title, ...Array.from(document.querySelectorAll('h1, h2'), e => e.textContent)]
+        .join(' ').toLowerCase();
+    for (const [motivo, m] of Object.entries(marcadores)) {
+        if (m.selectores.some(hay) || m.textos.some(t => texto.includes(t))) return motivo;
+    }
+    return null;
+}"""
+
+
+class Fallo(Exception):
+    reintentable = False
+
+    def __init__(self, motivo, mensaje=None):
+        super().__init__(mensaje or motivo)
+        self.motivo = motivo
+
+
+class FalloReintentable(Fallo):
+    reintentable = True
+
+
+class FalloDefinitivo(Fallo):
+    reintentable = False
+
+
+class ErrorBloqueo(FalloReintentable):
+    # Bloqueo reintentable; motivo es el valor de detectar_bloqueo()
+    pass
+
+
+def detectar_bloqueo(status, url_final):
+    if status in ESTADOS_BLOQUEO:
+        return ESTADOS_BLOQUEO[status]
+    url_final = url_final or ''
+    if any(patron in url_final for patron in PATRONES_CAPTCHA):
+        return 'captcha'
+    if any(patron in url_final for patron in PATRONES_LOGIN):
+        return 'login'
+    return None
+
+
+def clasificar_respuesta(status, url_final):
+    # Fallo (sin lanzar) según el código y la URL final, o None si parece válida
+    bloqueo = detectar_bloqueo(status, url_final)
+    if bloqueo:
+        return ErrorBloqueo(bloqueo, f"Bloqueo ({bloqueo}) en {url_final}")
+    if status in ESTADOS_NO_ENCONTRADO or any(patron in (url_final or '') for patron in PATRONES_NO_DISPONIBLE):
+        return FalloDefinitivo('no_encontrado', f"{url_final} no existe ({status})")
+    if status and status >= 500:
+        return FalloReintentable('http_5xx', f"Error {status} en {url_final}")
+    return None
+
+
+def _fallo_muro(motivo, url):
+    if motivo is None:
+        return None
+    if motivo == 'no_disponible':
+        return FalloDefinitivo('no_encontrado', f"{url} no está disponible")
+    return ErrorBloqueo(motivo, f"Muro ({motivo}) en {url}")
+
+
+def detectar_muro(page, contenido=SELECTORES_CONTENIDO_PERFIL):
+    # Captcha, authwall o "no disponible" servidos con un código normal
+    return _fallo_muro(page.evaluate(_SCRIPT_MURO, [list(contenido), MARCADORES_MURO]), page.url)
+
+
+async def detectar_muro_async(page, contenido=SELECTORES_CONTENIDO_PERFIL):
+    return _fallo_muro(await page.evaluate(_SCRIPT_MURO, [list(contenido), MARCADORES_MURO]), page.url)
+
+
+def detectar_muro_html(html, url, contenido=SELECTORES_CONTENIDO_PERFIL):
+    # Lo mismo sobre HTML ya descargado (archivo, cliente HTTP)
+    sopa = sopa_html(html)
+
+    def hay(selector):
+        try:
+            return sopa.select_one(selector) is not None
+        except Exception:
+            return False
+
+    if any(hay(selector) for selector in contenido):
+        return None
+    titulo = sopa.title.get_text(' ') if sopa.title else ''
+    texto = ' '.join([titulo] + [e.get_text(' ') for e in sopa.select('h1, h2')]).lower()
+    for motivo, marcadores in MARCADORES_MURO.items():
+        if any(hay(selector) for selector in marcadores['selectores']) or \
+                any(t in texto for t in marcadores['textos']):
+            return _fallo_muro(motivo, url)
+    return None
+
+
+def clasificar_error(error):
+    # Fallo correspondiente a cualquier excepción de un intento
+    if isinstance(error, Fallo):
+        return error
+    nombre = type(error).__name__
+    mensaje = str(error)
+    if type(error).__module__.startswith('playwright'):
+        if nombre == 'TimeoutError':
+            return FalloReintentable('timeout', mensaje)
+        if 'net::ERR_' in mensaje:
+            return FalloReintentable('red', mensaje)
+        if 'closed' in mensaje or 'crashed' in mensaje:
+            return FalloReintentable('navegador', mensaje)
+        return FalloReintentable('playwright', mensaje)
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return FalloReintentable('red', mensaje)
+    # Errores de programación (None.inner_text(), KeyError...): se repetirían igual
+    return FalloDefinitivo(f"error_interno:{nombre}", mensaje)
+
+
+def resolver_fallo(fallo, url, uso, cache=None):
+    # Aplica un fallo de respuesta en un intento de perfil: lanza los
+    # reintentables anotando el resultado de la sesión en uso; los definitivos
+    # se guardan en la caché negativa y se devuelve su motivo
+    sesion = uso['sesion']
+    if fallo.motivo == 'login' and sesion:
+        # La sesión caducó: se retira y el perfil se reintenta con otra cuenta
+        uso['resultado'] = LOGIN
+        raise ErrorBloqueo('login', f"La sesión {sesion.nombre} fue redirigida al inicio de sesión")
+    if fallo.motivo == 'login':
+        logging.warning(f"No se pudo acceder al perfil {url}. Redirigido a la página de inicio de sesión.")
+        fallo = FalloDefinitivo('login')
+    if isinstance(fallo, ErrorBloqueo):
+        uso['resultado'] = BLOQUEO
+        raise fallo
+    if fallo.reintentable:
+        raise fallo
+
+    uso['resultado'] = OK
+    if fallo.motivo == 'no_encontrado':
+        logging.warning(f"El perfil {url} no existe.")
+    if cache:
+        cache.guardar_negativo(url, fallo.motivo)
+    return fallo.motivo
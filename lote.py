@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from archivo_html import ArchivoHTML
+from cache_llm import CacheLLM
+from cache_perfiles import RUTA_POR_DEFECTO as RUTA_CACHE, CachePerfiles
+from cadencia import LIMITADOR_POR_DEFECTO
+from cliente_http import ClienteHTTP
+from consulta_llm import generate_linkedin_search_query
+from demonio_navegador import resolver_cdp
+from metricas import METRICAS_POR_DEFECTO, servir_metricas
+from motor_async import CONCURRENCIA_POR_DEFECTO, NAVEGADORES_POR_DEFECTO, iterar_perfiles_async, iterar_plan_async
+from politica_recursos import POLITICA_POR_DEFECTO
+from plan_consultas import MAX_SUBCONSULTAS, MODOS, planificar
+from pool_navegadores import PoolNavegadoresAsync
+from programador import Programador
+from sesiones import PoolSesiones
+from urls import RESULTADOS_POR_DEFECTO, extraer_url_perfil
+from vistos import ConjuntoVistos
+
+# Ejecución por lotes sin interacción, con reanudación.
+#
+# Lee un fichero de consultas en lenguaje natural (--consultas) o de URLs de
+# perfil (--urls), una por línea, y escribe cada perfil en un JSONL en cuanto
+# termina. El punto de control (SQLite) guarda las URLs ya procesadas, las
+# consultas completadas y el tamaño del JSONL confirmado: tras una caída o un
+# kill se trunca la salida a ese tamaño y se continúa sin repetir URLs.
+#
+#     python lote.py --consultas consultas.txt --salida perfiles.jsonl
+#     python lote.py --urls urls.txt --salida perfiles.jsonl
+#
+# Los ficheros de entrada se leen en streaming y como mucho hay
+# --concurrencia perfiles en vuelo, así que la memoria no depende del tamaño
+# del lote.
+
+
+class PuntoControl:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta, timeout=30)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                estado TEXT NOT NULL,
+                terminado REAL NOT NULL
+            )
+        """)
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS consultas (
+                consulta TEXT PRIMARY KEY,
+                search_query TEXT,
+                terminada REAL
+            )
+        """)
+        self._conexion.execute("CREATE TABLE IF NOT EXISTS salida (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL)")
+        self._conexion.commit()
+
+    def procesada(self, url):
+        return self._conexion.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def bytes_confirmados(self):
+        fila = self._conexion.execute("SELECT bytes FROM salida WHERE id = 0").fetchone()
+        return fila[0] if fila else 0
+
+    def marcar_url(self, url, estado, bytes_salida):
+        # La URL y el tamaño de la salida se confirman en la misma transacción
+        with self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO urls (url, estado, terminado) VALUES (?, ?, ?)",
+                (url, estado, time.time()),
+            )
+            self._conexion.execute("INSERT OR REPLACE INTO salida (id, bytes) VALUES (0, ?)", (bytes_salida,))
+
+    def consulta(self, consulta):
+        # Devuelve (search_query, terminada) o (None, False) si no se empezó;
+        # search_query es una cadena o, con --plan, la lista de subconsultas
+        fila = self._conexion.execute(
+            "SELECT search_query, terminada FROM consultas WHERE consulta = ?", (consulta,)
+        ).fetchone()
+        return (_leer_search_query(fila[0]), fila[1] is not None) if fila else (None, False)
+
+    def guardar_consulta(self, consulta, search_query):
+        with self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO consultas (consulta, search_query, terminada) VALUES (?, ?, NULL)",
+                (consulta, json.dumps(search_query, ensure_ascii=False)),
+            )
+
+    def terminar_consulta(self, consulta):
+        with self._conexion:
+            self._conexion.execute("UPDATE consultas SET terminada = ? WHERE consulta = ?", (time.time(), consulta))
+
+    def estadisticas(self):
+        return dict(self._conexion.execute("SELECT estado, COUNT(*) FROM urls GROUP BY estado").fetchall())
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+def _leer_search_query(guardada):
+    # Se guarda en JSON; los puntos de control anteriores tienen el texto tal
+    # cual, con las subconsultas de un plan una por línea
+    if guardada is None:
+        return None
+    try:
+        return json.loads(guardada)
+    except ValueError:
+        subconsultas = guardada.split('\n')
+        return subconsultas if len(subconsultas) > 1 else guardada
+
+
+class SalidaJSONL:
+    def __init__(self, ruta, punto_control):
+        self.punto_control = punto_control
+        # Descartar las líneas escritas después del último punto de control
+        confirmados = punto_control.bytes_confirmados()
+        if os.path.exists(ruta) and os.path.getsize(ruta) > confirmados:
+            logging.warning(f"Truncando {ruta} a {confirmados} bytes confirmados")
+            os.truncate(ruta, confirmados)
+        self._archivo = open(ruta, 'ab')
+
+    def escribir(self, url, perfil):
+        if perfil:
+            self._archivo.write((json.dumps(perfil.como_dict(), ensure_ascii=False) + '\n').encode('utf-8'))
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+        self.punto_control.marcar_url(url, 'ok' if perfil else 'sin_datos', self._archivo.tell())
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+def leer_lineas(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea and not linea.startswith('#'):
+                yield linea
+
+
+async def _pendientes(links, punto_control, vistos=None):
+    # Salta las URLs ya procesadas en este lote o, con --vistos, en cualquier
+    # ejecución anterior, antes de gastar navegador en ellas. Se marcan como
+    # vistas al extraerse, no al programarlas: una URL en vuelo durante una
+    # caída o que no se pudo extraer se repite en lugar de perderse
+    async for link in links:
+        if punto_control.procesada(link) or (vistos is not None and vistos.contiene(link)):
+            continue
+        yield link
+
+
+async def _urls_de_fichero(ruta):
+    for linea in leer_lineas(ruta):
+        url = extraer_url_perfil(linea)
+        if url:
+            yield url
+        else:
+            logging.warning(f"Línea ignorada, no es una URL de perfil: {linea}")
+
+
+async def _scrapear(links, salida, sesiones, pool, args, cache, archivo, vistos, http):
+    # Los perfiles que agotan --presupuesto-url no se marcan en el punto de
+    # control: se reintentan en la próxima ejecución
+    total = 0
+    programador = Programador(presupuesto_url_s=args.presupuesto_url, retener=False)
+    async for link, perfil in iterar_perfiles_async(_pendientes(links, salida.punto_control, vistos), sesiones,
+                                                    pool, args.concurrencia, POLITICA_POR_DEFECTO, cache, args.refresh,
+                                                    archivo, http=http, programador=programador):
+        salida.escribir(link, perfil)
+        # Solo los extraídos: los que fallan se reintentan en otras ejecuciones con --vistos
+        if perfil and vistos is not None:
+            vistos.agregar(link)
+        total += 1
+    if programador.pendientes():
+        logging.warning(f"{len(programador.pendientes())} perfiles agotaron su presupuesto; quedan para la próxima ejecución")
+    return total
+
+
+async def ejecutar_lote(args):
+    punto_control = PuntoControl(args.checkpoint or f"{args.salida}.checkpoint.sqlite")
+    salida = SalidaJSONL(args.salida, punto_control)
+    cache = CachePerfiles(args.cache)
+    archivo = ArchivoHTML(args.archivo) if args.archivo else None
+    vistos = ConjuntoVistos(args.vistos) if args.vistos else None
+    sesiones = PoolSesiones(args.sesiones)
+    http = ClienteHTTP() if args.http else None
+    if args.puerto_metricas:
+        servir_metricas(args.puerto_metricas)
+    inicio = time.perf_counter()
+    total = 0
+    try:
+        async with PoolNavegadoresAsync(tamano=args.navegadores, cdp=resolver_cdp(args.cdp)) as pool:
+            if args.urls:
+                total += await _scrapear(_urls_de_fichero(args.urls), salida, sesiones, pool, args, cache, archivo,
+                                         vistos, http)
+            else:
+                cache_llm = CacheLLM()
+                for consulta in leer_lineas(args.consultas):
+                    search_query, terminada = punto_control.consulta(consulta)
+                    if terminada:
+                        continue
+                    if search_query is None:
+                        if args.plan:
+                            search_query = await asyncio.to_thread(
+                                planificar, consulta, args.plan, cache_llm, args.determinista, args.subconsultas)
+                        else:
+                            search_query = await asyncio.to_thread(
+                                generate_linkedin_search_query, consulta, cache_llm, args.determinista)
+                        punto_control.guardar_consulta(consulta, search_query)
+                    logging.info(f"Consulta: {consulta} -> {search_query}")
+                    links = iterar_plan_async(search_query, pool, args.objetivo, POLITICA_POR_DEFECTO, archivo,
+                                              args.objetivo_plan)
+                    total += await _scrapear(links, salida, sesiones, pool, args, cache, archivo, vistos, http)
+                    punto_control.terminar_consulta(consulta)
+            logging.info(f"Estadísticas del pool de navegadores: {pool.estadisticas()}")
+    finally:
+        salida.cerrar()
+        logging.info(f"{total} URLs procesadas en esta ejecución en {time.perf_counter() - inicio:.1f} s; "
+                     f"acumulado: {punto_control.estadisticas()}")
+        logging.info(f"Tasas por host: {LIMITADOR_POR_DEFECTO.tasas()}")
+        logging.info(f"Sesiones: {sesiones.estadisticas()}")
+        if http:
+            logging.info(f"Vía rápida HTTP: {http.estadisticas()}")
+            await http.cerrar_async()
+        METRICAS_POR_DEFECTO.guardar_resumen(args.resumen_metricas or f"{args.salida}.metricas.json")
+        punto_control.cerrar()
+        if archivo:
+            archivo.cerrar()
+        if vistos:
+            logging.info(f"Perfiles vistos: {vistos.estadisticas()}")
+            vistos.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraping de LinkedIn por lotes con reanudación")
+    entrada = parser.add_mutually_exclusive_group(required=True)
+    entrada.add_argument('--consultas', help="Fichero con una consulta en lenguaje natural por línea")
+    entrada.add_argument('--urls', help="Fichero con una URL de perfil por línea")
+    parser.add_argument('--salida', required=True, help="Fichero JSONL de salida (se anexa al reanudar)")
+    parser.add_argument('--checkpoint', default=None, help="Ruta del punto de control (por defecto <salida>.checkpoint.sqlite)")
+    parser.add_argument('--sesiones', nargs='+', default=['cookies.json'],
+                        help="Ficheros de cookies o storage_state de Playwright, uno por cuenta de LinkedIn")
+    parser.add_argument('--cache', default=RUTA_CACHE, help="Ruta de la caché SQLite de perfiles")
+    parser.add_argument('--refresh', action='store_true', help="Ignorar la caché y volver a scrapear todos los perfiles")
+    parser.add_argument('--objetivo', type=int, default=RESULTADOS_POR_DEFECTO, help="Número de perfiles a recoger de Google por consulta")
+    parser.add_argument('--plan', choices=MODOS, default=None,
+                        help="Abrir cada consulta en subconsultas paralelas: expandiendo sus grupos OR o pidiéndolas al LLM")
+    parser.add_argument('--subconsultas', type=int, default=MAX_SUBCONSULTAS, help="Máximo de subconsultas por plan")
+    parser.add_argument('--objetivo-plan', type=int, default=None,
+                        help="Perfiles distintos por consulta con --plan (por defecto --objetivo por subconsulta)")
+    parser.add_argument('--concurrencia', type=int, default=CONCURRENCIA_POR_DEFECTO)
+    parser.add_argument('--navegadores', type=int, default=NAVEGADORES_POR_DEFECTO)
+    parser.add_argument('--archivo', default=None, help="Directorio donde archivar el HTML descargado (desactivado si se omite)")
+    parser.add_argument('--vistos', default=None, help="Conjunto persistente de perfiles ya vistos en otras ejecuciones")
+    parser.add_argument('--determinista', action='store_true', help="Generar las consultas con temperatura 0")
+    parser.add_argument('--cdp', default=None,
+                        help="Conectar a navegadores ya abiertos: 'auto' (demonio_navegador.py) o URLs CDP separadas por comas "
+                             "(por defecto $SCRAPER_CDP)")
+    parser.add_argument('--presupuesto-url', type=float, default=None,
+                        help="Segundos como máximo por perfil, reintentos incluidos (los que no terminan se reintentan al reanudar)")
+    parser.add_argument('--http', action='store_true',
+                        help="Probar cada perfil primero por HTTP/2 sin navegador; se escala a Playwright si hace falta")
+    parser.add_argument('--puerto-metricas', type=int, default=None, help="Exponer métricas Prometheus en este puerto")
+    parser.add_argument('--resumen-metricas', default=None,
+                        help="Resumen JSON de métricas al terminar (por defecto <salida>.metricas.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(ejecutar_lote(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Métricas de latencia y rendimiento por etapa, compartidas por todos los
+# trabajadores del proceso (hilos o corrutinas).
+#
+# tramo(etapa, fase) mide una fase con perf_counter y la acumula en un
+# histograma de cubos fijos: un bisect y unas sumas bajo un lock, sin guardar
+# cada muestra, así que el coste (unos microsegundos) permite dejarlo activado
+# en producción. Cada tramo cuenta además su resultado (ok, el motivo de un
+# bloqueo o el tipo de excepción). Los contadores cubren páginas, bytes y
+# reintentos con su motivo.
+#
+# servir_metricas(puerto) expone todo en formato de texto de Prometheus
+# (/metrics) y el resumen en JSON (/resumen); resumen() es el mismo resumen
+# para volcarlo al terminar la ejecución. El servidor escucha solo en
+# 127.0.0.1: para un Prometheus en otra máquina hay que pasar direccion.
+
+PREFIJO = 'scraper_'
+CUBOS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+CUANTILES = (0.5, 0.95, 0.99)
+
+
+def motivo_error(error):
+    # Los bloqueos llevan su motivo (login, 429, captcha); el resto, el tipo
+    return getattr(error, 'motivo', None) or type(error).__name__
+
+
+class Histograma:
+    def __init__(self, cubos=CUBOS_S):
+        self.cubos = cubos
+        self.conteos = [0] * (len(cubos) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.conteos[bisect.bisect_left(self.cubos, valor)] += 1
+        self.suma += valor
+        self.total += 1
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def cuantil(self, q):
+        # Interpolación lineal dentro del cubo, como histogram_quantile(), sin pasar del máximo visto
+        if not self.total:
+            return None
+        objetivo = q * self.total
+        acumulado = 0
+        for i, conteo in enumerate(self.conteos):
+            if acumulado + conteo >= objetivo and conteo:
+                inferior = self.cubos[i - 1] if i else 0.0
+                superior = self.cubos[i] if i < len(self.cubos) else self.maximo
+                return min(inferior + (superior - inferior) * (objetivo - acumulado) / conteo, self.maximo)
+            acumulado += conteo
+        return self.maximo
+
+
+class Tramo:
+    def __init__(self, metricas, etapa, fase):
+        self.metricas = metricas
+        self.etapa = etapa
+        self.fase = fase
+        self.resultado = None
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, error, traza):
+        duracion = time.perf_counter() - self.inicio
+        if self.resultado is None:
+            self.resultado = motivo_error(error) if error is not None else 'ok'
+        self.metricas.registrar_tramo(self.etapa, self.fase, duracion, self.resultado)
+        return False
+
+
+class Metricas:
+    def __init__(self, cubos=CUBOS_S):
+        self.cubos = cubos
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self, cubos=None):
+        # Borra todo; con cubos distintos (p. ej. más finos para un benchmark)
+        with self._lock:
+            self.cubos = cubos or self.cubos
+            self._contadores = {}
+            self._histogramas = {}
+            self._inicio = time.perf_counter()
+            self._inicio_reloj = time.time()
+
+    def tramo(self, etapa, fase):
+        # with metricas.tramo('perfil', 'goto') as tramo: ... (tramo.resultado es opcional)
+        return Tramo(self, etapa, fase)
+
+    def registrar_tramo(self, etapa, fase, duracion, resultado):
+        with self._lock:
+            self._observar('duracion_segundos', duracion, (('etapa', etapa), ('fase', fase)))
+            self._contar('tramos_total', 1, (('etapa', etapa), ('fase', fase), ('resultado', resultado)))
+
+    def contar(self, nombre, cantidad=1, **etiquetas):
+        with self._lock:
+            self._contar(nombre, cantidad, tuple(sorted(etiquetas.items())))
+
+    def observar(self, nombre, valor, **etiquetas):
+        with self._lock:
+            self._observar(nombre, valor, tuple(sorted(etiquetas.items())))
+
+    def reintento(self, etapa, error):
+        self.contar('reintentos_total', etapa=etapa, motivo=motivo_error(error))
+
+    def prometheus(self):
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((clave, list(h.conteos), h.suma, h.total) for clave, h in self._histogramas.items())
+        lineas = []
+        anterior = None
+        for (nombre, etiquetas), valor in contadores:
+            if nombre != anterior:
+                lineas.append(f"# TYPE {PREFIJO}{nombre} counter")
+                anterior = nombre
+            lineas.append(f"{PREFIJO}{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+        for (nombre, etiquetas), conteos, suma, total in histogramas:
+            if nombre != anterior:
+                lineas.append(f"# TYPE {PREFIJO}{nombre} histogram")
+                anterior = nombre
+            acumulado = 0
+            for limite, conteo in zip(self.cubos + ('+Inf',), conteos):
+                acumulado += conteo
+                lineas.append(f"{PREFIJO}{nombre}_bucket{_etiquetas(etiquetas + (('le', limite),))} {acumulado}")
+            lineas.append(f"{PREFIJO}{nombre}_sum{_etiquetas(etiquetas)} {_numero(suma)}")
+            lineas.append(f"{PREFIJO}{nombre}_count{_etiquetas(etiquetas)} {total}")
+        return '\n'.join(lineas) + '\n'
+
+    def resumen(self):
+        with self._lock:
+            duracion = time.perf_counter() - self._inicio
+            fases = {}
+            for (nombre, etiquetas), histograma in sorted(self._histogramas.items()):
+                if nombre != 'duracion_segundos':
+                    continue
+                datos = dict(etiquetas)
+                fases[f"{datos['etapa']}.{datos['fase']}"] = {
+                    'n': histograma.total,
+                    'media_s': round(histograma.suma / histograma.total, 4),
+                    **{f"p{round(q * 100)}_s": round(histograma.cuantil(q), 4) for q in CUANTILES},
+                    'max_s': round(histograma.maximo, 4),
+                }
+            contadores = {}
+            for (nombre, etiquetas), valor in sorted(self._contadores.items()):
+                clave = ','.join(f"{k}={v}" for k, v in etiquetas) or 'total'
+                contadores.setdefault(nombre, {})[clave] = valor
+
+        # Los intentos con navegador y los resueltos por la vía rápida HTTP
+        # (los escalados se cuentan cuando el navegador los intenta)
+        tramos = contadores.get('tramos_total', {})
+        intentos = {}
+        http = 0
+        for clave, valor in tramos.items():
+            if not clave.startswith(('etapa=perfil,fase=intento,', 'etapa=perfil,fase=http,')):
+                continue
+            resultado = clave.rsplit('=', 1)[1]
+            if ',fase=http,' in clave:
+                http += valor
+                if resultado == 'escalado':
+                    continue
+            intentos[resultado] = intentos.get(resultado, 0) + valor
+        exitos = intentos.get('ok', 0)
+        sin_datos = intentos.get('sin_datos', 0)
+        total_intentos = sum(intentos.values())
+        escalados = sum(contadores.get('escalados_total', {}).values())
+        return {
+            'inicio': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._inicio_reloj)),
+            'duracion_s': round(duracion, 3),
+            'paginas_por_s': round(sum(v for k, v in tramos.items()
+                                       if ',fase=goto,' in k or ',fase=http,' in k) / duracion, 3) if duracion else 0.0,
+            'perfiles_por_s': round((exitos + sin_datos) / duracion, 3) if duracion else 0.0,
+            'tasa_exito': round(exitos / total_intentos, 4) if total_intentos else None,
+            'tasa_escalado_http': round(escalados / http, 4) if http else None,
+            'fases': fases,
+            'contadores': contadores,
+        }
+
+    def guardar_resumen(self, ruta):
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=2)
+        logging.info(f"Resumen de métricas guardado en {ruta}")
+
+    def _contar(self, nombre, cantidad, etiquetas):
+        clave = (nombre, etiquetas)
+        self._contadores[clave] = self._contadores.get(clave, 0) + cantidad
+
+    def _observar(self, nombre, valor, etiquetas):
+        clave = (nombre, etiquetas)
+        histograma = self._histogramas.get(clave)
+        if histograma is None:
+            histograma = self._histogramas[clave] = Histograma(self.cubos)
+        histograma.observar(valor)
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    partes = []
+    for nombre, valor in etiquetas:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def servir_metricas(puerto, metricas=None, direccion='127.0.0.1'):
+    # Servidor HTTP en un hilo demonio; devuelve el servidor para poder cerrarlo
+    metricas = metricas or METRICAS_POR_DEFECTO
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] == '/metrics':
+                cuerpo, tipo = metricas.prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path.split('?')[0] == '/resumen':
+                cuerpo, tipo = json.dumps(metricas.resumen(), ensure_ascii=False), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            cuerpo = cuerpo.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='metricas', daemon=True).start()
+    logging.info(f"Métricas en http://{direccion}:{servidor.server_address[1]}/metrics")
+    return servidor
+
+
+METRICAS_POR_DEFECTO = Metricas()
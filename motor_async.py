@@ -0,0 +1,532 @@
+import asyncio
+import logging
+import threading
+from cache_perfiles import consultar_cache
+from cadencia import LIMITADOR_POR_DEFECTO, retraso_reintento
+from esperas import SELECTORES_SERP, esperar_selectores_async
+from extraccion import extraer_perfil_async
+from fallos import (SELECTORES_CONTENIDO_SERP, ErrorBloqueo, clasificar_error, clasificar_respuesta, detectar_muro_async,
+                    resolver_fallo)
+from metricas import METRICAS_POR_DEFECTO
+from politica_recursos import POLITICA_POR_DEFECTO
+from pool_navegadores import PoolNavegadoresAsync
+from programador import Programador
+from sesiones import OK, usar_sesion_async
+from urls import MAX_PAGINAS_SERP, RESULTADOS_POR_DEFECTO, extraer_url_perfil, url_busqueda_google
+
+# Motor de scraping asíncrono sobre playwright.async_api.
+#
+# Un único event loop mantiene decenas de páginas en vuelo; un semáforo limita
+# la concurrencia. Devuelve los mismos diccionarios de perfil que el motor
+# basado en hilos de version_sin_steeamlit.py.
+
+CONCURRENCIA_POR_DEFECTO = 20
+NAVEGADORES_POR_DEFECTO = 2
+CONCURRENCIA_SERP_POR_DEFECTO = 4
+
+
+async def archivar_async(archivo, url, page, tipo, response):
+    # Comprimir y escribir en disco fuera del bucle de eventos
+    html = await page.content()
+    await asyncio.to_thread(archivo.guardar, url, html, tipo, response.status if response else None)
+
+
+async def iterar_resultados_google_async(search_query, pool, objetivo=RESULTADOS_POR_DEFECTO, politica=POLITICA_POR_DEFECTO,
+                                         archivo=None):
+    # Generador asíncrono: recorre las páginas de resultados y entrega cada
+    # perfil en cuanto se lee, para que su scraping empiece enseguida
+    vistos = set()
+    async with pool.contexto() as context:
+        page = await context.new_page()
+        recursos = await politica.instalar_async(page) if politica else None
+        try:
+            for pagina in range(MAX_PAGINAS_SERP):
+                search_url = url_busqueda_google(search_query, pagina * 10)
+                with METRICAS_POR_DEFECTO.tramo('serp', 'pagina'):
+                    with METRICAS_POR_DEFECTO.tramo('serp', 'limitador'):
+                        await LIMITADOR_POR_DEFECTO.esperar_async(search_url)
+                    with METRICAS_POR_DEFECTO.tramo('serp', 'goto'):
+                        response = await page.goto(search_url, timeout=60000, wait_until='domcontentloaded')
+                    fallo = clasificar_respuesta(response.status if response else None, page.url) or \
+                        await detectar_muro_async(page, SELECTORES_CONTENIDO_SERP)
+                    if fallo:
+                        if isinstance(fallo, ErrorBloqueo):
+                            LIMITADOR_POR_DEFECTO.registrar_bloqueo(search_url, fallo.motivo)
+                        raise fallo
+                    LIMITADOR_POR_DEFECTO.registrar_exito(search_url)
+                    with METRICAS_POR_DEFECTO.tramo('serp', 'selectores'):
+                        await esperar_selectores_async(page, SELECTORES_SERP)
+                    if archivo:
+                        with METRICAS_POR_DEFECTO.tramo('serp', 'archivo'):
+                            await archivar_async(archivo, search_url, page, 'serp', response)
+
+                    # Todos los href de la página en una sola llamada al navegador
+                    with METRICAS_POR_DEFECTO.tramo('serp', 'enlaces'):
+                        hrefs = await page.eval_on_selector_all('a', 'enlaces => enlaces.map(a => a.getAttribute("href"))')
+                nuevos = 0
+                for href in hrefs:
+                    real_url = extraer_url_perfil(href)  # Ya canónica
+                    if real_url is None or real_url in vistos:
+                        continue
+                    vistos.add(real_url)
+                    nuevos += 1
+                    METRICAS_POR_DEFECTO.contar('perfiles_encontrados_total')
+                    logging.info(f"Perfil encontrado: {real_url}")
+                    yield real_url
+                    if len(vistos) >= objetivo:
+                        return
+
+                # Una página sin perfiles nuevos indica que no hay más resultados
+                if nuevos == 0:
+                    break
+
+        except Exception as e:
+            logging.error(f"Error al extraer enlaces: {e}")
+        finally:
+            if politica:
+                politica.cerrar_pagina(search_query, recursos)
+
+
+async def scrape_google_results_async(search_query, pool, politica=POLITICA_POR_DEFECTO, objetivo=RESULTADOS_POR_DEFECTO,
+                                      archivo=None):
+    return [link async for link in iterar_resultados_google_async(search_query, pool, objetivo, politica, archivo)]
+
+
+async def iterar_plan_async(search_query, pool, objetivo=RESULTADOS_POR_DEFECTO, politica=POLITICA_POR_DEFECTO,
+                            archivo=None, objetivo_plan=None, concurrencia=CONCURRENCIA_SERP_POR_DEFECTO):
+    # Como iterar_resultados_google_async, pero search_query puede ser la
+    # lista de subconsultas de un plan (plan_consultas.py): se recorren hasta
+    # `concurrencia` a la vez, cada una con su objetivo, y cada perfil se
+    # entrega una sola vez aunque aparezca en varias. El plan termina al
+    # llegar a objetivo_plan perfiles (por defecto, objetivo por subconsulta)
+    if isinstance(search_query, str):
+        async for link in iterar_resultados_google_async(search_query, pool, objetivo, politica, archivo):
+            yield link
+        return
+
+    subconsultas = list(search_query)
+    objetivo_plan = objetivo_plan or objetivo * len(subconsultas)
+    cola = asyncio.Queue()
+    semaforo = asyncio.Semaphore(concurrencia)
+    fin = object()
+
+    async def recorrer(subconsulta):
+        try:
+            async with semaforo:
+                async for link in iterar_resultados_google_async(subconsulta, pool, objetivo, politica, archivo):
+                    cola.put_nowait((subconsulta, link))
+        finally:
+            cola.put_nowait((subconsulta, fin))
+
+    tareas = [asyncio.create_task(recorrer(subconsulta)) for subconsulta in subconsultas]
+    vistos = set()
+    aportados = dict.fromkeys(subconsultas, 0)
+    duplicados = 0
+    activas = len(tareas)
+    try:
+        while activas and len(vistos) < objetivo_plan:
+            subconsulta, link = await cola.get()
+            if link is fin:
+                activas -= 1
+                continue
+            if link in vistos:
+                duplicados += 1
+                METRICAS_POR_DEFECTO.contar('perfiles_duplicados_total')
+                continue
+            vistos.add(link)
+            aportados[subconsulta] += 1
+            yield link
+    finally:
+        # Objetivo del plan alcanzado o generador abandonado: parar las SERP pendientes
+        for tarea in tareas:
+            tarea.cancel()
+        logging.info(f"Plan de {len(subconsultas)} subconsultas: {len(vistos)} perfiles distintos, "
+                     f"{duplicados} repetidos; por subconsulta: {aportados}")
+
+
+async def intentar_perfil_async(url, sesiones, pool, politica=POLITICA_POR_DEFECTO, cache=None, archivo=None,
+                                http=None):
+    # Un solo intento: devuelve el perfil, None si el resultado es definitivo
+    # (muro de login sin sesión, 404, faltan campos) o lanza una excepción si
+    # merece la pena reintentar. Los reintentos los decide el llamante (bucle
+    # local o cola de trabajo). sesiones es un PoolSesiones, una ruta de
+    # cookies o None. Con http (un ClienteHTTP) se prueba antes la vía rápida
+    # sin navegador
+    async with usar_sesion_async(sesiones) as uso:
+        sesion = uso['sesion']
+        if http:
+            resuelto, perfil = await http.intentar_async(url, uso, cache, archivo)
+            if resuelto:
+                return perfil
+        async with pool.contexto(sesion.estado if sesion else None) as context:
+            with METRICAS_POR_DEFECTO.tramo('perfil', 'pagina_nueva'):
+                page = await context.new_page()
+                recursos = await politica.instalar_async(page) if politica else None
+
+            try:
+                with METRICAS_POR_DEFECTO.tramo('perfil', 'intento') as intento:
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'limitador'):
+                        await LIMITADOR_POR_DEFECTO.esperar_async(url)
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'goto'):
+                        response = await page.goto(url, timeout=60000, wait_until='domcontentloaded')
+
+                    # Código y URL final y, si el perfil no está en el DOM, captcha, authwall
+                    # o "no disponible": sin esperar a selectores que no van a aparecer
+                    fallo = clasificar_respuesta(response.status if response else None, page.url)
+                    if fallo is None:
+                        with METRICAS_POR_DEFECTO.tramo('perfil', 'detector'):
+                            fallo = await detectar_muro_async(page)
+                    if fallo:
+                        if isinstance(fallo, ErrorBloqueo):
+                            LIMITADOR_POR_DEFECTO.registrar_bloqueo(url, fallo.motivo)
+                        intento.resultado = resolver_fallo(fallo, url, uso, cache)
+                        return None
+                    LIMITADOR_POR_DEFECTO.registrar_exito(url)
+                    uso['resultado'] = OK
+
+                    # Esperar solo a los elementos que se van a extraer
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'selectores'):
+                        await esperar_selectores_async(page)
+                    if archivo:
+                        # Se archiva antes de extraer: si cambian los selectores se puede reextraer
+                        with METRICAS_POR_DEFECTO.tramo('perfil', 'archivo'):
+                            await archivar_async(archivo, url, page, 'perfil', response)
+
+                    # Extraer todo el perfil en una sola llamada al navegador
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'extraccion'):
+                        perfil = await extraer_perfil_async(page, url=url)
+                    if perfil is None:
+                        logging.warning(f"No se pudieron encontrar algunos elementos en el perfil {url}.")
+                        intento.resultado = 'sin_datos'
+                        return None
+
+                    logging.info(f"Perfil extraído exitosamente: {url}")
+                    if cache:
+                        cache.guardar(url, perfil)
+                    return perfil
+
+            finally:
+                if politica:
+                    politica.cerrar_pagina(url, recursos)
+
+
+async def scrape_linkedin_profile_async(url, sesiones, pool, politica=POLITICA_POR_DEFECTO, cache=None, archivo=None,
+                                        http=None):
+    with METRICAS_POR_DEFECTO.tramo('perfil', 'total') as total:
+        for intento in range(1, 4):  # Intentar 3 veces
+            try:
+                # La vía rápida solo en el primer intento: los reintentos van al navegador
+                perfil = await intentar_perfil_async(url, sesiones, pool, politica, cache, archivo,
+                                                     http if intento == 1 else None)
+                total.resultado = 'ok' if perfil else 'sin_datos'
+                return perfil
+            except Exception as e:
+                fallo = clasificar_error(e)
+                if not fallo.reintentable:
+                    # Reintentar no cambiaría nada: el trabajador pasa a otro perfil
+                    logging.error(f"Error no reintentable en el perfil {url}: {e}")
+                    total.resultado = fallo.motivo
+                    return None
+                logging.error(f"Error al extraer perfil {url} en intento {intento}: {e}. Reintentando...")
+                METRICAS_POR_DEFECTO.reintento('perfil', fallo)
+                with METRICAS_POR_DEFECTO.tramo('perfil', 'backoff'):
+                    await asyncio.sleep(retraso_reintento(intento))  # Backoff exponencial con jitter
+
+        logging.error(f"No se pudo extraer el perfil después de 3 intentos: {url}")
+        total.resultado = 'agotado'
+        return None
+
+
+async def _iterar(links):
+    # Admite tanto listas como generadores asíncronos de links
+    if hasattr(links, '__aiter__'):
+        async for link in links:
+            yield link
+    else:
+        for link in links:
+            yield link
+
+
+async def _siguiente_link(links):
+    # (link, prioridad) del próximo elemento; los links pueden traer su prioridad
+    elemento = await links.__anext__()
+    return elemento if isinstance(elemento, tuple) else (elemento, None)
+
+
+async def _acotar(corrutina, segundos):
+    if segundos is None:
+        return await corrutina
+    return await asyncio.wait_for(corrutina, segundos)
+
+
+async def iterar_perfiles_async(links, sesiones, pool, concurrencia=CONCURRENCIA_POR_DEFECTO,
+                                politica=POLITICA_POR_DEFECTO, cache=None, refrescar=False, archivo=None, vistos=None,
+                                http=None, programador=None):
+    # Generador asíncrono de (link, perfil) en orden de finalización; perfil es
+    # None si no se pudo extraer. Como mucho hay `concurrencia` perfiles en
+    # vuelo y otros tantos leídos en espera: los links se siguen leyendo a
+    # medida que se liberan huecos, así que la memoria no crece con el tamaño
+    # del lote. Los links son URLs o (url, prioridad); el programador
+    # (programador.py) lanza primero los más prioritarios y aplica los plazos:
+    # al vencer, los perfiles sin terminar quedan en programador.pendientes()
+    programador = programador or Programador(retener=False)
+    programador.iniciar()
+    entrada = _iterar(links).__aiter__()
+    lectura = None
+    agotada = False
+    en_vuelo = {}
+    programados = set()  # links en espera o en vuelo, para no repetirlos mientras no terminan
+    total_links = 0
+    try:
+        while True:
+            if lectura is None and not agotada and programador.en_espera() < concurrencia:
+                lectura = asyncio.ensure_future(_siguiente_link(entrada))
+            while programador.en_espera() and len(en_vuelo) < concurrencia and not programador.vencido():
+                link, prioridad = programador.siguiente()
+                tarea = asyncio.create_task(_acotar(scrape_linkedin_profile_async(
+                    link, sesiones, pool, politica, cache, archivo, http), programador.presupuesto()))
+                en_vuelo[tarea] = (link, prioridad)
+
+            esperas = set(en_vuelo) | ({lectura} if lectura else set())
+            if not esperas:
+                break
+            hechas, _ = await asyncio.wait(esperas, timeout=programador.restante(),
+                                           return_when=asyncio.FIRST_COMPLETED)
+            if not hechas:
+                logging.warning(f"Plazo de {programador.plazo_s} s vencido: se entregan los perfiles terminados")
+                break
+
+            if lectura in hechas:
+                hechas.discard(lectura)
+                try:
+                    link, prioridad = lectura.result()
+                except StopAsyncIteration:
+                    agotada = True
+                else:
+                    total_links += 1
+                    # El conjunto de vistas se consulta antes de programar trabajo
+                    # de navegador, pero una URL solo se marca como vista al
+                    # extraerse: las que fallan o se aplazan se repiten en otra ejecución
+                    if vistos is not None and (link in programados or vistos.contiene(link)):
+                        logging.info(f"Perfil {link} omitido: ya visto en otra consulta")
+                    else:
+                        en_cache, perfil = consultar_cache(link, cache, refrescar)
+                        if en_cache:
+                            programador.resolver(link, perfil, prioridad)
+                            if perfil and vistos is not None:
+                                vistos.agregar(link)
+                            yield link, perfil
+                        else:
+                            programador.agregar(link, prioridad)
+                            if vistos is not None:
+                                programados.add(link)
+                lectura = None
+
+            for tarea in hechas:
+                link, prioridad = en_vuelo.pop(tarea)
+                programados.discard(link)
+                try:
+                    perfil = tarea.result()
+                except asyncio.TimeoutError:
+                    # Presupuesto del perfil (o plazo de la petición) agotado
+                    programador.aplazar(link, prioridad, 'presupuesto')
+                    continue
+                except Exception as exc:
+                    logging.error(f'El perfil {link} generó una excepción: {exc}')
+                    perfil = None
+                programador.terminar(link, prioridad, perfil)
+                if perfil and vistos is not None:
+                    vistos.agregar(link)
+                yield link, perfil
+
+        if not total_links and agotada:
+            logging.warning("No se encontraron enlaces de LinkedIn.")
+    finally:
+        # Plazo vencido, cancelación o generador abandonado: no dejar perfiles
+        # huérfanos en vuelo; los que no terminaron quedan pendientes
+        if lectura:
+            lectura.cancel()
+        for tarea, (link, prioridad) in en_vuelo.items():
+            tarea.cancel()
+            programador.aplazar(link, prioridad, 'plazo')
+        programador.aplazar_espera()
+
+
+async def scrapear_perfiles_async(links, sesiones, pool, concurrencia=CONCURRENCIA_POR_DEFECTO,
+                                  politica=POLITICA_POR_DEFECTO, cache=None, refrescar=False, archivo=None, vistos=None,
+                                  http=None, programador=None):
+    # Cada perfil se lanza en cuanto llega su link, mientras se siguen leyendo
+    # resultados. Los perfiles se devuelven en orden de prioridad (el puesto
+    # en la SERP), no de finalización
+    programador = programador or Programador()
+    async for _ in iterar_perfiles_async(links, sesiones, pool, concurrencia, politica, cache, refrescar, archivo,
+                                         vistos, http, programador):
+        pass
+    return programador.perfiles()
+
+
+async def buscar_y_scrapear_async(search_query, sesiones=None, concurrencia=CONCURRENCIA_POR_DEFECTO,
+                                  navegadores=NAVEGADORES_POR_DEFECTO, politica=POLITICA_POR_DEFECTO,
+                                  cache=None, refrescar=False, objetivo=RESULTADOS_POR_DEFECTO, archivo=None, vistos=None,
+                                  pool=None, cdp=None, http=None, objetivo_plan=None, programador=None):
+    # search_query es una consulta o la lista de subconsultas de un plan. Con
+    # un Programador con plazo se devuelven los perfiles terminados a tiempo y
+    # el resto queda en programador.pendientes()
+    if pool is None:
+        async with PoolNavegadoresAsync(tamano=navegadores, cdp=cdp) as pool:
+            return await buscar_y_scrapear_async(search_query, sesiones, concurrencia, navegadores, politica, cache,
+                                                 refrescar, objetivo, archivo, vistos, pool, http=http,
+                                                 objetivo_plan=objetivo_plan, programador=programador)
+
+    programador = programador or Programador()
+    linkedin_links = iterar_plan_async(search_query, pool, objetivo, politica, archivo, objetivo_plan)
+    linkedin_profiles = await scrapear_perfiles_async(linkedin_links, sesiones, pool, concurrencia, politica,
+                                                      cache, refrescar, archivo, vistos, http, programador)
+    logging.info(f"Estadísticas del pool de navegadores: {pool.estadisticas()}")
+    logging.info(f"Programación: {programador.estadisticas()}")
+    if http:
+        logging.info(f"Vía rápida HTTP: {http.estadisticas()}")
+    if politica:
+        logging.info(f"Recursos bloqueados: {politica.resumen()}")
+    logging.info(f"Tasas por host: {LIMITADOR_POR_DEFECTO.tasas()}")
+    if cache:
+        logging.info(f"Estadísticas de la caché: {cache.estadisticas()}")
+    if vistos is not None:
+        logging.info(f"Perfiles vistos: {vistos.estadisticas()}")
+    return linkedin_profiles
+
+
+def buscar_y_scrapear_sync(search_query, sesiones=None, concurrencia=CONCURRENCIA_POR_DEFECTO,
+                           navegadores=NAVEGADORES_POR_DEFECTO, politica=POLITICA_POR_DEFECTO,
+                           cache=None, refrescar=False, objetivo=RESULTADOS_POR_DEFECTO, archivo=None, vistos=None,
+                           cdp=None, http=None, objetivo_plan=None, programador=None):
+    # Envoltorio síncrono para los main() de Streamlit y de la CLI
+    async def ejecutar():
+        try:
+            return await buscar_y_scrapear_async(search_query, sesiones, concurrencia, navegadores, politica,
+                                                 cache, refrescar, objetivo, archivo, vistos, cdp=cdp, http=http,
+                                                 objetivo_plan=objetivo_plan, programador=programador)
+        finally:
+            # El cliente asíncrono queda ligado a este bucle de eventos
+            if http:
+                await http.cerrar_async()
+
+    return asyncio.run(ejecutar())
+
+
+class TrabajoBusqueda:
+    # Estado de una búsqueda lanzada en MotorFondo. Se lee desde otros hilos
+    # (la interfaz) mientras el bucle de eventos lo va rellenando. Se da por
+    # terminado cuando _ejecutar acaba del todo, después de devolver los
+    # pendientes a la cola, no cuando se pide cancelarlo
+    def __init__(self, search_query, programador=None):
+        self.search_query = search_query
+        self.programador = programador or Programador(retener=False)
+        self.perfiles = []
+        self.links = 0
+        self.procesados = 0
+        self.error = None
+        self.cancelado = False
+        self.future = None
+        self._loop = None
+        self._tarea = None
+        self._hecho = threading.Event()
+        self._lock = threading.Lock()
+
+    def nuevos(self, desde):
+        # Perfiles terminados a partir de la posición `desde`
+        with self._lock:
+            return self.perfiles[desde:]
+
+    def progreso(self):
+        with self._lock:
+            return {'links': self.links, 'procesados': self.procesados, 'perfiles': len(self.perfiles),
+                    'pendientes': len(self.programador.pendientes())}
+
+    def terminado(self):
+        return self._hecho.is_set()
+
+    def cancelar(self):
+        # La tarea se cancela en su bucle; terminado() pasa a ser cierto
+        # cuando su finally ha aplazado y devuelto lo que estaba en vuelo
+        if self._loop and not self.cancelado and not self.terminado():
+            self._loop.call_soon_threadsafe(self._cancelar_en_bucle)
+
+    def _cancelar_en_bucle(self):
+        self.cancelado = True
+        if self._tarea:
+            self._tarea.cancel()
+
+    async def _contar_links(self, links):
+        async for link in links:
+            with self._lock:
+                self.links += 1
+            yield link
+
+    def _registrar(self, perfil):
+        with self._lock:
+            self.procesados += 1
+            if perfil:
+                self.perfiles.append(perfil)
+
+
+class MotorFondo:
+    # Bucle de eventos propio en un hilo demonio, con un pool de navegadores
+    # que sobrevive entre búsquedas. Permite lanzar búsquedas desde código
+    # síncrono (Streamlit) y consultar su progreso sin bloquear. Con plazo, lo
+    # que no termina a tiempo se devuelve a `cola` (cola_trabajo.py) para que
+    # lo acaben los trabajadores por lotes
+    def __init__(self, navegadores=NAVEGADORES_POR_DEFECTO, concurrencia=CONCURRENCIA_POR_DEFECTO,
+                 politica=POLITICA_POR_DEFECTO, cdp=None, http=None, cola=None):
+        self.concurrencia = concurrencia
+        self.politica = politica
+        self.http = http
+        self.cola = cola
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name='motor-fondo', daemon=True)
+        self._hilo.start()
+        self.pool = PoolNavegadoresAsync(tamano=navegadores, cdp=cdp)
+        asyncio.run_coroutine_threadsafe(self.pool.iniciar(), self._loop).result()
+
+    def lanzar(self, search_query, sesiones=None, cache=None, refrescar=False, objetivo=RESULTADOS_POR_DEFECTO,
+               archivo=None, plazo_s=None, presupuesto_url_s=None):
+        # Los perfiles se guardan en el trabajo según llegan: el programador no los retiene
+        trabajo = TrabajoBusqueda(search_query, Programador(plazo_s, presupuesto_url_s, retener=False))
+        trabajo._loop = self._loop
+        trabajo.future = asyncio.run_coroutine_threadsafe(
+            self._ejecutar(trabajo, sesiones, cache, refrescar, objetivo, archivo), self._loop)
+        return trabajo
+
+    def cerrar(self):
+        asyncio.run_coroutine_threadsafe(self.pool.cerrar(), self._loop).result()
+        if self.http:
+            asyncio.run_coroutine_threadsafe(self.http.cerrar_async(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join()
+
+    async def _ejecutar(self, trabajo, sesiones, cache, refrescar, objetivo, archivo):
+        trabajo._tarea = asyncio.current_task()
+        links = trabajo._contar_links(
+            iterar_plan_async(trabajo.search_query, self.pool, objetivo, self.politica, archivo))
+        perfiles = iterar_perfiles_async(links, sesiones, self.pool, self.concurrencia, self.politica, cache,
+                                         refrescar, archivo, http=self.http, programador=trabajo.programador)
+        try:
+            if trabajo.cancelado:
+                # Cancelado antes de empezar
+                raise asyncio.CancelledError()
+            async for _, perfil in perfiles:
+                trabajo._registrar(perfil)
+        except Exception as e:
+            logging.error(f"La búsqueda en segundo plano falló: {e}")
+            trabajo.error = e
+        finally:
+            # También al cancelar el trabajo: cerrar el generador aplaza los
+            # perfiles en vuelo y lo pendiente vuelve a la cola
+            try:
+                await perfiles.aclose()
+                logging.info(f"Programación: {trabajo.programador.estadisticas()}")
+                if self.cola:
+                    await asyncio.to_thread(trabajo.programador.devolver_pendientes, self.cola)
+                logging.info(f"Estadísticas del pool de navegadores: {self.pool.estadisticas()}")
+            finally:
+                trabajo._hecho.set()
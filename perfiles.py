@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sys
+
+# Registro compacto de un perfil extraído.
+#
+# Clases con __slots__ (sin __dict__ por instancia) y entradas de experiencia
+# y educación estructuradas en lugar de cadenas ya formateadas. Los valores
+# que se repiten mucho entre perfiles (ubicación, empresa, centro) se
+# internan: millones de "Madrid, Spain" comparten un único objeto.
+#
+# Para no romper el código que trataba los perfiles como diccionarios,
+# Perfil admite perfil['name'] y perfil.get('name'), y str() de una entrada
+# da el texto de siempre ("{title} at {company}"). como_dict() es la forma
+# JSON (caché, JSONL, cola) y desde_dict() la lee, también en el formato
+# antiguo de cadenas. huella() resume el contenido (sin la URL ni la fecha de
+# obtención) para saber si un perfil cambió entre dos visitas.
+
+
+def _internar(texto):
+    return sys.intern(texto) if texto else texto
+
+
+class _Entrada:
+    # Base de las entradas de las listas; cada subclase declara sus __slots__
+    __slots__ = ()
+    FORMATO = ''
+    SEPARADOR = ''
+
+    def __str__(self):
+        return self.FORMATO.format(**self.como_dict())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(repr(getattr(self, c)) for c in self.__slots__)})"
+
+    def __eq__(self, otra):
+        return type(self) is type(otra) and self.como_dict() == otra.como_dict()
+
+    def __hash__(self):
+        return hash((type(self),) + tuple(getattr(self, c) for c in self.__slots__))
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    @classmethod
+    def desde(cls, valor):
+        # Diccionario estructurado, o cadena formateada de versiones anteriores
+        if isinstance(valor, cls):
+            return valor
+        if isinstance(valor, dict):
+            return cls(**{campo: valor.get(campo) for campo in cls.__slots__})
+        izquierda, _, derecha = str(valor).rpartition(cls.SEPARADOR)
+        return cls._desde_partes(izquierda, derecha) if izquierda else cls._desde_partes(derecha, None)
+
+
+class Experiencia(_Entrada):
+    __slots__ = ('title', 'company')
+    FORMATO = '{title} at {company}'
+    SEPARADOR = ' at '
+
+    def __init__(self, title, company):
+        self.title = title
+        self.company = _internar(company)
+
+    @classmethod
+    def _desde_partes(cls, izquierda, derecha):
+        return cls(title=izquierda, company=derecha)
+
+
+class Educacion(_Entrada):
+    __slots__ = ('school', 'degree')
+    FORMATO = '{degree} from {school}'
+    SEPARADOR = ' from '
+
+    def __init__(self, school, degree):
+        self.school = _internar(school)
+        self.degree = _internar(degree)
+
+    @classmethod
+    def _desde_partes(cls, izquierda, derecha):
+        return cls(school=derecha, degree=izquierda)
+
+
+class Perfil:
+    __slots__ = ('url', 'name', 'position', 'location', 'experience', 'education', 'obtenido')
+    LISTAS = {'experience': Experiencia, 'education': Educacion}
+
+    def __init__(self, url, name, position, location, experience=(), education=(), obtenido=None):
+        self.url = url
+        self.name = name
+        self.position = position
+        self.location = _internar(location)
+        self.experience = tuple(Experiencia.desde(e) for e in experience)
+        self.education = tuple(Educacion.desde(e) for e in education)
+        self.obtenido = obtenido  # Solo los perfiles reextraídos del archivo HTML
+
+    # Acceso como diccionario, para el código que usaba perfiles dict
+    def __getitem__(self, campo):
+        if campo not in self.__slots__:
+            raise KeyError(campo)
+        return getattr(self, campo)
+
+    def get(self, campo, defecto=None):
+        valor = getattr(self, campo, None) if campo in self.__slots__ else None
+        return defecto if valor is None else valor
+
+    def keys(self):
+        return [campo for campo in self.__slots__ if getattr(self, campo) is not None]
+
+    def __repr__(self):
+        return f"Perfil({self.url!r}, {self.name!r})"
+
+    def __eq__(self, otro):
+        return isinstance(otro, Perfil) and all(getattr(self, c) == getattr(otro, c) for c in self.__slots__)
+
+    __hash__ = None
+
+    def como_dict(self):
+        datos = {campo: getattr(self, campo) for campo in self.__slots__[:4]}
+        for lista in self.LISTAS:
+            datos[lista] = [entrada.como_dict() for entrada in getattr(self, lista)]
+        if self.obtenido is not None:
+            datos['obtenido'] = self.obtenido
+        return datos
+
+    def huella(self):
+        # Hash del top card, la experiencia y la educación
+        datos = self.como_dict()
+        contenido = [datos[campo] for campo in ('name', 'position', 'location', 'experience', 'education')]
+        serializado = json.dumps(contenido, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.blake2b(serializado.encode('utf-8'), digest_size=16).hexdigest()
+
+    @classmethod
+    def desde_dict(cls, datos):
+        if datos is None or isinstance(datos, cls):
+            return datos
+        return cls(**{campo: datos[campo] for campo in cls.__slots__ if campo in datos})
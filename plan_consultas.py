@@ -0,0 +1,144 @@
+import itertools
+import json
+import logging
+import re
+from cache_llm import completar_con_cache
+from consulta_llm import cliente_openai, generate_linkedin_search_query
+from metricas import METRICAS_POR_DEFECTO
+
+# Planificador de consultas: una petición en lenguaje natural se abre en
+# varias subconsultas de Google que se recorren a la vez
+# (motor_async.iterar_plan_async), con deduplicación entre ellas y un objetivo
+# por subconsulta y otro para el plan. Cada SERP entrega como mucho unas
+# decenas de perfiles útiles; con N subconsultas disjuntas el número de
+# perfiles alcanzables crece con N en lugar de quedarse en una sola SERP.
+#
+# Dos modos, ambos con una sola llamada al LLM:
+#   'or'   la consulta de siempre (generate_linkedin_search_query) y sus
+#          grupos ("France" OR "Germany" OR ...) se expanden sin LLM: una
+#          subconsulta por alternativa
+#   'llm'  el LLM devuelve directamente la lista de subconsultas (un país,
+#          una ciudad o un centro por subconsulta)
+#
+# Al expandir, la alternativa i excluye (-"...") las anteriores: las
+# subconsultas no se solapan y un perfil que mencione MIT y Stanford solo
+# aparece en la de MIT. Si las exclusiones pasan del límite de palabras de
+# Google se omiten, y los repetidos los descarta la deduplicación.
+
+MODOS = ('or', 'llm')
+MAX_SUBCONSULTAS = 8
+MAX_PALABRAS_GOOGLE = 32
+PREFIJO_SITIO = 'site:linkedin.com/in/'
+_GRUPO_OR = re.compile(r'\(([^()]*)\)')
+_SEPARADOR_OR = re.compile(r'\s+(?:OR|\|)\s+')
+
+PROMPT_PLAN = """Eres un planificador de búsquedas de Google para encontrar perfiles de LinkedIn. Cada búsqueda de Google devuelve pocos resultados útiles, así que divides la petición del usuario en varias búsquedas que no se solapen: una por país, ciudad, centro de estudios, empresa o alternativa, según lo que pida el usuario. Entre todas deben cubrir la petición completa.
+
+            Responde solo con un array JSON de cadenas, sin explicaciones. Cada cadena empieza por site:linkedin.com/in/ y usa comillas para los términos exactos. No uses OR sobre la dimensión que ya has dividido.
+
+            Ejemplo:
+            Entrada: "Busco perfiles en LinkedIn de personas que trabajen en ventas y estén ubicadas en Europa."
+            output: ["site:linkedin.com/in/ \\"sales\\" \\"France\\"", "site:linkedin.com/in/ \\"sales\\" \\"Germany\\"", "site:linkedin.com/in/ \\"sales\\" \\"Spain\\"", "site:linkedin.com/in/ \\"sales\\" \\"Italy\\"", "site:linkedin.com/in/ \\"sales\\" \\"United Kingdom\\""]
+            """
+
+
+def grupos_or(search_query):
+    # [(inicio, fin, alternativas)] de cada grupo entre paréntesis con OR
+    grupos = []
+    for coincidencia in _GRUPO_OR.finditer(search_query):
+        alternativas = [a.strip() for a in _SEPARADOR_OR.split(coincidencia.group(1)) if a.strip()]
+        if len(alternativas) > 1:
+            grupos.append((coincidencia.start(), coincidencia.end(), alternativas))
+    return grupos
+
+
+def _exclusion(termino):
+    return f"-{termino}" if termino.startswith('"') or ' ' not in termino else f'-"{termino}"'
+
+
+def expandir_consulta(search_query, max_subconsultas=MAX_SUBCONSULTAS, disjuntas=True):
+    # Subconsultas de search_query con sus grupos OR expandidos, los más
+    # grandes primero, mientras el número total no pase de max_subconsultas.
+    # Los grupos que no caben se quedan como están
+    grupos = sorted(grupos_or(search_query), key=lambda g: len(g[2]), reverse=True)
+    elegidos = []
+    total = 1
+    for grupo in grupos:
+        if total * len(grupo[2]) <= max_subconsultas:
+            elegidos.append(grupo)
+            total *= len(grupo[2])
+    if not elegidos:
+        return [search_query]
+    elegidos.sort(key=lambda g: g[0])
+
+    subconsultas = []
+    for combinacion in itertools.product(*(range(len(g[2])) for g in elegidos)):
+        consulta = search_query
+        exclusiones = []
+        # De derecha a izquierda para no desplazar las posiciones pendientes
+        for (inicio, fin, alternativas), i in reversed(list(zip(elegidos, combinacion))):
+            consulta = consulta[:inicio] + alternativas[i] + consulta[fin:]
+            exclusiones[:0] = [_exclusion(a) for a in alternativas[:i]]
+        if disjuntas and exclusiones and len(consulta.split()) + len(exclusiones) <= MAX_PALABRAS_GOOGLE:
+            consulta = f"{consulta} {' '.join(exclusiones)}"
+        subconsultas.append(' '.join(consulta.split()))
+    return subconsultas
+
+
+def leer_subconsultas(respuesta, max_subconsultas=MAX_SUBCONSULTAS):
+    # Subconsultas de la respuesta del LLM: un array JSON o, si no lo es, las
+    # líneas con site:. Sin duplicados y con el prefijo del sitio
+    texto = respuesta.strip().strip('`')
+    if texto.startswith('json'):
+        texto = texto[len('json'):]
+    try:
+        candidatas = json.loads(texto)
+        if not isinstance(candidatas, list):
+            candidatas = []
+    except ValueError:
+        # Listas numeradas o con viñetas: desde site: hasta el final de la línea
+        candidatas = [linea[linea.index('site:'):] for linea in texto.splitlines() if 'site:' in linea]
+    subconsultas = []
+    for candidata in candidatas:
+        if not isinstance(candidata, str):
+            continue
+        candidata = ' '.join(candidata.strip().strip(',').strip().split())
+        if candidata.startswith('"') and candidata.endswith('"') and candidata.count('"') == 2:
+            candidata = candidata[1:-1]
+        if not candidata:
+            continue
+        if 'site:' not in candidata:
+            candidata = f"{PREFIJO_SITIO} {candidata}"
+        if candidata not in subconsultas:
+            subconsultas.append(candidata)
+    return subconsultas[:max_subconsultas]
+
+
+def planificar(prompt, modo='or', cache=None, determinista=False, max_subconsultas=MAX_SUBCONSULTAS, cliente=None):
+    # Lista de subconsultas de Google para la petición en lenguaje natural
+    if modo not in MODOS:
+        raise ValueError(f"Modo de planificación desconocido: {modo}")
+    if modo == 'or':
+        subconsultas = expandir_consulta(generate_linkedin_search_query(prompt, cache, determinista, cliente),
+                                         max_subconsultas)
+    else:
+        with METRICAS_POR_DEFECTO.tramo('consulta', 'llm'):
+            respuesta = completar_con_cache(
+                (lambda: cliente) if cliente else cliente_openai,
+                cache,
+                modelo="gpt-4",
+                system_prompt=PROMPT_PLAN,
+                prompt=prompt,
+                temperatura=0 if determinista else 0.5,
+                max_tokens=1000,
+                plantilla_usuario=f"Plan at most {max_subconsultas} non-overlapping LinkedIn search queries for: {{prompt}}"
+            )
+        subconsultas = leer_subconsultas(respuesta, max_subconsultas)
+        if len(subconsultas) <= 1:
+            # Una sola consulta (o ninguna legible): se expanden sus grupos OR
+            logging.warning("El LLM no devolvió varias subconsultas; se expande su respuesta")
+            subconsultas = expandir_consulta(subconsultas[0] if subconsultas else ' '.join(respuesta.split()),
+                                             max_subconsultas)
+    METRICAS_POR_DEFECTO.contar('subconsultas_total', len(subconsultas), modo=modo)
+    logging.info(f"Plan de {len(subconsultas)} subconsultas ({modo}): {subconsultas}")
+    return subconsultas
@@ -0,0 +1,150 @@
+import logging
+import re
+import threading
+from metricas import METRICAS_POR_DEFECTO
+
+# Política de recursos basada en page.route: aborta los tipos de recurso y las
+# URLs que el extractor nunca lee (imágenes, fuentes, vídeo, analítica...).
+#
+# Las peticiones abortadas no llegan a descargarse, así que los bytes
+# ahorrados son una estimación a partir de un tamaño medio por tipo. Los
+# bytes descargados sí son reales (Content-Length de las respuestas).
+
+# Los selectores del top-card, experiencia y educación solo necesitan el HTML
+# y los scripts que lo renderizan. Las hojas de estilo se dejan pasar porque
+# inner_text() depende del CSS (texto oculto con display:none).
+TIPOS_BLOQUEADOS = frozenset({
+    'image', 'media', 'font', 'texttrack', 'manifest', 'eventsource', 'websocket', 'ping',
+})
+
+PATRONES_BLOQUEADOS = (
+    r'google-analytics\.com',
+    r'googletagmanager\.com',
+    r'doubleclick\.net',
+    r'googlesyndication\.com',
+    r'googleadservices\.com',
+    r'facebook\.(net|com)/tr',
+    r'connect\.facebook\.net',
+    r'bat\.bing\.com',
+    r'hotjar\.com',
+    r'px\.ads\.linkedin\.com',
+    r'snap\.licdn\.com/li\.lms-analytics',
+    r'linkedin\.com/li/track',
+    r'linkedin\.com/sensorCollect',
+    r'linkedin\.com/realtime',
+    r'platform\.linkedin\.com/litms',
+    r'static\.licdn\.com/aero-v1/sc/h/.*\.(woff2?|ttf)',
+    r'media\.licdn\.com/dms/image',
+    r'gstatic\.com/.*\.(png|jpe?g|gif|webp|woff2?)',
+)
+
+# Tamaño medio aproximado (bytes) de cada tipo de recurso bloqueado
+TAMANO_MEDIO_BYTES = {
+    'image': 30_000,
+    'media': 500_000,
+    'font': 40_000,
+    'script': 60_000,
+    'stylesheet': 30_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+}
+TAMANO_MEDIO_OTROS = 2_000
+
+
+class EstadisticasRecursos:
+    def __init__(self):
+        self.peticiones_permitidas = 0
+        self.peticiones_bloqueadas = 0
+        self.bloqueadas_por_tipo = {}
+        self.bytes_descargados = 0
+        self.bytes_ahorrados_estimados = 0
+
+    def sumar(self, otras):
+        self.peticiones_permitidas += otras.peticiones_permitidas
+        self.peticiones_bloqueadas += otras.peticiones_bloqueadas
+        for tipo, cantidad in otras.bloqueadas_por_tipo.items():
+            self.bloqueadas_por_tipo[tipo] = self.bloqueadas_por_tipo.get(tipo, 0) + cantidad
+        self.bytes_descargados += otras.bytes_descargados
+        self.bytes_ahorrados_estimados += otras.bytes_ahorrados_estimados
+
+    def como_dict(self):
+        return {
+            'peticiones_permitidas': self.peticiones_permitidas,
+            'peticiones_bloqueadas': self.peticiones_bloqueadas,
+            'bloqueadas_por_tipo': dict(self.bloqueadas_por_tipo),
+            'bytes_descargados': self.bytes_descargados,
+            'bytes_ahorrados_estimados': self.bytes_ahorrados_estimados,
+        }
+
+
+class PoliticaRecursos:
+    def __init__(self, tipos_bloqueados=TIPOS_BLOQUEADOS, patrones_bloqueados=PATRONES_BLOQUEADOS,
+                 tamanos_medios=None):
+        self.tipos_bloqueados = frozenset(tipos_bloqueados)
+        self.patron = re.compile('|'.join(patrones_bloqueados)) if patrones_bloqueados else None
+        self.tamanos_medios = tamanos_medios or TAMANO_MEDIO_BYTES
+        self.totales = EstadisticasRecursos()
+        self._lock = threading.Lock()
+
+    def debe_bloquear(self, tipo, url):
+        if tipo == 'document':
+            return False
+        return tipo in self.tipos_bloqueados or bool(self.patron and self.patron.search(url))
+
+    def instalar(self, page):
+        estadisticas = EstadisticasRecursos()
+
+        def manejar(route):
+            request = route.request
+            if self._registrar(estadisticas, request.resource_type, request.url):
+                route.abort()
+            else:
+                route.continue_()
+
+        page.route('**/*', manejar)
+        page.on('response', lambda response: self._registrar_descarga(estadisticas, response))
+        return estadisticas
+
+    async def instalar_async(self, page):
+        estadisticas = EstadisticasRecursos()
+
+        async def manejar(route):
+            request = route.request
+            if self._registrar(estadisticas, request.resource_type, request.url):
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await page.route('**/*', manejar)
+        page.on('response', lambda response: self._registrar_descarga(estadisticas, response))
+        return estadisticas
+
+    def cerrar_pagina(self, url, estadisticas):
+        # Acumula las estadísticas de una página en los totales de la política
+        with self._lock:
+            self.totales.sumar(estadisticas)
+        METRICAS_POR_DEFECTO.contar('bytes_descargados_total', estadisticas.bytes_descargados)
+        METRICAS_POR_DEFECTO.contar('peticiones_bloqueadas_total', estadisticas.peticiones_bloqueadas)
+        logging.debug(f"Recursos de {url}: {estadisticas.como_dict()}")
+
+    def resumen(self):
+        with self._lock:
+            return self.totales.como_dict()
+
+    def _registrar(self, estadisticas, tipo, url):
+        if self.debe_bloquear(tipo, url):
+            estadisticas.peticiones_bloqueadas += 1
+            estadisticas.bloqueadas_por_tipo[tipo] = estadisticas.bloqueadas_por_tipo.get(tipo, 0) + 1
+            estadisticas.bytes_ahorrados_estimados += self.tamanos_medios.get(tipo, TAMANO_MEDIO_OTROS)
+            return True
+        estadisticas.peticiones_permitidas += 1
+        return False
+
+    def _registrar_descarga(self, estadisticas, response):
+        # headers no hace un viaje de ida y vuelta al driver
+        longitud = response.headers.get('content-length')
+        if longitud and longitud.isdigit():
+            estadisticas.bytes_descargados += int(longitud)
+
+
+POLITICA_POR_DEFECTO = PoliticaRecursos()
@@ -0,0 +1,377 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+
+# Pool de navegadores Chromium de larga duración.
+#
+# La API síncrona de Playwright solo puede usarse desde el hilo que la creó,
+# así que cada navegador vive en su propio hilo trabajador. Las tareas se
+# encolan con submit() (devuelve un Future compatible con as_completed) y,
+# dentro de la tarea, pool.contexto() entrega un BrowserContext nuevo del
+# navegador de ese hilo, con la sesión (storage_state) indicada y User-Agent
+# rotado. Las sesiones las gestiona sesiones.PoolSesiones.
+#
+# PoolNavegadoresAsync ofrece lo mismo para la API asíncrona: todos los
+# navegadores viven en un único event loop y cada contexto se abre en el
+# navegador con menos contextos activos.
+#
+# Con cdp=[endpoints] los pools no lanzan Chromium: se conectan por CDP a los
+# navegadores ya abiertos de demonio_navegador.py (repartidos por turnos), lo
+# que deja el arranque en milisegundos. Un navegador desconectado (el demonio
+# lo relanzó) se reconecta al pedir el siguiente contexto. Playwright se
+# importa al iniciar el pool, no al importar el módulo.
+
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36'
+]
+
+# Cada cuántas páginas se consulta la memoria del navegador (es una llamada CDP)
+INTERVALO_CONTROL_MEMORIA = 10
+
+
+def memoria_navegador_mb(navegador):
+    # Suma el RSS de todos los procesos del navegador (solo Linux, vía /proc)
+    try:
+        sesion = navegador.new_browser_cdp_session()
+        try:
+            info = sesion.send('SystemInfo.getProcessInfo')
+        finally:
+            sesion.detach()
+    except Exception as e:
+        logging.debug(f"No se pudo consultar la memoria del navegador: {e}")
+        return None
+    return _memoria_procesos_mb(info)
+
+
+async def memoria_navegador_mb_async(navegador):
+    try:
+        sesion = await navegador.new_browser_cdp_session()
+        try:
+            info = await sesion.send('SystemInfo.getProcessInfo')
+        finally:
+            await sesion.detach()
+    except Exception as e:
+        logging.debug(f"No se pudo consultar la memoria del navegador: {e}")
+        return None
+    return _memoria_procesos_mb(info)
+
+
+def _memoria_procesos_mb(info):
+    total_kb = 0
+    for proceso in info.get('processInfo', []):
+        try:
+            with open(f"/proc/{proceso['id']}/status") as f:
+                for linea in f:
+                    if linea.startswith('VmRSS:'):
+                        total_kb += int(linea.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024 if total_kb else None
+
+
+class PoolNavegadores:
+    def __init__(self, tamano=5, user_agents=None, headless=True,
+                 paginas_por_navegador=50, memoria_max_mb=1024, argumentos=None, cdp=None):
+        self.tamano = tamano
+        self.user_agents = user_agents or USER_AGENTS
+        self.headless = headless
+        self.argumentos = list(argumentos or [])  # Argumentos extra de Chromium
+        self.cdp = list(cdp or [])  # Endpoints del demonio: conectar en lugar de lanzar
+        self._turno_cdp = random.randrange(len(self.cdp)) if self.cdp else 0
+        self.paginas_por_navegador = paginas_por_navegador
+        self.memoria_max_mb = memoria_max_mb
+
+        self._tareas = queue.Queue()
+        self._hilos = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._errores_arranque = []
+        self._estadisticas = {
+            'navegadores_lanzados': 0,
+            'navegadores_conectados': 0,
+            'navegadores_reciclados': 0,
+            'contextos_servidos': 0,
+            'reutilizaciones': 0,
+            'tareas': 0,
+            'espera_total_s': 0.0,
+            'espera_max_s': 0.0,
+        }
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cerrar()
+
+    def iniciar(self):
+        listos = []
+        for indice in range(self.tamano):
+            listo = threading.Event()
+            hilo = threading.Thread(target=self._trabajador, args=(listo,), name=f"navegador-{indice}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+            listos.append(listo)
+        for listo in listos:
+            listo.wait()
+        if self._errores_arranque:
+            self.cerrar()
+            raise RuntimeError(f"No se pudo lanzar el navegador: {self._errores_arranque[0]}")
+        logging.info(f"Pool de navegadores iniciado con {self.tamano} instancias")
+
+    def cerrar(self):
+        for _ in self._hilos:
+            self._tareas.put(None)
+        for hilo in self._hilos:
+            hilo.join()
+        self._hilos = []
+        logging.info(f"Pool de navegadores cerrado: {self.estadisticas()}")
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self._tareas.put((future, fn, args, kwargs, time.monotonic()))
+        return future
+
+    @contextmanager
+    def contexto(self, estado_sesion=None):
+        estado = getattr(self._local, 'estado', None)
+        if estado is None:
+            raise RuntimeError("pool.contexto() solo puede usarse dentro de una tarea enviada con pool.submit()")
+
+        with self._lock:
+            self._estadisticas['contextos_servidos'] += 1
+            if estado['paginas'] > 0:
+                self._estadisticas['reutilizaciones'] += 1
+        if not estado['navegador'].is_connected():
+            self._reciclar(estado)
+
+        # storage_state en memoria: las cookies no se vuelven a leer de disco
+        context = estado['navegador'].new_context(user_agent=random.choice(self.user_agents), storage_state=estado_sesion)
+        try:
+            yield context
+        finally:
+            context.close()
+            estado['paginas'] += 1
+            if self._debe_reciclar(estado):
+                self._reciclar(estado)
+
+    def estadisticas(self):
+        with self._lock:
+            estadisticas = dict(self._estadisticas)
+        tareas = estadisticas['tareas']
+        estadisticas['espera_media_s'] = estadisticas['espera_total_s'] / tareas if tareas else 0.0
+        return estadisticas
+
+    def _trabajador(self, listo):
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            try:
+                estado = {'playwright': p, 'navegador': self._lanzar(p), 'paginas': 0}
+            except Exception as e:
+                self._errores_arranque.append(e)
+                listo.set()
+                return
+            self._local.estado = estado
+            listo.set()
+            try:
+                while True:
+                    tarea = self._tareas.get()
+                    if tarea is None:
+                        break
+                    future, fn, args, kwargs, encolada = tarea
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    self._registrar_espera(time.monotonic() - encolada)
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                estado['navegador'].close()
+
+    def _lanzar(self, p):
+        if self.cdp:
+            with self._lock:
+                endpoint = self.cdp[self._turno_cdp % len(self.cdp)]
+                self._turno_cdp += 1
+            navegador = p.chromium.connect_over_cdp(endpoint)
+            with self._lock:
+                self._estadisticas['navegadores_conectados'] += 1
+            return navegador
+        navegador = p.chromium.launch(headless=self.headless, args=self.argumentos)
+        with self._lock:
+            self._estadisticas['navegadores_lanzados'] += 1
+        return navegador
+
+    def _registrar_espera(self, espera):
+        with self._lock:
+            self._estadisticas['tareas'] += 1
+            self._estadisticas['espera_total_s'] += espera
+            self._estadisticas['espera_max_s'] = max(self._estadisticas['espera_max_s'], espera)
+
+    def _debe_reciclar(self, estado):
+        if estado['paginas'] >= self.paginas_por_navegador:
+            return True
+        # Los navegadores del demonio los vigila demonio_navegador.py
+        if self.memoria_max_mb and not self.cdp and estado['paginas'] % INTERVALO_CONTROL_MEMORIA == 0:
+            memoria = memoria_navegador_mb(estado['navegador'])
+            if memoria and memoria > self.memoria_max_mb:
+                logging.info(f"Navegador con {memoria:.0f} MB supera el límite de {self.memoria_max_mb} MB")
+                return True
+        return False
+
+    def _reciclar(self, estado):
+        logging.info(f"Reciclando navegador tras {estado['paginas']} páginas")
+        try:
+            estado['navegador'].close()
+        except Exception as e:
+            logging.warning(f"Error al cerrar el navegador: {e}")
+        estado['navegador'] = self._lanzar(estado['playwright'])
+        estado['paginas'] = 0
+        with self._lock:
+            self._estadisticas['navegadores_reciclados'] += 1
+
+
+class PoolNavegadoresAsync:
+    def __init__(self, tamano=2, user_agents=None, headless=True, paginas_por_navegador=200, memoria_max_mb=1024,
+                 argumentos=None, cdp=None):
+        self.tamano = tamano
+        self.user_agents = user_agents or USER_AGENTS
+        self.headless = headless
+        self.argumentos = list(argumentos or [])
+        self.cdp = list(cdp or [])
+        self._turno_cdp = random.randrange(len(self.cdp)) if self.cdp else 0
+        self.paginas_por_navegador = paginas_por_navegador
+        self.memoria_max_mb = memoria_max_mb
+
+        self._playwright = None
+        self._navegadores = []
+        self._cierres_pendientes = set()
+        self._estadisticas = {
+            'navegadores_lanzados': 0,
+            'navegadores_conectados': 0,
+            'navegadores_reciclados': 0,
+            'contextos_servidos': 0,
+            'reutilizaciones': 0,
+            'tareas': 0,
+            'espera_total_s': 0.0,
+            'espera_max_s': 0.0,
+        }
+
+    async def __aenter__(self):
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.cerrar()
+
+    async def iniciar(self):
+        from playwright.async_api import async_playwright
+        self._playwright = await async_playwright().start()
+        self._navegadores = await asyncio.gather(*(self._lanzar() for _ in range(self.tamano)))
+        logging.info(f"Pool de navegadores asíncrono iniciado con {self.tamano} instancias")
+
+    async def cerrar(self):
+        await asyncio.gather(*self._cierres_pendientes, return_exceptions=True)
+        await asyncio.gather(*(estado['navegador'].close() for estado in self._navegadores), return_exceptions=True)
+        self._navegadores = []
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        logging.info(f"Pool de navegadores asíncrono cerrado: {self.estadisticas()}")
+
+    @asynccontextmanager
+    async def contexto(self, estado_sesion=None):
+        # La espera es lo que tarda en estar listo el contexto: reconexiones,
+        # relanzamientos y new_context()
+        inicio = time.monotonic()
+        for desconectado in [e for e in self._navegadores if not e['navegador'].is_connected()]:
+            if not desconectado['reciclando']:
+                await self._reciclar(desconectado)
+        # Mientras se relanza un navegador desconectado se usan los demás
+        candidatos = [e for e in self._navegadores if e['navegador'].is_connected()] or self._navegadores
+        estado = min(candidatos, key=lambda e: e['activos'])
+        estado['activos'] += 1
+        self._estadisticas['contextos_servidos'] += 1
+        if estado['paginas'] > 0:
+            self._estadisticas['reutilizaciones'] += 1
+
+        try:
+            context = await estado['navegador'].new_context(user_agent=random.choice(self.user_agents),
+                                                            storage_state=estado_sesion)
+            self._registrar_espera(time.monotonic() - inicio)
+            try:
+                yield context
+            finally:
+                await context.close()
+        finally:
+            estado['activos'] -= 1
+            estado['paginas'] += 1
+            if not estado['reciclando'] and await self._debe_reciclar(estado):
+                await self._reciclar(estado)
+
+    def estadisticas(self):
+        estadisticas = dict(self._estadisticas)
+        tareas = estadisticas['tareas']
+        estadisticas['espera_media_s'] = estadisticas['espera_total_s'] / tareas if tareas else 0.0
+        return estadisticas
+
+    async def _lanzar(self):
+        if self.cdp:
+            endpoint = self.cdp[self._turno_cdp % len(self.cdp)]
+            self._turno_cdp += 1
+            navegador = await self._playwright.chromium.connect_over_cdp(endpoint)
+            self._estadisticas['navegadores_conectados'] += 1
+            return {'navegador': navegador, 'paginas': 0, 'activos': 0, 'reciclando': False}
+        navegador = await self._playwright.chromium.launch(headless=self.headless, args=self.argumentos)
+        self._estadisticas['navegadores_lanzados'] += 1
+        return {'navegador': navegador, 'paginas': 0, 'activos': 0, 'reciclando': False}
+
+    def _registrar_espera(self, espera):
+        self._estadisticas['tareas'] += 1
+        self._estadisticas['espera_total_s'] += espera
+        self._estadisticas['espera_max_s'] = max(self._estadisticas['espera_max_s'], espera)
+
+    async def _debe_reciclar(self, estado):
+        if estado['paginas'] >= self.paginas_por_navegador:
+            return True
+        # Los navegadores del demonio los vigila demonio_navegador.py
+        if self.memoria_max_mb and not self.cdp and estado['paginas'] % INTERVALO_CONTROL_MEMORIA == 0:
+            memoria = await memoria_navegador_mb_async(estado['navegador'])
+            if memoria and memoria > self.memoria_max_mb:
+                logging.info(f"Navegador con {memoria:.0f} MB supera el límite de {self.memoria_max_mb} MB")
+                return True
+        return False
+
+    async def _reciclar(self, estado):
+        # El reemplazo se lanza antes de sacar al viejo, para que el pool nunca
+        # quede vacío; el navegador viejo se cierra cuando terminan los
+        # contextos que aún tiene abiertos
+        logging.info(f"Reciclando navegador tras {estado['paginas']} páginas")
+        estado['reciclando'] = True
+        try:
+            nuevo = await self._lanzar()
+        except BaseException:
+            estado['reciclando'] = False
+            raise
+        self._navegadores[self._navegadores.index(estado)] = nuevo
+        self._estadisticas['navegadores_reciclados'] += 1
+        tarea = asyncio.create_task(self._cerrar_cuando_libre(estado))
+        self._cierres_pendientes.add(tarea)
+        tarea.add_done_callback(self._cierres_pendientes.discard)
+
+    async def _cerrar_cuando_libre(self, estado):
+        while estado['activos'] > 0:
+            await asyncio.sleep(0.1)
+        try:
+            await estado['navegador'].close()
+        except Exception as e:
+            logging.warning(f"Error al cerrar el navegador: {e}")
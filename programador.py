@@ -0,0 +1,106 @@
+import heapq
+import itertools
+import logging
+import time
+
+# Programación de perfiles por prioridad y con plazos.
+#
+# Los perfiles se lanzan en orden de prioridad (menor = antes): por defecto
+# su puesto en la SERP, o la que dé el llamante con links (url, prioridad).
+# Con plazo_s toda la petición tiene un plazo; con presupuesto_url_s cada
+# perfil tiene el suyo (los 3 intentos con sus esperas), de modo que un
+# perfil lento no retiene la petición entera. Al vencer, se entregan los
+# perfiles ya terminados, en orden de prioridad, y las URLs sin terminar
+# quedan en pendientes(); devolver_pendientes() las pasa a la cola de trabajo
+# (cola_trabajo.py), donde los trabajadores por lotes las terminan con la
+# capacidad que sobre.
+#
+# Solo con retener=True se guardan los perfiles terminados para perfiles();
+# quien los consume a medida que salen (lote.py, refresco.py, MotorFondo) usa
+# retener=False y la memoria no crece con el tamaño del lote.
+#
+#     programador = Programador(plazo_s=60, presupuesto_url_s=20)
+#     perfiles = await buscar_y_scrapear_async(consulta, programador=programador)
+#     programador.devolver_pendientes(abrir_cola())
+
+
+class Programador:
+    def __init__(self, plazo_s=None, presupuesto_url_s=None, retener=True):
+        self.plazo_s = plazo_s
+        self.presupuesto_url_s = presupuesto_url_s
+        self.retener = retener
+        self._limite = None
+        self._espera = []  # montículo de (prioridad, orden, url)
+        self._orden = itertools.count()
+        self._terminados = []
+        self._pendientes = []
+        self._estadisticas = {'terminados': 0, 'sin_datos': 0, 'cache': 0, 'presupuesto_agotado': 0, 'aplazados': 0}
+
+    def iniciar(self):
+        # El plazo corre desde el primer uso
+        if self._limite is None and self.plazo_s:
+            self._limite = time.monotonic() + self.plazo_s
+
+    def agregar(self, url, prioridad=None):
+        orden = next(self._orden)
+        heapq.heappush(self._espera, (orden if prioridad is None else prioridad, orden, url))
+
+    def resolver(self, url, perfil, prioridad=None):
+        # Perfiles que no pasan por la espera (caché): cuentan en perfiles() con su puesto
+        orden = next(self._orden)
+        if self.retener:
+            self._terminados.append((orden if prioridad is None else prioridad, url, perfil))
+        self._estadisticas['cache'] += 1
+
+    def en_espera(self):
+        return len(self._espera)
+
+    def siguiente(self):
+        # (url, prioridad) del más prioritario en espera
+        prioridad, _, url = heapq.heappop(self._espera)
+        return url, prioridad
+
+    def restante(self):
+        # Segundos hasta el plazo, o None sin plazo
+        return None if self._limite is None else max(0.0, self._limite - time.monotonic())
+
+    def vencido(self):
+        return self._limite is not None and time.monotonic() >= self._limite
+
+    def presupuesto(self):
+        # Tiempo que se le puede dar al próximo perfil
+        limites = [limite for limite in (self.presupuesto_url_s, self.restante()) if limite is not None]
+        return min(limites) if limites else None
+
+    def terminar(self, url, prioridad, perfil):
+        if self.retener:
+            self._terminados.append((prioridad, url, perfil))
+        self._estadisticas['terminados' if perfil else 'sin_datos'] += 1
+
+    def aplazar(self, url, prioridad, motivo):
+        self._pendientes.append((prioridad, url))
+        self._estadisticas['presupuesto_agotado' if motivo == 'presupuesto' else 'aplazados'] += 1
+        logging.info(f"Perfil {url} aplazado ({motivo})")
+
+    def aplazar_espera(self, motivo='plazo'):
+        while self._espera:
+            self.aplazar(*self.siguiente(), motivo)
+
+    def perfiles(self):
+        # Perfiles obtenidos, en orden de prioridad (vacío con retener=False)
+        return [perfil for _, _, perfil in sorted(self._terminados, key=lambda t: t[0]) if perfil]
+
+    def pendientes(self):
+        return [url for _, url in sorted(self._pendientes)]
+
+    def devolver_pendientes(self, cola):
+        # Encola las URLs sin terminar, las más prioritarias primero
+        pendientes = self.pendientes()
+        nuevas = cola.encolar(pendientes) if pendientes else 0
+        if pendientes:
+            logging.info(f"{len(pendientes)} perfiles sin terminar devueltos a la cola ({nuevas} nuevos)")
+        return nuevas
+
+    def estadisticas(self):
+        return dict(self._estadisticas, en_espera=len(self._espera), pendientes=len(self._pendientes),
+                    restante_s=None if self._limite is None else round(self.restante(), 1))
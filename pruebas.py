@@ -4,6 +4,7 @@ from playwright.sync_api import sync_playwright
 from time import sleep
 import os
 import json
+from demonio_navegador import resolver_cdp
 
 # Configuración de logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -35,9 +36,15 @@ def cargar_cookies(context, archivo_cookies):
         logging.error(f"Error al decodificar el archivo de cookies '{archivo_cookies}'.")
 
 def scrape_linkedin_profile(url, archivo_cookies):
+    # Con SCRAPER_CDP=auto y demonio_navegador.py en marcha se reutiliza un
+    # navegador ya abierto en lugar de lanzar uno en cada intento
+    endpoints = resolver_cdp()
     for intento in range(1, 4):  # Intentar 3 veces
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)  # Modo visible para depuración
+            if endpoints:
+                browser = p.chromium.connect_over_cdp(endpoints[0])
+            else:
+                browser = p.chromium.launch(headless=False)  # Modo visible para depuración
             context = browser.new_context(user_agent=random.choice(USER_AGENTS))
             
             # Cargar cookies antes de crear la página
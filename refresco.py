@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from archivo_html import ArchivoHTML
+from cache_perfiles import ESTADO_OK, RUTA_POR_DEFECTO as RUTA_CACHE, CachePerfiles
+from cadencia import LIMITADOR_POR_DEFECTO
+from cliente_http import ClienteHTTP
+from demonio_navegador import resolver_cdp
+from metricas import METRICAS_POR_DEFECTO
+from motor_async import CONCURRENCIA_POR_DEFECTO, NAVEGADORES_POR_DEFECTO, iterar_perfiles_async
+from politica_recursos import POLITICA_POR_DEFECTO
+from pool_navegadores import PoolNavegadoresAsync
+from sesiones import PoolSesiones
+
+# Refresco incremental del corpus de perfiles.
+#
+# En lugar de repetir scrapes completos, cada día se revisitan los perfiles
+# de la caché con más probabilidad de haber cambiado, hasta un presupuesto
+# diario de páginas. La tabla seguimiento de cache_perfiles.py guarda por
+# perfil su huella (Perfil.huella), la última obtención y los cambios
+# observados; con ellos cada perfil tiene una tasa de cambio estimada
+# (cambios + 1) / (tiempo observado + VENTANA_PREVIA_S) y se visitan primero
+# los de mayor tasa * antigüedad. Un perfil que no cambia se visita cada vez
+# menos y uno que cambia a menudo, más: el mismo presupuesto de peticiones a
+# LinkedIn cubre un corpus mucho mayor.
+#
+# Los consumidores no reciben los perfiles revisitados sino solo los eventos
+# de cambio, una línea JSON por evento:
+#   cambio  la huella es distinta de la de la visita anterior
+#   alta    vuelve a extraerse un perfil que había desaparecido
+#   baja    el perfil ya no existe (no_encontrado)
+#
+#     python refresco.py --presupuesto-diario 500 --eventos cambios.jsonl
+#     python refresco.py --estado
+#
+# El presupuesto del día se guarda en la misma base que la caché, así que
+# varias ejecuciones (o varios procesos) en el mismo día lo comparten.
+
+VENTANA_PREVIA_S = 30 * 24 * 3600
+INTERVALO_MINIMO_S = 24 * 3600
+PAGINAS_DIARIAS_POR_DEFECTO = 500
+ESTADO_BAJA = 'no_encontrado'
+
+
+def _dia(ahora=None):
+    return time.strftime('%Y-%m-%d', time.localtime(ahora))
+
+
+class PresupuestoDiario:
+    def __init__(self, ruta=RUTA_CACHE, paginas=PAGINAS_DIARIAS_POR_DEFECTO):
+        self.paginas = paginas
+        self._conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS presupuesto_refresco (
+                dia TEXT PRIMARY KEY,
+                paginas INTEGER NOT NULL
+            )
+        """)
+
+    def usadas(self, dia=None):
+        fila = self._conexion.execute("SELECT paginas FROM presupuesto_refresco WHERE dia = ?",
+                                      (dia or _dia(),)).fetchone()
+        return fila[0] if fila else 0
+
+    def restantes(self):
+        return max(0, self.paginas - self.usadas())
+
+    def gastar(self, paginas=1):
+        # Descuenta las páginas si quedan; BEGIN IMMEDIATE evita que dos
+        # procesos gasten a la vez la última página del día
+        dia = _dia()
+        self._conexion.execute("BEGIN IMMEDIATE")
+        try:
+            if self.usadas(dia) + paginas > self.paginas:
+                return False
+            self._conexion.execute(
+                "INSERT INTO presupuesto_refresco (dia, paginas) VALUES (?, ?) "
+                "ON CONFLICT (dia) DO UPDATE SET paginas = paginas + excluded.paginas",
+                (dia, paginas),
+            )
+            return True
+        finally:
+            self._conexion.execute("COMMIT")
+
+    def estadisticas(self):
+        usadas = self.usadas()
+        return {'dia': _dia(), 'paginas': self.paginas, 'usadas': usadas, 'restantes': max(0, self.paginas - usadas)}
+
+    def cerrar(self):
+        self._conexion.close()
+
+
+class SalidaEventos:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.escritos = 0
+        self._archivo = open(ruta, 'a', encoding='utf-8')
+
+    def escribir(self, evento):
+        self._archivo.write(json.dumps(evento, ensure_ascii=False) + '\n')
+        self._archivo.flush()
+        self.escritos += 1
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+def detectar_evento(anterior, actual, perfil):
+    # Evento de cambio entre dos filas de seguimiento, o None si no lo hay
+    # (sin cambios, o la visita no llegó a guardarse por un fallo reintentable).
+    # La huella de seguimiento es la del último perfil extraído, así que tras
+    # un resultado negativo pasajero (login, muro) se compara con ella
+    if actual is None or actual['obtenido'] == anterior['obtenido']:
+        return None
+    if actual['estado'] == ESTADO_OK:
+        if anterior['estado'] == ESTADO_BAJA:
+            tipo = 'alta'
+        elif actual['huella'] != anterior['huella']:
+            tipo = 'cambio'
+        else:
+            return None
+    elif actual['estado'] == ESTADO_BAJA and anterior['estado'] != ESTADO_BAJA:
+        tipo = 'baja'
+    else:
+        return None
+    return {
+        'tipo': tipo,
+        'url': anterior['url'],
+        'huella': actual['huella'] if tipo != 'baja' else None,
+        'huella_anterior': anterior['huella'],
+        'perfil': perfil.como_dict() if perfil else None,
+        'detectado': actual['obtenido'],
+        'cambios': actual['cambios'],
+    }
+
+
+async def _candidatos(filas, presupuesto):
+    # Cada URL cuesta una página al programarla; se para al agotar el día
+    for prioridad, fila in enumerate(filas):
+        if not presupuesto.gastar():
+            logging.info("Presupuesto diario de refresco agotado")
+            return
+        yield fila['url'], prioridad
+
+
+async def refrescar(cache, presupuesto, eventos, sesiones, pool, concurrencia=CONCURRENCIA_POR_DEFECTO,
+                    archivo=None, http=None):
+    # Revisita los perfiles más obsoletos dentro del presupuesto del día y
+    # escribe sus eventos de cambio. Devuelve {'visitados', 'cambio', 'alta', 'baja'}
+    columnas = ('url', 'estado', 'huella', 'obtenido', 'visitas', 'cambios', 'obsolescencia')
+    filas = [dict(zip(columnas, fila)) for fila in
+             cache.mas_obsoletos(presupuesto.restantes(), VENTANA_PREVIA_S, INTERVALO_MINIMO_S)]
+    anteriores = {fila['url']: fila for fila in filas}
+    logging.info(f"{len(filas)} perfiles para refrescar; presupuesto: {presupuesto.estadisticas()}")
+
+    resultado = {'visitados': 0, 'cambio': 0, 'alta': 0, 'baja': 0}
+    if not filas:
+        return resultado
+    async for link, perfil in iterar_perfiles_async(_candidatos(filas, presupuesto), sesiones, pool, concurrencia,
+                                                    POLITICA_POR_DEFECTO, cache, True, archivo, http=http):
+        resultado['visitados'] += 1
+        evento = detectar_evento(anteriores[link], cache.seguimiento(link), perfil)
+        if evento:
+            eventos.escribir(evento)
+            resultado[evento['tipo']] += 1
+            METRICAS_POR_DEFECTO.contar('eventos_refresco_total', tipo=evento['tipo'])
+    return resultado
+
+
+async def ejecutar_refresco(args):
+    cache = CachePerfiles(args.cache)
+    presupuesto = PresupuestoDiario(args.cache, args.presupuesto_diario)
+    eventos = SalidaEventos(args.eventos)
+    archivo = ArchivoHTML(args.archivo) if args.archivo else None
+    sesiones = PoolSesiones(args.sesiones)
+    http = ClienteHTTP() if args.http else None
+    inicio = time.perf_counter()
+    try:
+        async with PoolNavegadoresAsync(tamano=args.navegadores, cdp=resolver_cdp(args.cdp)) as pool:
+            resultado = await refrescar(cache, presupuesto, eventos, sesiones, pool, args.concurrencia, archivo, http)
+        logging.info(f"Refresco terminado en {time.perf_counter() - inicio:.1f} s: {resultado}; "
+                     f"{eventos.escritos} eventos en {args.eventos}")
+    finally:
+        logging.info(f"Presupuesto: {presupuesto.estadisticas()}")
+        logging.info(f"Tasas por host: {LIMITADOR_POR_DEFECTO.tasas()}")
+        logging.info(f"Sesiones: {sesiones.estadisticas()}")
+        if http:
+            logging.info(f"Vía rápida HTTP: {http.estadisticas()}")
+            await http.cerrar_async()
+        eventos.cerrar()
+        presupuesto.cerrar()
+        if archivo:
+            archivo.cerrar()
+
+
+def mostrar_estado(args):
+    cache = CachePerfiles(args.cache)
+    presupuesto = PresupuestoDiario(args.cache, args.presupuesto_diario)
+    candidatos = cache.mas_obsoletos(args.mostrar, VENTANA_PREVIA_S, INTERVALO_MINIMO_S)
+    print(json.dumps(presupuesto.estadisticas(), indent=2))
+    for url, estado, _, obtenido, visitas, cambios, obsolescencia in candidatos:
+        dias = (time.time() - obtenido) / 86400
+        print(f"{obsolescencia:.3f}\t{url}\t{estado}\thace {dias:.1f} d\t{cambios}/{visitas} cambios")
+    presupuesto.cerrar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresco incremental de perfiles con eventos de cambio")
+    parser.add_argument('--cache', default=RUTA_CACHE, help="Ruta de la caché SQLite de perfiles")
+    parser.add_argument('--presupuesto-diario', type=int, default=PAGINAS_DIARIAS_POR_DEFECTO,
+                        help="Páginas de perfil que se pueden pedir al día entre todas las ejecuciones")
+    parser.add_argument('--eventos', default='eventos_perfiles.jsonl', help="Fichero JSONL donde se anexan los eventos de cambio")
+    parser.add_argument('--sesiones', nargs='+', default=['cookies.json'],
+                        help="Ficheros de cookies o storage_state de Playwright, uno por cuenta de LinkedIn")
+    parser.add_argument('--concurrencia', type=int, default=CONCURRENCIA_POR_DEFECTO)
+    parser.add_argument('--navegadores', type=int, default=NAVEGADORES_POR_DEFECTO)
+    parser.add_argument('--archivo', default=None, help="Directorio donde archivar el HTML descargado (desactivado si se omite)")
+    parser.add_argument('--cdp', default=None,
+                        help="Conectar a navegadores ya abiertos: 'auto' (demonio_navegador.py) o URLs CDP separadas por comas "
+                             "(por defecto $SCRAPER_CDP)")
+    parser.add_argument('--http', action='store_true',
+                        help="Probar cada perfil primero por HTTP/2 sin navegador; se escala a Playwright si hace falta")
+    parser.add_argument('--estado', action='store_true', help="Mostrar el presupuesto del día y los perfiles más obsoletos")
+    parser.add_argument('--mostrar', type=int, default=20, help="Perfiles a listar con --estado")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.estado:
+        mostrar_estado(args)
+        return
+    asyncio.run(ejecutar_refresco(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import json
+import logging
+import time
+from perfiles import Perfil
+
+# pyarrow se importa en el primer uso (ver _importar_pyarrow): su importación
+# cuesta bastante y solo lo necesita esta salida
+pa = pq = None
+
+# Salida de perfiles en columnas (Parquet o Arrow IPC) para los trabajos de
+# análisis, que así cargan millones de perfiles sin parsear JSON línea a línea.
+#
+# Los perfiles se acumulan en memoria por columnas y cada tamano_lote se
+# escriben como un record batch (un row group en Parquet), así que la memoria
+# no depende del tamaño total. La ubicación, la empresa, el centro y el
+# título académico van codificados con diccionario; el diccionario de cada
+# columna se mantiene durante todo el fichero y solo crece, de modo que en
+# Arrow IPC cada lote emite únicamente los valores nuevos (deltas).
+#
+#     python salida_columnar.py perfiles.jsonl perfiles.parquet
+#
+# abrir_salida() elige JSONL o columnas por la extensión del fichero.
+
+TAMANO_LOTE_POR_DEFECTO = 10000
+EXTENSIONES = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow'}
+
+
+def _importar_pyarrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("La salida en Parquet/Arrow requiere el paquete 'pyarrow'") from None
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def esquema():
+    _importar_pyarrow()
+    diccionario = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('url', pa.string()),
+        ('name', pa.string()),
+        ('position', pa.string()),
+        ('location', diccionario),
+        ('experience', pa.list_(pa.struct([('title', pa.string()), ('company', diccionario)]))),
+        ('education', pa.list_(pa.struct([('school', diccionario), ('degree', diccionario)]))),
+        ('obtenido', pa.float64()),
+    ])
+
+
+class _Diccionario:
+    # Diccionario de una columna compartido por todos los lotes del fichero
+    def __init__(self):
+        self.codigos = {}
+        self.valores = []
+
+    def codificar(self, valor):
+        if valor is None:
+            return None
+        codigo = self.codigos.get(valor)
+        if codigo is None:
+            codigo = self.codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+
+    def columna(self, codigos):
+        return pa.DictionaryArray.from_arrays(pa.array(codigos, pa.int32()), pa.array(self.valores, pa.string()))
+
+
+class EscritorColumnar:
+    def __init__(self, ruta, formato='parquet', tamano_lote=TAMANO_LOTE_POR_DEFECTO):
+        _importar_pyarrow()
+        if formato not in ('parquet', 'arrow'):
+            raise ValueError(f"Formato desconocido: {formato}")
+        self.ruta = ruta
+        self.formato = formato
+        self.tamano_lote = tamano_lote
+        self.esquema = esquema()
+        self.escritos = 0
+        self.lotes = 0
+        self._diccionarios = {columna: _Diccionario() for columna in ('location', 'company', 'school', 'degree')}
+        self._vaciar()
+        if formato == 'parquet':
+            self._escritor = pq.ParquetWriter(ruta, self.esquema, compression='zstd')
+        else:
+            opciones = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._escritor = pa.ipc.new_file(ruta, self.esquema, options=opciones)
+
+    def escribir(self, perfil):
+        perfil = Perfil.desde_dict(perfil)
+        d = self._diccionarios
+        self._columnas['url'].append(perfil.url)
+        self._columnas['name'].append(perfil.name)
+        self._columnas['position'].append(perfil.position)
+        self._columnas['location'].append(d['location'].codificar(perfil.location))
+        self._columnas['obtenido'].append(perfil.obtenido)
+        for e in perfil.experience:
+            self._columnas['title'].append(e.title)
+            self._columnas['company'].append(d['company'].codificar(e.company))
+        for e in perfil.education:
+            self._columnas['school'].append(d['school'].codificar(e.school))
+            self._columnas['degree'].append(d['degree'].codificar(e.degree))
+        self._desplazamientos['experience'].append(len(self._columnas['title']))
+        self._desplazamientos['education'].append(len(self._columnas['school']))
+        if len(self._columnas['url']) >= self.tamano_lote:
+            self._volcar()
+
+    def cerrar(self):
+        self._volcar()
+        self._escritor.close()
+        logging.info(f"{self.escritos} perfiles escritos en {self.ruta} ({self.formato}, {self.lotes} lotes)")
+
+    def estadisticas(self):
+        return {
+            'escritos': self.escritos,
+            'lotes': self.lotes,
+            'valores_distintos': {columna: len(d.valores) for columna, d in self._diccionarios.items()},
+        }
+
+    def _vaciar(self):
+        self._columnas = {columna: [] for columna in
+                          ('url', 'name', 'position', 'location', 'obtenido', 'title', 'company', 'school', 'degree')}
+        self._desplazamientos = {'experience': [0], 'education': [0]}
+
+    def _volcar(self):
+        c = self._columnas
+        if not c['url']:
+            return
+        d = self._diccionarios
+        experiencia = pa.StructArray.from_arrays(
+            [pa.array(c['title'], pa.string()), d['company'].columna(c['company'])], names=['title', 'company'])
+        educacion = pa.StructArray.from_arrays(
+            [d['school'].columna(c['school']), d['degree'].columna(c['degree'])], names=['school', 'degree'])
+        lote = pa.RecordBatch.from_arrays([
+            pa.array(c['url'], pa.string()),
+            pa.array(c['name'], pa.string()),
+            pa.array(c['position'], pa.string()),
+            d['location'].columna(c['location']),
+            pa.ListArray.from_arrays(pa.array(self._desplazamientos['experience'], pa.int32()), experiencia),
+            pa.ListArray.from_arrays(pa.array(self._desplazamientos['education'], pa.int32()), educacion),
+            pa.array(c['obtenido'], pa.float64()),
+        ], schema=self.esquema)
+        self._escritor.write_batch(lote)
+        self.escritos += lote.num_rows
+        self.lotes += 1
+        self._vaciar()
+
+
+class EscritorJSONL:
+    # Misma interfaz que EscritorColumnar para elegir el formato por extensión
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.escritos = 0
+        self._archivo = open(ruta, 'w', encoding='utf-8')
+
+    def escribir(self, perfil):
+        self._archivo.write(json.dumps(Perfil.desde_dict(perfil).como_dict(), ensure_ascii=False) + '\n')
+        self.escritos += 1
+
+    def cerrar(self):
+        self._archivo.close()
+        logging.info(f"{self.escritos} perfiles escritos en {self.ruta}")
+
+
+def abrir_salida(ruta, tamano_lote=TAMANO_LOTE_POR_DEFECTO):
+    for extension, formato in EXTENSIONES.items():
+        if ruta.endswith(extension):
+            return EscritorColumnar(ruta, formato, tamano_lote)
+    return EscritorJSONL(ruta)
+
+
+def leer_perfiles(ruta):
+    # Generador de Perfil desde un fichero Parquet o Arrow, lote a lote
+    _importar_pyarrow()
+    if ruta.endswith('.parquet'):
+        archivo = pq.ParquetFile(ruta)
+        lotes = (archivo.read_row_group(i) for i in range(archivo.num_row_groups))
+    else:
+        lector = pa.ipc.open_file(ruta)
+        lotes = (lector.get_batch(i) for i in range(lector.num_record_batches))
+    for lote in lotes:
+        for fila in lote.to_pylist():
+            yield Perfil.desde_dict(fila)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertir perfiles en JSONL a Parquet o Arrow IPC")
+    parser.add_argument('entrada', help="Fichero JSONL de perfiles (también el formato antiguo de cadenas)")
+    parser.add_argument('salida', help="Fichero .parquet o .arrow")
+    parser.add_argument('--tamano-lote', type=int, default=TAMANO_LOTE_POR_DEFECTO, help="Perfiles por lote (row group)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    salida = abrir_salida(args.salida, args.tamano_lote)
+    inicio = time.perf_counter()
+    try:
+        with open(args.entrada, encoding='utf-8') as entrada:
+            for linea in entrada:
+                if linea.strip():
+                    salida.escribir(json.loads(linea))
+    finally:
+        salida.cerrar()
+    logging.info(f"Conversión terminada en {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
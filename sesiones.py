@@ -0,0 +1,240 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from metricas import METRICAS_POR_DEFECTO
+
+# Pool de sesiones de LinkedIn (una por cuenta).
+#
+# Cada fichero de cookies (lista de cookies exportada) o storage_state de
+# Playwright se lee y valida una sola vez y se guarda en memoria como
+# storage_state, que se pasa tal cual a new_context(). Las peticiones rotan
+# entre las cuentas: cada una tiene un presupuesto de perfiles por ventana de
+# tiempo, un máximo de páginas simultáneas y un enfriamiento tras un 429 o un
+# captcha. Una redirección al login indica que la sesión ha caducado y la
+# retira del pool. Así la concurrencia crece con el número de cuentas.
+
+PRESUPUESTO_POR_DEFECTO = 500        # perfiles por cuenta y ventana
+VENTANA_PRESUPUESTO_S = 24 * 3600
+CONCURRENCIA_POR_SESION = 4
+ENFRIAMIENTO_SESION_S = 15 * 60
+INTERVALO_SONDEO_S = 0.2
+ESPERA_MAXIMA_S = 60.0               # tope de cada espera antes de volver a mirar
+
+CAMPOS_COOKIE = ('name', 'value', 'domain', 'path', 'expires', 'httpOnly', 'secure', 'sameSite')
+VALORES_SAME_SITE = ('Strict', 'Lax', 'None')
+
+OK = 'ok'
+LOGIN = 'login'
+BLOQUEO = 'bloqueo'
+ERROR = 'error'
+
+
+def _normalizar_cookie(cookie):
+    # Acepta cookies exportadas por Playwright, Selenium o extensiones del navegador
+    cookie = dict(cookie)
+    if 'expires' not in cookie and 'expiry' in cookie:
+        cookie['expires'] = cookie['expiry']
+    if 'expirationDate' in cookie and 'expires' not in cookie:
+        cookie['expires'] = cookie['expirationDate']
+    normalizada = {campo: cookie[campo] for campo in CAMPOS_COOKIE if campo in cookie}
+    normalizada.setdefault('path', '/')
+    if normalizada.get('sameSite') not in VALORES_SAME_SITE:
+        normalizada.pop('sameSite', None)
+    return normalizada
+
+
+def cargar_sesion(ruta):
+    # Devuelve un storage_state {'cookies': [...], 'origins': [...]} validado o
+    # lanza ValueError si el fichero no sirve como sesión de LinkedIn
+    try:
+        with open(ruta, 'r') as f:
+            datos = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"El archivo de sesión '{ruta}' no existe")
+    except json.JSONDecodeError:
+        raise ValueError(f"Error al decodificar el archivo de sesión '{ruta}'")
+
+    if isinstance(datos, list):
+        cookies, origins = datos, []
+    elif isinstance(datos, dict) and isinstance(datos.get('cookies'), list):
+        cookies, origins = datos['cookies'], datos.get('origins', [])
+    else:
+        raise ValueError(f"'{ruta}' no es una lista de cookies ni un storage_state de Playwright")
+
+    cookies = [_normalizar_cookie(cookie) for cookie in cookies if 'name' in cookie and 'value' in cookie]
+    li_at = next((cookie for cookie in cookies if cookie['name'] == 'li_at'), None)
+    if li_at is None:
+        raise ValueError(f"'{ruta}' no contiene la cookie de sesión de LinkedIn (li_at)")
+    expira = li_at.get('expires', -1)
+    if expira and 0 < expira < time.time():
+        raise ValueError(f"La cookie de sesión de '{ruta}' caducó el {time.strftime('%Y-%m-%d', time.localtime(expira))}")
+    return {'cookies': cookies, 'origins': origins}
+
+
+class Sesion:
+    def __init__(self, nombre, estado, presupuesto, concurrencia):
+        self.nombre = nombre
+        self.estado = estado
+        self.presupuesto = presupuesto
+        self.concurrencia = concurrencia
+        self.usadas = 0
+        self.inicio_ventana = time.monotonic()
+        self.en_uso = 0
+        self.enfriada_hasta = 0.0
+        self.retirada = None
+        self.resultados = {OK: 0, LOGIN: 0, BLOQUEO: 0, ERROR: 0}
+
+    def espera(self, ahora, ventana):
+        # 0 si puede usarse ya; si no, cuánto falta (None si solo falta un hueco libre)
+        if ahora - self.inicio_ventana >= ventana:
+            self.inicio_ventana = ahora
+            self.usadas = 0
+        if self.enfriada_hasta > ahora:
+            return self.enfriada_hasta - ahora
+        if self.usadas >= self.presupuesto:
+            return self.inicio_ventana + ventana - ahora
+        if self.en_uso >= self.concurrencia:
+            return None
+        return 0.0
+
+
+class PoolSesiones:
+    def __init__(self, rutas, presupuesto=PRESUPUESTO_POR_DEFECTO, ventana=VENTANA_PRESUPUESTO_S,
+                 concurrencia_por_sesion=CONCURRENCIA_POR_SESION, enfriamiento=ENFRIAMIENTO_SESION_S):
+        self.ventana = ventana
+        self.enfriamiento = enfriamiento
+        self._lock = threading.Lock()
+        self._sesiones = []
+        for ruta in rutas:
+            try:
+                estado = cargar_sesion(ruta)
+            except ValueError as e:
+                logging.error(f"Sesión descartada: {e}")
+                continue
+            self._sesiones.append(Sesion(os.path.basename(ruta), estado, presupuesto, concurrencia_por_sesion))
+            logging.info(f"Sesión cargada desde {ruta}")
+        if not self._sesiones:
+            logging.warning("No hay ninguna sesión de LinkedIn válida; se scrapeará sin sesión")
+
+    def adquirir(self):
+        # Bloquea hasta que haya una sesión disponible; None si no queda ninguna activa
+        while True:
+            sesion, espera = self._intentar_adquirir()
+            if sesion or espera is None:
+                return sesion
+            time.sleep(espera)
+
+    async def adquirir_async(self):
+        while True:
+            sesion, espera = self._intentar_adquirir()
+            if sesion or espera is None:
+                return sesion
+            await asyncio.sleep(espera)
+
+    def liberar(self, sesion, resultado=OK):
+        if sesion is None:
+            return
+        with self._lock:
+            sesion.en_uso -= 1
+            sesion.resultados[resultado] += 1
+            if resultado == LOGIN and not sesion.retirada:
+                sesion.retirada = 'login'
+                logging.warning(f"Sesión {sesion.nombre} retirada: redirigida a la página de inicio de sesión")
+            elif resultado == BLOQUEO:
+                sesion.enfriada_hasta = time.monotonic() + self.enfriamiento
+                logging.warning(f"Sesión {sesion.nombre} en enfriamiento {self.enfriamiento:.0f} s tras un bloqueo")
+
+    def activas(self):
+        with self._lock:
+            return sum(1 for sesion in self._sesiones if not sesion.retirada)
+
+    def estadisticas(self):
+        ahora = time.monotonic()
+        with self._lock:
+            return {
+                sesion.nombre: {
+                    'usadas': sesion.usadas,
+                    'presupuesto': sesion.presupuesto,
+                    'en_uso': sesion.en_uso,
+                    'enfriamiento_restante_s': round(max(0.0, sesion.enfriada_hasta - ahora), 1),
+                    'retirada': sesion.retirada,
+                    'resultados': dict(sesion.resultados),
+                }
+                for sesion in self._sesiones
+            }
+
+    def _intentar_adquirir(self):
+        # Devuelve (sesión, 0) si hay una libre, (None, espera) si hay que
+        # esperar o (None, None) si no queda ninguna sesión activa
+        ahora = time.monotonic()
+        with self._lock:
+            candidatas = []
+            esperas = []
+            for sesion in self._sesiones:
+                if sesion.retirada:
+                    continue
+                espera = sesion.espera(ahora, self.ventana)
+                if espera == 0:
+                    candidatas.append(sesion)
+                else:
+                    esperas.append(INTERVALO_SONDEO_S if espera is None else espera)
+            if candidatas:
+                # La cuenta con menos uso en la ventana, para repartir el presupuesto
+                sesion = min(candidatas, key=lambda s: (s.usadas, s.en_uso))
+                sesion.usadas += 1
+                sesion.en_uso += 1
+                return sesion, 0.0
+        if not esperas:
+            return None, None
+        return None, min(min(esperas), ESPERA_MAXIMA_S)
+
+
+_POOLS_POR_RUTA = {}
+_LOCK_POOLS = threading.Lock()
+
+
+def como_sesiones(sesiones):
+    # Admite un PoolSesiones, la ruta de un fichero de cookies (compatibilidad
+    # con la firma antigua archivo_cookies) o una lista de rutas. Las rutas se
+    # cargan una sola vez por proceso
+    if sesiones is None or isinstance(sesiones, PoolSesiones):
+        return sesiones
+    rutas = (sesiones,) if isinstance(sesiones, str) else tuple(sesiones)
+    with _LOCK_POOLS:
+        pool = _POOLS_POR_RUTA.get(rutas)
+        if pool is None:
+            pool = _POOLS_POR_RUTA[rutas] = PoolSesiones(rutas)
+        return pool
+
+
+@contextmanager
+def usar_sesion(sesiones):
+    # with usar_sesion(sesiones) as uso: contexto con uso['sesion'] y, al
+    # terminar, la sesión se libera con uso['resultado'] (ERROR si no se fijó
+    # otro). Sin sesiones, uso['sesion'] es None
+    sesiones = como_sesiones(sesiones)
+    with METRICAS_POR_DEFECTO.tramo('perfil', 'espera_sesion'):
+        sesion = sesiones.adquirir() if sesiones else None
+    uso = {'sesion': sesion, 'resultado': ERROR}
+    try:
+        yield uso
+    finally:
+        if sesiones:
+            sesiones.liberar(sesion, uso['resultado'])
+
+
+@asynccontextmanager
+async def usar_sesion_async(sesiones):
+    sesiones = como_sesiones(sesiones)
+    with METRICAS_POR_DEFECTO.tramo('perfil', 'espera_sesion'):
+        sesion = await sesiones.adquirir_async() if sesiones else None
+    uso = {'sesion': sesion, 'resultado': ERROR}
+    try:
+        yield uso
+    finally:
+        if sesiones:
+            sesiones.liberar(sesion, uso['resultado'])
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from cache_llm import CacheLLM, clave_llm, completar_con_cache
+from consulta_llm import generate_linkedin_search_query
+
+# Pruebas de la caché del LLM con un cliente falso en lugar del de OpenAI:
+# registra cada llamada y responde con un texto numerado.
+#
+#     python -m pytest test_cache_llm.py
+
+
+class ClienteFalso:
+    def __init__(self):
+        self.llamadas = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._crear))
+
+    def _crear(self, **parametros):
+        self.llamadas.append(parametros)
+        contenido = f"site:linkedin.com/in/ \"respuesta {len(self.llamadas)}\"  "
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=contenido))])
+
+
+class Reloj:
+    # Sustituye a time.time() en cache_llm para probar el TTL y la expulsión
+    def __init__(self, ahora=1000.0):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+
+class PruebasCacheLLM(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, 'cache_llm.sqlite')
+        self.cliente = ClienteFalso()
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def completar(self, cache, prompt='Ingenieros de datos en Canadá', modelo='gpt-4', system_prompt='sistema',
+                  temperatura=0):
+        return completar_con_cache(lambda: self.cliente, cache, modelo, system_prompt, prompt, temperatura, 100)
+
+    def test_acierto_en_memoria_no_llama_al_cliente(self):
+        cache = CacheLLM(self.ruta)
+        primera = self.completar(cache)
+        segunda = self.completar(cache, prompt='  ingenieros de DATOS   en canadá ')
+        self.assertEqual(primera, segunda)
+        self.assertEqual(len(self.cliente.llamadas), 1)
+        self.assertEqual(cache.estadisticas()['aciertos_memoria'], 1)
+
+    def test_acierto_en_disco_no_llama_al_cliente(self):
+        self.completar(CacheLLM(self.ruta))
+        cache = CacheLLM(self.ruta)
+        self.completar(cache)
+        self.assertEqual(len(self.cliente.llamadas), 1)
+        self.assertEqual(cache.estadisticas()['aciertos_disco'], 1)
+
+    def test_acierto_no_crea_el_cliente(self):
+        cache = CacheLLM(self.ruta)
+        self.completar(cache)
+
+        def sin_cliente():
+            raise AssertionError("No debería crearse el cliente con la respuesta en caché")
+
+        completar_con_cache(sin_cliente, cache, 'gpt-4', 'sistema', 'Ingenieros de datos en Canadá', 0, 100)
+
+    def test_la_clave_cambia_con_modelo_temperatura_y_sistema(self):
+        base = clave_llm('consulta', 'gpt-4', 0, 'sistema')
+        self.assertEqual(base, clave_llm('  CONSULTA ', 'gpt-4', 0, 'sistema'))
+        self.assertNotEqual(base, clave_llm('consulta', 'gpt-4o', 0, 'sistema'))
+        self.assertNotEqual(base, clave_llm('consulta', 'gpt-4', 0.5, 'sistema'))
+        self.assertNotEqual(base, clave_llm('consulta', 'gpt-4', 0, 'otro sistema'))
+
+        cache = CacheLLM(self.ruta)
+        self.completar(cache)
+        self.completar(cache, modelo='gpt-4o')
+        self.completar(cache, temperatura=0.5)
+        self.completar(cache, system_prompt='otro sistema')
+        self.assertEqual(len(self.cliente.llamadas), 4)
+        self.assertEqual([llamada['model'] for llamada in self.cliente.llamadas], ['gpt-4', 'gpt-4o', 'gpt-4', 'gpt-4'])
+
+    def test_lru_en_memoria(self):
+        cache = CacheLLM(None, capacidad_memoria=2)
+        cache.guardar('a', 'A')
+        cache.guardar('b', 'B')
+        self.assertEqual(cache.obtener('a'), 'A')  # 'a' pasa a ser la más reciente
+        cache.guardar('c', 'C')
+        self.assertIsNone(cache.obtener('b'))
+        self.assertEqual(cache.obtener('a'), 'A')
+        self.assertEqual(cache.obtener('c'), 'C')
+        self.assertEqual(cache.estadisticas()['entradas_memoria'], 2)
+
+    def test_expulsion_en_disco_de_las_menos_usadas(self):
+        reloj = Reloj()
+        with mock.patch('cache_llm.time.time', reloj):
+            cache = CacheLLM(self.ruta, max_entradas_disco=2)
+            for clave in ('a', 'b'):
+                reloj.ahora += 1
+                cache.guardar(clave, clave.upper())
+            reloj.ahora += 1
+            CacheLLM(self.ruta).obtener('a')  # uso en disco: 'b' queda como la menos usada
+            reloj.ahora += 1
+            cache.guardar('c', 'C')
+
+            en_disco = CacheLLM(self.ruta)
+            self.assertEqual(en_disco.obtener('a'), 'A')
+            self.assertIsNone(en_disco.obtener('b'))
+            self.assertEqual(en_disco.obtener('c'), 'C')
+
+    def test_ttl(self):
+        reloj = Reloj()
+        with mock.patch('cache_llm.time.time', reloj):
+            CacheLLM(self.ruta, ttl=60).guardar('a', 'A')
+            reloj.ahora += 30
+            self.assertEqual(CacheLLM(self.ruta, ttl=60).obtener('a'), 'A')
+            reloj.ahora += 31
+            self.assertIsNone(CacheLLM(self.ruta, ttl=60).obtener('a'))
+
+    def test_generate_linkedin_search_query_con_cliente_falso(self):
+        cache = CacheLLM(self.ruta)
+        consulta = generate_linkedin_search_query('Ventas en Europa', cache, determinista=True, cliente=self.cliente)
+        repetida = generate_linkedin_search_query('Ventas en Europa', cache, determinista=True, cliente=self.cliente)
+        self.assertEqual(consulta, 'site:linkedin.com/in/ "respuesta 1"')
+        self.assertEqual(consulta, repetida)
+        self.assertEqual(len(self.cliente.llamadas), 1)
+        self.assertEqual(self.cliente.llamadas[0]['temperature'], 0)
+        self.assertIn('Ventas en Europa', self.cliente.llamadas[0]['messages'][1]['content'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+import motor_async
+from lote import PuntoControl, SalidaJSONL, _scrapear
+from perfiles import Perfil
+from vistos import ConjuntoVistos
+
+# Pruebas de lote.py con el scrape de perfiles sustituido por uno falso: no
+# hace falta navegador.
+#
+#     python -m pytest test_lote.py
+
+URLS = ['https://www.linkedin.com/in/ana', 'https://www.linkedin.com/in/luis']
+
+
+class PruebasLote(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.vistos = ConjuntoVistos(os.path.join(self.directorio.name, 'vistos.sqlite'))
+        self.intentos = []
+
+    def tearDown(self):
+        self.vistos.cerrar()
+        self.directorio.cleanup()
+
+    def ejecutar(self, nombre, fallan=()):
+        # Una ejecución de lote con su propia salida y punto de control, y
+        # el conjunto de vistas compartido entre ejecuciones
+        async def scrape_falso(link, *args):
+            self.intentos.append(link)
+            if link in fallan:
+                return None
+            return Perfil.desde_dict({'url': link, 'name': link.rsplit('/', 1)[1], 'position': None,
+                                      'location': None, 'experience': [], 'education': []})
+
+        async def links():
+            for url in URLS:
+                yield url
+
+        ruta = os.path.join(self.directorio.name, nombre)
+        punto_control = PuntoControl(f"{ruta}.checkpoint.sqlite")
+        salida = SalidaJSONL(ruta, punto_control)
+        args = SimpleNamespace(presupuesto_url=None, concurrencia=2, refresh=False)
+        try:
+            with mock.patch.object(motor_async, 'scrape_linkedin_profile_async', scrape_falso):
+                return asyncio.run(_scrapear(links(), salida, None, None, args, None, None, self.vistos, None))
+        finally:
+            salida.cerrar()
+            punto_control.cerrar()
+
+    def test_una_url_fallida_se_reintenta_en_la_siguiente_ejecucion(self):
+        self.assertEqual(self.ejecutar('primera.jsonl', fallan={URLS[1]}), 2)
+        self.assertTrue(self.vistos.contiene(URLS[0]))
+        self.assertFalse(self.vistos.contiene(URLS[1]))
+
+        self.intentos.clear()
+        self.assertEqual(self.ejecutar('segunda.jsonl'), 1)
+        self.assertEqual(self.intentos, [URLS[1]])
+        self.assertTrue(self.vistos.contiene(URLS[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
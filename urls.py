@@ -0,0 +1,76 @@
+import urllib.parse
+
+# Normalización de URLs de perfil de LinkedIn: una misma persona debe tener
+# siempre la misma clave (caché, deduplicación) sin importar el subdominio de
+# país, la barra final, los parámetros de seguimiento, la codificación de
+# caracteres del slug o la redirección /url?q= de Google por la que llegue.
+
+HOST_CANONICO = 'www.linkedin.com'
+
+# Perfiles que se recogen de Google por búsqueda y páginas de resultados como máximo
+RESULTADOS_POR_DEFECTO = 20
+MAX_PAGINAS_SERP = 30
+
+# Parámetros en los que las redirecciones de Google llevan la URL real
+PARAMETROS_REDIRECCION = ('q', 'url')
+PROFUNDIDAD_REDIRECCION = 3
+# Caracteres que se dejan sin codificar en el slug canónico
+SLUG_SEGURO = '-_.~'
+
+
+def _desenvolver_redireccion(href):
+    # Sigue /url?q=... (relativo o absoluto en google.*) hasta la URL de destino
+    for _ in range(PROFUNDIDAD_REDIRECCION):
+        partes = urllib.parse.urlsplit(href)
+        host = (partes.hostname or '').lower()
+        if partes.path != '/url' or (host and 'google.' not in host):
+            break
+        parametros = urllib.parse.parse_qs(partes.query)
+        destino = next((parametros[p][0] for p in PARAMETROS_REDIRECCION if parametros.get(p)), None)
+        if not destino:
+            break
+        href = destino
+    return href
+
+
+def extraer_url_perfil(href):
+    # Devuelve la URL canónica https://www.linkedin.com/in/<slug> del perfil
+    # al que apunta href (directo o vía redirección de Google), o None
+    if not href:
+        return None
+    href = _desenvolver_redireccion(href.strip())
+    if href.startswith('//'):
+        href = 'https:' + href
+    elif not href.lower().startswith(('http://', 'https://')):
+        href = 'https://' + href
+
+    partes = urllib.parse.urlsplit(href)
+    host = (partes.hostname or '').lower()
+    if host != 'linkedin.com' and not host.endswith('.linkedin.com'):
+        return None
+
+    # /in/<slug>[/subpágina o idioma]: solo cuenta el slug
+    segmentos = partes.path.split('/')
+    if len(segmentos) < 3 or segmentos[1].lower() != 'in':
+        return None
+    slug = urllib.parse.unquote(segmentos[2]).strip().lower()
+    if not slug or any(c.isspace() or c in '<>"\\' for c in slug):
+        return None
+    return f"https://{HOST_CANONICO}/in/{urllib.parse.quote(slug, safe=SLUG_SEGURO)}"
+
+
+def normalizar_url_perfil(url):
+    # Clave canónica de una URL: la de perfil si lo es; cualquier otra URL se
+    # conserva sin query ni fragmento
+    canonica = extraer_url_perfil(url)
+    if canonica:
+        return canonica
+    partes = urllib.parse.urlsplit(url.strip())
+    return urllib.parse.urlunsplit((partes.scheme.lower(), partes.netloc.lower(), partes.path.rstrip('/'), '', ''))
+
+
+def url_busqueda_google(search_query, inicio=0):
+    encoded_query = urllib.parse.quote(search_query)
+    search_url = f"https://www.google.com/search?q={encoded_query}"
+    # Google pagina de 10 en 10 con el parámetro start
+    return f"{search_url}&start={inicio}" if inicio else search_url
@@ -1,217 +1,345 @@
-import random
+import argparse
 import logging
-import urllib.parse
-from playwright.sync_api import sync_playwright
 from time import sleep
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from openai import OpenAI
 import os
-from dotenv import load_dotenv
-import json
-import re
-
-load_dotenv()
-
-client = OpenAI()
-
-# Configuración de logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-# Lista de User-Agents para rotación
-USER_AGENTS = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Safari/605.1.15',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/92.0.4515.107 Safari/537.36'
-]
-
-def cargar_cookies(context, archivo_cookies):
+import queue
+import threading
+from archivo_html import ArchivoHTML
+from cache_llm import CacheLLM
+from cache_perfiles import RUTA_POR_DEFECTO as RUTA_CACHE, CachePerfiles, consultar_cache
+from cadencia import LIMITADOR_POR_DEFECTO, retraso_reintento
+from cliente_http import ClienteHTTP
+from consulta_llm import generate_linkedin_search_query
+from demonio_navegador import resolver_cdp
+from esperas import SELECTORES_SERP, esperar_selectores
+from extraccion import extraer_perfil
+from fallos import (SELECTORES_CONTENIDO_SERP, ErrorBloqueo, clasificar_error, clasificar_respuesta, detectar_muro,
+                    resolver_fallo)
+from metricas import METRICAS_POR_DEFECTO, servir_metricas
+from plan_consultas import MAX_SUBCONSULTAS, MODOS, planificar
+from politica_recursos import POLITICA_POR_DEFECTO
+from pool_navegadores import PoolNavegadores
+from programador import Programador
+from sesiones import OK, PoolSesiones, usar_sesion
+from urls import MAX_PAGINAS_SERP, RESULTADOS_POR_DEFECTO, extraer_url_perfil, url_busqueda_google
+from motor_async import buscar_y_scrapear_sync
+from vistos import ConjuntoVistos
+
+# Scraper de línea de órdenes. main() usa el motor asíncrono
+# (motor_async.buscar_y_scrapear_sync); el motor de hilos de este módulo
+# (scrapear_perfiles y buscar_y_scrapear, sobre PoolNavegadores) ya no lo usa
+# ninguna ejecución real y se conserva solo como referencia para
+# bench_motores.py y bench_scraper.py, que comparan ambos motores.
+
+def recolectar_resultados_google(search_query, pool, cola, objetivo=RESULTADOS_POR_DEFECTO, politica=POLITICA_POR_DEFECTO,
+                                 archivo=None):
+    # Tarea del pool: recorre las páginas de resultados y publica cada perfil
+    # en la cola en cuanto se lee. Termina publicando None.
+    vistos = set()
     try:
-        with open(archivo_cookies, 'r') as f:
-            cookies = json.load(f)
-        context.add_cookies(cookies)
-        logging.info(f"Cookies cargadas desde {archivo_cookies}")
-    except FileNotFoundError:
-        logging.error(f"El archivo de cookies '{archivo_cookies}' no fue encontrado.")
-    except json.JSONDecodeError:
-        logging.error(f"Error al decodificar el archivo de cookies '{archivo_cookies}'.")
-
-def generate_linkedin_search_query(prompt):
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": """Eres un generador de URLs de búsqueda avanzada de Google para encontrar perfiles en LinkedIn. Tu objetivo es ayudar al usuario a construir URLs específicas para búsquedas de LinkedIn según sus descripciones en lenguaje natural. Cuando el usuario te proporcione una consulta, debes crear una URL que incluya todos los parámetros de búsqueda mencionados.
-
-            Ejemplo de entradas y salidas:
-
-            1. Entrada: "Quiero encontrar desarrolladores de software en Estados Unidos que hayan estudiado en MIT o Stanford."
-            output: site:linkedin.com/in/ "Software Developer" "United States" ("MIT" OR "Stanford")
-
-            2. Entrada: "Busco perfiles en LinkedIn de personas que trabajen en ventas y estén ubicadas en Europa."
-            output: site:linkedin.com/in/ "sales" ("France" OR "Germany" OR "Spain" OR "Italy" OR "United Kingdom" OR "Netherlands")
-
-            3. Entrada: "Me gustaría ver perfiles de gerentes de producto con experiencia en la industria tecnológica en California."
-            output: site:linkedin.com/in/ "Product Manager" "technology industry" "California"
-
-            4. Entrada: "Encuentra perfiles de ingenieros de datos en Canadá que tengan experiencia con Hadoop y Spark."
-            output site:linkedin.com/in/ "Data Engineer" "Canada" ("Hadoop" OR "Spark")
-
-            5. Entrada: "Quiero ver perfiles de personas que hayan trabajado como científicos de datos en Europa y hayan estudiado inteligencia artificial."
-            output: site:linkedin.com/in/ "Data Scientist" ("France" OR "Germany" OR "Spain" OR "Italy" OR "United Kingdom") "Artificial Intelligence"
-
-            Recuerda utilizar `site:linkedin.com/in/` al inicio de cada consulta para limitar la búsqueda a perfiles de LinkedIn y utilizar operadores como `OR` para agrupar términos similares. También, agrupa términos dentro de comillas para realizar búsquedas exactas.
-            """},
-            {"role": "user", "content": f"Generate a LinkedIn search query for: {prompt}"}
-        ],
-        max_tokens=300,
-        temperature=0.5
-    )
-    return response.choices[0].message.content.strip()
-
-def scrape_google_results(search_query):
-    encoded_query = urllib.parse.quote(search_query)
-    search_url = f"https://www.google.com/search?q={encoded_query}"
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(user_agent=random.choice(USER_AGENTS))
-        page = context.new_page()
-        links = []
-        try:
-            page.goto(search_url, timeout=60000)
-            page.wait_for_load_state('networkidle')
-            sleep(random.uniform(2, 4))  # Espera para cargar completamente
-
-            # Extraer URLs de los resultados de búsqueda
-            results = page.query_selector_all('a')
-            for result in results:
-                href = result.get_attribute('href')
-                if href and 'linkedin.com/in/' in href:
-                    # Extraer la URL real usando regex
-                    match = re.search(r'/url\?q=(https?://[^\&]+)&', href)
-                    if match:
-                        real_url = urllib.parse.unquote(match.group(1))
-                    else:
-                        # Si no está en formato de redirección de Google, usar directamente
-                        real_url = href
-                    # Validar que sea una URL de LinkedIn válida
-                    if re.match(r'^https?://(es|www)\.linkedin\.com/in/[A-z0-9\-_%]+/?$', real_url):
-                        links.append(real_url)
-                        logging.info(f"Perfil encontrado: {real_url}")
-                    if len(links) >= 20:
-                        break
-
-        except Exception as e:
-            logging.error(f"Error al extraer enlaces: {e}")
-        finally:
-            browser.close()
-
-        return links
-
-def scrape_linkedin_profile(url, archivo_cookies):
-    for intento in range(1, 4):  # Intentar 3 veces
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(user_agent=random.choice(USER_AGENTS))
-            
-            # Cargar cookies antes de crear la página
-            cargar_cookies(context, archivo_cookies)
-            
-            # Depuración: Imprimir las cookies cargadas
-            cookies = context.cookies()
-            logging.debug(f"Cookies cargadas: {len(cookies)}")
-            for cookie in cookies:
-                if cookie['name'] == 'li_at':  # Esta es una cookie importante de LinkedIn
-                    logging.debug("Cookie de sesión de LinkedIn encontrada")
-                    break
-            else:
-                logging.warning("Advertencia: No se encontró la cookie de sesión de LinkedIn")
-            
+        with pool.contexto() as context:
             page = context.new_page()
-            
+            recursos = politica.instalar(page) if politica else None
             try:
-                page.goto(url, timeout=60000)
-                page.wait_for_load_state('networkidle')
-                sleep(random.uniform(2, 5))  # Espera aleatoria
+                for pagina in range(MAX_PAGINAS_SERP):
+                    search_url = url_busqueda_google(search_query, pagina * 10)
+                    with METRICAS_POR_DEFECTO.tramo('serp', 'pagina'):
+                        with METRICAS_POR_DEFECTO.tramo('serp', 'limitador'):
+                            LIMITADOR_POR_DEFECTO.esperar(search_url)
+                        with METRICAS_POR_DEFECTO.tramo('serp', 'goto'):
+                            response = page.goto(search_url, timeout=60000, wait_until='domcontentloaded')
+                        fallo = clasificar_respuesta(response.status if response else None, page.url) or \
+                            detectar_muro(page, SELECTORES_CONTENIDO_SERP)
+                        if fallo:
+                            if isinstance(fallo, ErrorBloqueo):
+                                LIMITADOR_POR_DEFECTO.registrar_bloqueo(search_url, fallo.motivo)
+                            raise fallo
+                        LIMITADOR_POR_DEFECTO.registrar_exito(search_url)
+                        with METRICAS_POR_DEFECTO.tramo('serp', 'selectores'):
+                            esperar_selectores(page, SELECTORES_SERP)
+                        if archivo:
+                            with METRICAS_POR_DEFECTO.tramo('serp', 'archivo'):
+                                archivo.guardar(search_url, page.content(), 'serp', response.status if response else None)
+
+                        # Todos los href de la página en una sola llamada al navegador
+                        with METRICAS_POR_DEFECTO.tramo('serp', 'enlaces'):
+                            hrefs = page.eval_on_selector_all('a', 'enlaces => enlaces.map(a => a.getAttribute("href"))')
+                    nuevos = 0
+                    for href in hrefs:
+                        real_url = extraer_url_perfil(href)  # Ya canónica
+                        if real_url is None or real_url in vistos:
+                            continue
+                        vistos.add(real_url)
+                        nuevos += 1
+                        METRICAS_POR_DEFECTO.contar('perfiles_encontrados_total')
+                        logging.info(f"Perfil encontrado: {real_url}")
+                        cola.put(real_url)
+                        if len(vistos) >= objetivo:
+                            return
 
-                # Verificar si estamos en la página de inicio de sesión
-                if "linkedin.com/login" in page.url:
-                    logging.warning(f"No se pudo acceder al perfil {url}. Redirigido a la página de inicio de sesión.")
-                    return None
+                    # Una página sin perfiles nuevos indica que no hay más resultados
+                    if nuevos == 0:
+                        break
+
+            except Exception as e:
+                logging.error(f"Error al extraer enlaces: {e}")
+            finally:
+                if politica:
+                    politica.cerrar_pagina(search_query, recursos)
+    finally:
+        cola.put(None)
+
+def iterar_resultados_google(search_query, pool, objetivo=RESULTADOS_POR_DEFECTO, politica=POLITICA_POR_DEFECTO, archivo=None):
+    # Generador: la paginación corre en un navegador del pool y cada perfil se
+    # entrega en cuanto aparece, sin esperar al resto de páginas
+    cola = queue.Queue()
+    future = pool.submit(recolectar_resultados_google, search_query, pool, cola, objetivo, politica, archivo)
+    while True:
+        link = cola.get()
+        if link is None:
+            break
+        yield link
+    future.result()
+
+def scrape_google_results(search_query, pool=None, politica=POLITICA_POR_DEFECTO, objetivo=RESULTADOS_POR_DEFECTO, archivo=None):
+    if pool is None:
+        with PoolNavegadores(tamano=1) as pool:
+            return scrape_google_results(search_query, pool, politica, objetivo, archivo)
+
+    return list(iterar_resultados_google(search_query, pool, objetivo, politica, archivo))
+
+def intentar_perfil(url, sesiones, pool, politica=POLITICA_POR_DEFECTO, cache=None, archivo=None, http=None):
+    # Un solo intento, como intentar_perfil_async: devuelve el perfil, None si
+    # el resultado es definitivo o lanza una excepción si merece la pena reintentar
+    with usar_sesion(sesiones) as uso:
+        sesion = uso['sesion']
+        if http:
+            resuelto, perfil = http.intentar(url, uso, cache, archivo)
+            if resuelto:
+                return perfil
+        # Contexto nuevo (sesión en memoria, User-Agent rotado) sobre un navegador ya abierto
+        with pool.contexto(sesion.estado if sesion else None) as context:
+            with METRICAS_POR_DEFECTO.tramo('perfil', 'pagina_nueva'):
+                page = context.new_page()
+                recursos = politica.instalar(page) if politica else None
 
-                # Extraer información del perfil
-                name_element = page.query_selector('h1')
-                position_element = page.query_selector('.top-card-layout__headline')
-                location_element = page.query_selector('.top-card-layout__first-subline')
+            try:
+                with METRICAS_POR_DEFECTO.tramo('perfil', 'intento') as intento:
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'limitador'):
+                        LIMITADOR_POR_DEFECTO.esperar(url)
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'goto'):
+                        response = page.goto(url, timeout=60000, wait_until='domcontentloaded')
+
+                    # Código y URL final y, si el perfil no está en el DOM, captcha, authwall
+                    # o "no disponible": sin esperar a selectores que no van a aparecer
+                    fallo = clasificar_respuesta(response.status if response else None, page.url)
+                    if fallo is None:
+                        with METRICAS_POR_DEFECTO.tramo('perfil', 'detector'):
+                            fallo = detectar_muro(page)
+                    if fallo:
+                        if isinstance(fallo, ErrorBloqueo):
+                            LIMITADOR_POR_DEFECTO.registrar_bloqueo(url, fallo.motivo)
+                        intento.resultado = resolver_fallo(fallo, url, uso, cache)
+                        return None
+                    LIMITADOR_POR_DEFECTO.registrar_exito(url)
+                    uso['resultado'] = OK
+
+                    # Esperar solo a los elementos que se van a extraer
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'selectores'):
+                        esperar_selectores(page)
+                    if archivo:
+                        # Se archiva antes de extraer: si cambian los selectores se puede reextraer
+                        with METRICAS_POR_DEFECTO.tramo('perfil', 'archivo'):
+                            archivo.guardar(url, page.content(), 'perfil', response.status if response else None)
+
+                    # Extraer todo el perfil en una sola llamada al navegador
+                    with METRICAS_POR_DEFECTO.tramo('perfil', 'extraccion'):
+                        perfil = extraer_perfil(page, url=url)
+                    if perfil is None:
+                        logging.warning(f"No se pudieron encontrar algunos elementos en el perfil {url}.")
+                        intento.resultado = 'sin_datos'
+                        return None
+
+                    logging.info(f"Perfil extraído exitosamente: {url}")
+                    if cache:
+                        cache.guardar(url, perfil)
+                    return perfil
 
-                if not all([name_element, position_element, location_element]):
-                    logging.warning(f"No se pudieron encontrar algunos elementos en el perfil {url}.")
-                    return None
+            finally:
+                if politica:
+                    politica.cerrar_pagina(url, recursos)
 
-                name = name_element.inner_text().strip()
-                position = position_element.inner_text().strip()
-                location = location_element.inner_text().strip()
-
-                # Extraer experiencia laboral
-                experience = []
-                exp_elements = page.query_selector_all('section#experience-section li')
-                for exp in exp_elements[:3]:  # Limitar a las 3 experiencias más recientes
-                    title_element = exp.query_selector('.pv-entity__summary-info h3')
-                    company_element = exp.query_selector('.pv-entity__secondary-title')
-                    if title_element and company_element:
-                        title = title_element.inner_text().strip()
-                        company = company_element.inner_text().strip()
-                        experience.append(f"{title} at {company}")
-
-                # Extraer educación
-                education = []
-                edu_elements = page.query_selector_all('section#education-section li')
-                for edu in edu_elements[:2]:  # Limitar a las 2 educaciones más recientes
-                    school_element = edu.query_selector('.pv-entity__school-name')
-                    degree_element = edu.query_selector('.pv-entity__degree-name')
-                    if school_element and degree_element:
-                        school = school_element.inner_text().strip()
-                        degree = degree_element.inner_text().strip()
-                        education.append(f"{degree} from {school}")
-
-                logging.info(f"Perfil extraído exitosamente: {url}")
-                return {
-                    "url": url,
-                    "name": name,
-                    "position": position,
-                    "location": location,
-                    "experience": experience,
-                    "education": education
-                }
+def scrape_linkedin_profile(url, sesiones, pool=None, politica=POLITICA_POR_DEFECTO, cache=None, archivo=None,
+                            http=None):
+    if pool is None:
+        with PoolNavegadores(tamano=1) as pool:
+            return pool.submit(scrape_linkedin_profile, url, sesiones, pool, politica, cache, archivo, http).result()
 
+    with METRICAS_POR_DEFECTO.tramo('perfil', 'total') as total:
+        for intento in range(1, 4):  # Intentar 3 veces
+            try:
+                # La vía rápida solo en el primer intento: los reintentos van al navegador
+                perfil = intentar_perfil(url, sesiones, pool, politica, cache, archivo, http if intento == 1 else None)
+                total.resultado = 'ok' if perfil else 'sin_datos'
+                return perfil
             except Exception as e:
+                fallo = clasificar_error(e)
+                if not fallo.reintentable:
+                    # Reintentar no cambiaría nada: el trabajador pasa a otro perfil
+                    logging.error(f"Error no reintentable en el perfil {url}: {e}")
+                    total.resultado = fallo.motivo
+                    return None
                 logging.error(f"Error al extraer perfil {url} en intento {intento}: {e}. Reintentando...")
-                sleep(random.uniform(5, 10))  # Espera antes de reintentar
-            finally:
-                browser.close()
-
-    logging.error(f"No se pudo extraer el perfil después de 3 intentos: {url}")
-    return None
-
-def buscar_y_scrapear(search_query, archivo_cookies):
-    linkedin_links = scrape_google_results(search_query)
-    if not linkedin_links:
-        logging.warning("No se encontraron enlaces de LinkedIn.")
-        return []
-
-    linkedin_profiles = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_url = {executor.submit(scrape_linkedin_profile, link, archivo_cookies): link for link in linkedin_links}
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
+                METRICAS_POR_DEFECTO.reintento('perfil', fallo)
+                with METRICAS_POR_DEFECTO.tramo('perfil', 'backoff'):
+                    sleep(retraso_reintento(intento))  # Backoff exponencial con jitter
+
+        logging.error(f"No se pudo extraer el perfil después de 3 intentos: {url}")
+        total.resultado = 'agotado'
+        return None
+
+def scrapear_perfiles(linkedin_links, sesiones, pool, politica=POLITICA_POR_DEFECTO, cache=None, refrescar=False,
+                      archivo=None, vistos=None, http=None, programador=None):
+    # linkedin_links puede ser un generador: los links se siguen leyendo
+    # mientras el pool trabaja. Como mucho hay pool.tamano perfiles enviados
+    # al pool; el resto espera en el montículo del programador y cada hueco
+    # que se libera lo ocupa el más prioritario (el puesto en la SERP), en el
+    # hilo que terminó el anterior. Los perfiles se devuelven en orden de
+    # prioridad. Con el plazo de un Programador se devuelven los terminados a
+    # tiempo: los que no habían empezado quedan en programador.pendientes()
+    # (en hilos no se puede cortar un perfil ya empezado, así que aquí no hay
+    # presupuesto por URL)
+    programador = programador or Programador()
+    programador.iniciar()
+    en_vuelo = {}
+    programados = set()
+    total_links = 0
+    cambio = threading.Condition(threading.RLock())
+    abierto = [True]
+
+    def terminado(future):
+        with cambio:
+            if future not in en_vuelo:
+                return  # cancelado o aplazado al vencer el plazo
+            link, prioridad = en_vuelo.pop(future)
             try:
-                data = future.result()
-                if data:
-                    linkedin_profiles.append(data)
+                perfil = future.result()
             except Exception as exc:
-                logging.error(f'{url} generó una excepción: {exc}')
+                logging.error(f'{link} generó una excepción: {exc}')
+                perfil = None
+            programador.terminar(link, prioridad, perfil)
+            if perfil and vistos is not None:
+                vistos.agregar(link)
+            lanzar()
+            cambio.notify_all()
+
+    def lanzar():
+        with cambio:
+            while abierto[0] and programador.en_espera() and len(en_vuelo) < pool.tamano and not programador.vencido():
+                link, prioridad = programador.siguiente()
+                future = pool.submit(scrape_linkedin_profile, link, sesiones, pool, politica, cache, archivo, http)
+                en_vuelo[future] = (link, prioridad)
+                future.add_done_callback(terminado)
 
+    try:
+        for elemento in linkedin_links:
+            link, prioridad = elemento if isinstance(elemento, tuple) else (elemento, None)
+            total_links += 1
+            # Las URLs se marcan como vistas al extraerse, no al programarlas
+            if vistos is not None and (link in programados or vistos.contiene(link)):
+                logging.info(f"Perfil {link} omitido: ya visto en otra consulta")
+                continue
+            en_cache, perfil = consultar_cache(link, cache, refrescar)
+            with cambio:
+                if en_cache:
+                    programador.resolver(link, perfil, prioridad)
+                    if perfil and vistos is not None:
+                        vistos.agregar(link)
+                    continue
+                programados.add(link)
+                programador.agregar(link, prioridad)
+                lanzar()
+                if programador.vencido():
+                    break
+
+        if not total_links:
+            logging.warning("No se encontraron enlaces de LinkedIn.")
+
+        with cambio:
+            while en_vuelo and not programador.vencido():
+                cambio.wait(programador.restante())
+            if en_vuelo or programador.en_espera():
+                logging.warning(f"Plazo de {programador.plazo_s} s vencido: se entregan los perfiles terminados")
+    finally:
+        # Plazo vencido o error: la búsqueda de Google deja de leerse y lo que
+        # no terminó (en el pool o en espera) queda pendiente
+        close = getattr(linkedin_links, 'close', None)
+        if close:
+            close()
+        with cambio:
+            abierto[0] = False
+            for future, (link, prioridad) in list(en_vuelo.items()):
+                del en_vuelo[future]
+                future.cancel()
+                programador.aplazar(link, prioridad, 'plazo')
+            programador.aplazar_espera()
+    linkedin_profiles = programador.perfiles()
+
+    logging.info(f"Estadísticas del pool de navegadores: {pool.estadisticas()}")
+    logging.info(f"Programación: {programador.estadisticas()}")
+    if http:
+        logging.info(f"Vía rápida HTTP: {http.estadisticas()}")
+    if politica:
+        logging.info(f"Recursos bloqueados: {politica.resumen()}")
+    logging.info(f"Tasas por host: {LIMITADOR_POR_DEFECTO.tasas()}")
+    if cache:
+        logging.info(f"Estadísticas de la caché: {cache.estadisticas()}")
     return linkedin_profiles
 
+def buscar_y_scrapear(search_query, sesiones, pool=None, politica=POLITICA_POR_DEFECTO, cache=None, refrescar=False,
+                      objetivo=RESULTADOS_POR_DEFECTO, archivo=None, vistos=None, cdp=None, http=None, programador=None):
+    if pool is None:
+        with PoolNavegadores(tamano=5, cdp=cdp) as pool:
+            return buscar_y_scrapear(search_query, sesiones, pool, politica, cache, refrescar, objetivo, archivo,
+                                     vistos, http=http, programador=programador)
+
+    linkedin_links = iterar_resultados_google(search_query, pool, objetivo, politica, archivo)
+    return scrapear_perfiles(linkedin_links, sesiones, pool, politica, cache, refrescar, archivo, vistos, http,
+                             programador)
+
 def main():
+    parser = argparse.ArgumentParser(description="LinkedIn Profile Scraper")
+    parser.add_argument('--refresh', action='store_true', help="Ignorar la caché y volver a scrapear todos los perfiles")
+    parser.add_argument('--cache', default=RUTA_CACHE, help="Ruta de la caché SQLite de perfiles")
+    parser.add_argument('--objetivo', type=int, default=RESULTADOS_POR_DEFECTO, help="Número de perfiles a recoger de Google")
+    parser.add_argument('--plan', choices=MODOS, default=None,
+                        help="Abrir la búsqueda en subconsultas paralelas: expandiendo sus grupos OR o pidiéndolas al LLM")
+    parser.add_argument('--subconsultas', type=int, default=MAX_SUBCONSULTAS, help="Máximo de subconsultas del plan")
+    parser.add_argument('--objetivo-plan', type=int, default=None,
+                        help="Perfiles distintos a recoger en todo el plan (por defecto --objetivo por subconsulta)")
+    parser.add_argument('--archivo', default=None, help="Directorio donde archivar el HTML descargado (desactivado si se omite)")
+    parser.add_argument('--vistos', default=None, help="Conjunto persistente de perfiles ya vistos: no se vuelven a scrapear")
+    parser.add_argument('--sesiones', nargs='+', default=['cookies.json'],
+                        help="Ficheros de cookies o storage_state de Playwright, uno por cuenta de LinkedIn")
+    parser.add_argument('--determinista', action='store_true', help="Generar la consulta con temperatura 0 (respuestas cacheables y estables)")
+    parser.add_argument('--puerto-metricas', type=int, default=None, help="Exponer métricas Prometheus en este puerto")
+    parser.add_argument('--resumen-metricas', default=None, help="Guardar un resumen JSON de las métricas al terminar")
+    parser.add_argument('--cdp', default=None,
+                        help="Conectar a navegadores ya abiertos: 'auto' (demonio_navegador.py) o URLs CDP separadas por comas "
+                             "(por defecto $SCRAPER_CDP)")
+    parser.add_argument('--http', action='store_true',
+                        help="Probar cada perfil primero por HTTP/2 sin navegador; se escala a Playwright si hace falta")
+    parser.add_argument('--plazo', type=float, default=None,
+                        help="Segundos para toda la búsqueda; al vencer se muestran los perfiles terminados")
+    parser.add_argument('--presupuesto-url', type=float, default=None,
+                        help="Segundos como máximo por perfil, reintentos incluidos")
+    parser.add_argument('--cola', default=None,
+                        help="Cola de trabajo (SQLite o redis://) donde dejar los perfiles que no terminaron a tiempo")
+    args = parser.parse_args()
+
+    # Configuración de logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
     print("LinkedIn Profile Scraper")
     print("\nIntroduce tu búsqueda en lenguaje natural. Nuestro sistema convertirá tu consulta en una búsqueda avanzada de LinkedIn.")
     print("\nEjemplos de búsquedas que puedes realizar:")
@@ -220,21 +348,56 @@ def main():
     print("- 'Quiero ver perfiles de científicos de datos en Canadá con experiencia en inteligencia artificial'")
 
     user_query = input("\nIntroduce tu búsqueda: ")
-    archivo_cookies = 'cookies.json'
 
-    # Verificar si el archivo de cookies existe
-    if not os.path.exists(archivo_cookies):
-        print(f"Error: El archivo de cookies '{archivo_cookies}' no existe.")
+    # Verificar si los archivos de cookies existen
+    faltan = [ruta for ruta in args.sesiones if not os.path.exists(ruta)]
+    if len(faltan) == len(args.sesiones):
+        print(f"Error: El archivo de cookies '{faltan[0]}' no existe.")
         print("Por favor, ejecuta primero el script 'login_y_guardar_cookies.py' para generar las cookies.")
         return
+    # Cada fichero se lee y valida una sola vez; los inválidos se descartan con un aviso
+    sesiones = PoolSesiones([ruta for ruta in args.sesiones if ruta not in faltan])
+    if args.puerto_metricas:
+        servir_metricas(args.puerto_metricas)
 
     if user_query:
         print('Generando consulta de búsqueda avanzada...')
-        search_query = generate_linkedin_search_query(user_query)
-        print(f"Consulta de búsqueda generada: {search_query}")
+        if args.plan:
+            search_query = planificar(user_query, args.plan, CacheLLM(), args.determinista, args.subconsultas)
+            print(f"Plan de {len(search_query)} subconsultas:")
+            for subconsulta in search_query:
+                print(f"- {subconsulta}")
+        else:
+            search_query = generate_linkedin_search_query(user_query, cache=CacheLLM(), determinista=args.determinista)
+            print(f"Consulta de búsqueda generada: {search_query}")
 
         print('Realizando scraping... Esto puede tardar unos minutos.')
-        perfiles = buscar_y_scrapear(search_query, archivo_cookies)
+        cache = CachePerfiles(args.cache)
+        archivo = ArchivoHTML(args.archivo) if args.archivo else None
+        vistos = ConjuntoVistos(args.vistos) if args.vistos else None
+        http = ClienteHTTP() if args.http else None
+        programador = Programador(args.plazo, args.presupuesto_url)
+        perfiles = buscar_y_scrapear_sync(search_query, sesiones, cache=cache, refrescar=args.refresh,
+                                          objetivo=args.objetivo, archivo=archivo, vistos=vistos,
+                                          cdp=resolver_cdp(args.cdp), http=http, objetivo_plan=args.objetivo_plan,
+                                          programador=programador)
+        if vistos:
+            vistos.cerrar()
+        if programador.pendientes():
+            if args.cola:
+                from cola_trabajo import abrir_cola
+                programador.devolver_pendientes(abrir_cola(args.cola))
+            else:
+                print(f"{len(programador.pendientes())} perfiles no terminaron a tiempo:")
+                for url in programador.pendientes():
+                    print(f"- {url}")
+        logging.info(f"Sesiones: {sesiones.estadisticas()}")
+        resumen = METRICAS_POR_DEFECTO.resumen()
+        logging.info(f"{resumen['perfiles_por_s']} perfiles/s, tasa de éxito {resumen['tasa_exito']}, "
+                     f"tasa de escalado HTTP {resumen['tasa_escalado_http']}, "
+                     f"reintentos: {resumen['contadores'].get('reintentos_total', {})}")
+        if args.resumen_metricas:
+            METRICAS_POR_DEFECTO.guardar_resumen(args.resumen_metricas)
         
         if perfiles:
             print(f"Se encontraron {len(perfiles)} perfiles.")
@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import threading
+from urls import normalizar_url_perfil
+
+# Conjunto persistente de URLs de perfil ya vistas, para no programar trabajo
+# de navegador dos veces para la misma persona entre consultas y ejecuciones.
+#
+# Dos niveles:
+#   - Un filtro de Bloom en un fichero mapeado en memoria. Responde "seguro
+#     que no está" sin tocar disco, que es el caso habitual con URLs nuevas.
+#   - Una tabla SQLite con un hash de 64 bits de la URL canónica como clave
+#     entera: compacta (decenas de millones de filas en unos cientos de MB) y
+#     exacta salvo colisiones de 64 bits. Solo se consulta cuando el Bloom
+#     dice "quizá".
+#
+# El Bloom se dimensiona para `capacidad` URLs con una tasa de falsos
+# positivos `tasa_falsos`; si se supera la capacidad solo aumentan las
+# consultas a SQLite, la respuesta sigue siendo exacta. Si falta el fichero
+# del Bloom se reconstruye desde SQLite.
+
+RUTA_POR_DEFECTO = 'vistos.sqlite'
+CAPACIDAD_POR_DEFECTO = 10_000_000
+TASA_FALSOS_POR_DEFECTO = 0.001
+ESCRITURAS_POR_COMMIT = 1000
+
+
+def hash_url(url):
+    # Hash de 64 bits con signo (INTEGER de SQLite) de la URL canónica
+    digest = hashlib.blake2b(normalizar_url_perfil(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+class FiltroBloom:
+    def __init__(self, ruta, bits, funciones):
+        self.bits = bits
+        self.funciones = funciones
+        tamano = (bits + 7) // 8
+        existia = os.path.exists(ruta) and os.path.getsize(ruta) == tamano
+        with open(ruta, 'a+b') as f:
+            if not existia:
+                f.truncate(0)
+            f.truncate(tamano)
+        self._archivo = open(ruta, 'r+b')
+        self._mapa = mmap.mmap(self._archivo.fileno(), tamano)
+        self.reconstruir = not existia
+
+    def _posiciones(self, clave):
+        # Doble hash sobre las dos mitades de la clave de 64 bits
+        clave &= 0xFFFFFFFFFFFFFFFF
+        a, b = clave & 0xFFFFFFFF, (clave >> 32) | 1
+        return [(a + i * b) % self.bits for i in range(self.funciones)]
+
+    def contiene(self, clave):
+        return all(self._mapa[p >> 3] & (1 << (p & 7)) for p in self._posiciones(clave))
+
+    def agregar(self, clave):
+        for p in self._posiciones(clave):
+            self._mapa[p >> 3] |= 1 << (p & 7)
+
+    def sincronizar(self):
+        self._mapa.flush()
+
+    def cerrar(self):
+        self._mapa.flush()
+        self._mapa.close()
+        self._archivo.close()
+
+
+class ConjuntoVistos:
+    def __init__(self, ruta=RUTA_POR_DEFECTO, capacidad=CAPACIDAD_POR_DEFECTO, tasa_falsos=TASA_FALSOS_POR_DEFECTO):
+        self.ruta = ruta
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._estadisticas = {'nuevas': 0, 'repetidas': 0, 'descartes_bloom': 0, 'consultas_sqlite': 0}
+
+        self._conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA busy_timeout=30000")
+        self._conexion.execute("CREATE TABLE IF NOT EXISTS vistas (clave INTEGER PRIMARY KEY)")
+        self._conexion.commit()
+        self._total = self._conexion.execute("SELECT COUNT(*) FROM vistas").fetchone()[0]
+
+        bits = math.ceil(-capacidad * math.log(tasa_falsos) / math.log(2) ** 2)
+        funciones = max(1, round(bits / capacidad * math.log(2)))
+        self._bloom = FiltroBloom(f"{ruta}.bloom", bits, funciones)
+        if self._bloom.reconstruir and self._total:
+            logging.info(f"Reconstruyendo el filtro de Bloom de {ruta} ({self._total} URLs)")
+            for (clave,) in self._conexion.execute("SELECT clave FROM vistas"):
+                self._bloom.agregar(clave)
+            self._bloom.sincronizar()
+
+    def contiene(self, url):
+        clave = hash_url(url)
+        with self._lock:
+            return self._contiene(clave)
+
+    def agregar(self, url):
+        # Marca la URL como vista; devuelve True si no lo estaba
+        clave = hash_url(url)
+        with self._lock:
+            if self._contiene(clave):
+                self._estadisticas['repetidas'] += 1
+                return False
+            self._conexion.execute("INSERT OR IGNORE INTO vistas (clave) VALUES (?)", (clave,))
+            self._bloom.agregar(clave)
+            self._estadisticas['nuevas'] += 1
+            self._total += 1
+            self._pendientes += 1
+            if self._pendientes >= ESCRITURAS_POR_COMMIT:
+                self._confirmar()
+            if self._total == self.capacidad + 1:
+                logging.warning(f"El conjunto de vistas supera la capacidad del filtro de Bloom ({self.capacidad}); "
+                                f"aumentarán las consultas a SQLite")
+            return True
+
+    def sincronizar(self):
+        with self._lock:
+            self._confirmar()
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._estadisticas, total=self._total)
+
+    def cerrar(self):
+        with self._lock:
+            self._confirmar()
+            self._bloom.cerrar()
+            self._conexion.close()
+
+    def _contiene(self, clave):
+        if not self._bloom.contiene(clave):
+            self._estadisticas['descartes_bloom'] += 1
+            return False
+        self._estadisticas['consultas_sqlite'] += 1
+        return self._conexion.execute("SELECT 1 FROM vistas WHERE clave = ?", (clave,)).fetchone() is not None
+
+    def _confirmar(self):
+        # Las escrituras se agrupan en transacciones de ESCRITURAS_POR_COMMIT
+        if self._pendientes:
+            self._conexion.commit()
+            self._bloom.sincronizar()
+            self._pendientes = 0